@@ -1,23 +1,68 @@
 # app.py
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, session, send_from_directory
+from flask import Flask, render_template, request, jsonify, flash, redirect, url_for, session, send_from_directory, send_file, abort, g, Response, stream_with_context
+import io
 import os
 import csv
+import math
 import json
+import queue
+import time
 import xmlrpc.client
 from collections import Counter
-import pandas as pd
 from werkzeug.utils import secure_filename
-from datetime import datetime
-from report_generator import create_inventory_report
-from label_generator import generate_product_label, generate_and_print
+from datetime import datetime, timedelta
+from label_cache import LabelCache
+from label_history import LabelHistory
+from product_index import ProductIndex
+from product_catalog import ProductCatalog, CATALOG_FIELDS
+from catalog_snapshot import SharedProductCatalog
+from location_cache import LocationCache
+from reception_board import ReceptionBoard
+from metrics import registry as metrics_registry, start_request_tracking, finish_request_tracking, current_request_rpcs, HTTP_REQUEST_SECONDS, HTTP_REQUEST_RPCS
+from profiler import RequestProfiler, phase
+from transfer_outbox import TransferOutbox
+from scan_session import ScanSessionManager
+from inventory_transfer import (
+    InventoryTransfers, DEFAULT_AVAILABILITY_POLICY, MAX_TRANSFER_PRODUCTS, MAX_PRODUCT_QUANTITY,
+    describe_shortages, limit_transfer_products
+)
+from odoo_client import (
+    OdooClient, LANE_BULK, LANE_INTERACTIVE, rpc_lane, set_rpc_lane, reset_rpc_lane,
+    DEFAULT_CONNECT_TIMEOUT, DEFAULT_READ_TIMEOUT, DEFAULT_RPC_RETRIES,
+    DEFAULT_BREAKER_FAILURES, DEFAULT_BREAKER_RESET_SECONDS,
+    DEFAULT_INTERACTIVE_LIMIT, DEFAULT_BULK_LIMIT, DEFAULT_QUEUE_TIMEOUT, DEFAULT_TRANSPORT
+)
 
 app = Flask(__name__)
 app.secret_key = 'odoo_transfer_secret_key'
 app.config['UPLOAD_FOLDER'] = 'uploads'
 app.config['ALLOWED_EXTENSIONS'] = {'csv', 'txt'}
+app.config['LABEL_CACHE_FOLDER'] = 'label_cache'
+app.config['LABEL_CACHE_MEMORY_BYTES'] = 32 * 1024 * 1024
+app.config['LABEL_CACHE_DISK_BYTES'] = 256 * 1024 * 1024
+app.config['LABEL_HISTORY_FILE'] = 'label_history.json'
+app.config['PRODUCT_CATALOG_REFRESH_SECONDS'] = 600
+# Instantánea del catálogo compartida (mmap) entre los procesos de la aplicación;
+# vacío para mantener el catálogo en la memoria de cada proceso (el bloqueo
+# entre procesos usa fcntl, así que fuera de POSIX es el valor por defecto)
+app.config['PRODUCT_CATALOG_FILE'] = os.environ.get('SCANNER_CATALOG_FILE',
+                                                    'product_catalog.bin' if os.name == 'posix' else '')
+app.config['OUTBOX_DB'] = 'outbox.db'
+app.config['LOCATION_CACHE_SECONDS'] = 300
+# Perfilado bajo demanda (?profile=1 o cabecera X-Profile: 1); desactivado por defecto
+app.config['PROFILING_ENABLED'] = os.environ.get('SCANNER_PROFILING') == '1'
+app.config['PROFILE_FOLDER'] = 'profiles'
+app.config['PROFILE_MAX_FILES'] = 50
 
-# Asegurar que exista el directorio de uploads
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+# Caché de etiquetas renderizadas (memoria + disco)
+label_cache = LabelCache(
+    app.config['LABEL_CACHE_FOLDER'],
+    max_memory_bytes=app.config['LABEL_CACHE_MEMORY_BYTES'],
+    max_disk_bytes=app.config['LABEL_CACHE_DISK_BYTES']
+)
+
+# Registro de las últimas etiquetas impresas (modo "solo cambios")
+label_history = LabelHistory(app.config['LABEL_HISTORY_FILE'])
 
 # Archivo de configuración
 CONFIG_FILE = 'config.json'
@@ -27,7 +72,22 @@ DEFAULT_CONFIG = {
     'url': 'http://localhost:8069',
     'db': 'odoo12',
     'username': 'admin',
-    'password': 'admin'
+    'password': 'admin',
+    # Timeouts (segundos), reintentos de lecturas y circuito de las llamadas a Odoo
+    'connect_timeout': DEFAULT_CONNECT_TIMEOUT,
+    'read_timeout': DEFAULT_READ_TIMEOUT,
+    'rpc_retries': DEFAULT_RPC_RETRIES,
+    'breaker_failures': DEFAULT_BREAKER_FAILURES,
+    'breaker_reset_seconds': DEFAULT_BREAKER_RESET_SECONDS,
+    # Límite de llamadas simultáneas a Odoo por carril (interactivo / masivo)
+    'rpc_interactive_limit': DEFAULT_INTERACTIVE_LIMIT,
+    'rpc_bulk_limit': DEFAULT_BULK_LIMIT,
+    'rpc_queue_timeout': DEFAULT_QUEUE_TIMEOUT,
+    # Protocolo de conexión con Odoo: 'xmlrpc' o 'jsonrpc'
+    'transport': DEFAULT_TRANSPORT,
+    # Qué hacer si la ubicación origen no tiene stock suficiente:
+    # 'off' (no comprobar), 'flag' (avisar), 'trim' (ajustar cantidades) o 'reject' (no crear)
+    'availability_policy': DEFAULT_AVAILABILITY_POLICY
 }
 
 # Variable global de configuración
@@ -60,193 +120,421 @@ def save_config():
 # Inicializar configuración al iniciar la aplicación
 load_config()
 
+# Cliente de Odoo compartido (timeouts, reintentos y circuito)
+odoo_client = OdooClient(lambda: ODOO_CONFIG)
+
+# Creación de transferencias internas (límites y política de stock)
+inventory_transfers = InventoryTransfers(odoo_client, lambda: ODOO_CONFIG)
+
+# Rutas cuyas llamadas a Odoo van por el carril masivo, para no
+# competir con los escaneos interactivos
+BULK_ENDPOINTS = {'upload_file', 'reports', 'labels'}
+
+@app.before_request
+def assign_rpc_lane():
+    lane = LANE_BULK if request.endpoint in BULK_ENDPOINTS and request.method == 'POST' else LANE_INTERACTIVE
+    g.rpc_lane_token = set_rpc_lane(lane)
+
+@app.teardown_request
+def release_rpc_lane(exc):
+    token = g.pop('rpc_lane_token', None)
+    if token is not None:
+        reset_rpc_lane(token)
+
+@app.before_request
+def start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.request_rpcs_token = start_request_tracking()
+
+@app.after_request
+def record_request_metrics(response):
+    # Las respuestas en streaming (SSE) duran lo que dura la conexión: no se miden
+    token = g.pop('request_rpcs_token', None)
+    if token is None:
+        return response
+    rpcs = finish_request_tracking(token)
+    if not response.is_streamed:
+        endpoint = request.endpoint or 'desconocido'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.request_started, endpoint, request.method, str(response.status_code))
+        HTTP_REQUEST_RPCS.observe(rpcs, endpoint)
+    return response
+
+request_profiler = RequestProfiler(app.config['PROFILE_FOLDER'], app.config['PROFILE_MAX_FILES'])
+
+@app.before_request
+def start_profiling():
+    if not app.config['PROFILING_ENABLED']:
+        return
+    if request.headers.get('X-Profile') == '1' or request.args.get('profile') == '1':
+        # None si ya se está perfilando otra petición
+        g.profile_session = request_profiler.start()
+
+@app.after_request
+def save_profile(response):
+    # Se registra después de las métricas, así que se ejecuta antes que
+    # record_request_metrics y aún puede leer el número de llamadas a Odoo
+    profile_session = g.pop('profile_session', None)
+    if profile_session is not None:
+        name = request_profiler.finish(profile_session, request.endpoint, request.method,
+                                       request.full_path, response.status_code, current_request_rpcs())
+        response.headers['X-Profile-Id'] = name
+    return response
+
+@app.teardown_request
+def discard_profile(exc):
+    # Si la petición falló sin respuesta no se ejecutó save_profile: hay que
+    # detener el perfil para que otras peticiones puedan perfilarse
+    profile_session = g.pop('profile_session', None)
+    if profile_session is not None:
+        request_profiler.discard(profile_session)
+
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
+def load_locations():
+    """Descargar todas las ubicaciones con su ubicación padre (para la caché)"""
+    uid, models = get_odoo_connection()
+    if not uid or not models:
+        return None
+    
+    return models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.location', 'search_read',
+        [[]],
+        {'fields': ['id', 'name', 'complete_name', 'usage', 'location_id']}
+    )
+
+# Árbol de ubicaciones en memoria, refrescado en segundo plano cuando caduca
+location_cache = LocationCache(load_locations, app.config['LOCATION_CACHE_SECONDS'])
+
 def get_odoo_locations():
-    """Obtener lista de ubicaciones desde Odoo"""
-    try:
-        # Conexión con Odoo
-        common = xmlrpc.client.ServerProxy(f"{ODOO_CONFIG['url']}/xmlrpc/2/common")
-        uid = common.authenticate(ODOO_CONFIG['db'], ODOO_CONFIG['username'], ODOO_CONFIG['password'], {})
-        models = xmlrpc.client.ServerProxy(f"{ODOO_CONFIG['url']}/xmlrpc/2/object")
-        
-        # Buscar ubicaciones
-        location_ids = models.execute_kw(
+    """Obtener lista de ubicaciones internas (desde la caché)"""
+    tree = location_cache.get()
+    return tree.internal() if tree else []
+
+def get_location_filter_options():
+    """Ubicaciones internas y zonas para filtrar por destino (desde la caché)"""
+    tree = location_cache.get()
+    return tree.filter_options() if tree else []
+
+def get_location_names(models, uid, location_ids):
+    """
+    Nombres completos de ubicaciones
+    
+    Se toman del árbol en caché; solo las que no están en él se consultan a Odoo.
+    
+    Returns:
+        dict: {location_id: nombre}
+    """
+    tree = location_cache.get()
+    names = {}
+    missing = []
+    for location_id in set(location_ids):
+        name = tree.name(location_id) if tree else None
+        if name is None:
+            missing.append(location_id)
+        else:
+            names[location_id] = name
+    
+    if missing:
+        loc_data = models.execute_kw(
             ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-            'stock.location', 'search_read',
-            [[('usage', '=', 'internal')]], 
+            'stock.location', 'read',
+            [missing],
             {'fields': ['id', 'name', 'complete_name']}
         )
-        
-        return location_ids
-    except Exception as e:
-        print(f"Error al obtener ubicaciones: {str(e)}")
-        return []
+        for loc in loc_data:
+            names[loc['id']] = loc['complete_name'] or loc['name']
+    return names
 
 def get_odoo_connection():
     """Establecer conexión con Odoo y devolver uid y models"""
-    try:
-        common = xmlrpc.client.ServerProxy(f"{ODOO_CONFIG['url']}/xmlrpc/2/common")
-        uid = common.authenticate(ODOO_CONFIG['db'], ODOO_CONFIG['username'], ODOO_CONFIG['password'], {})
-        models = xmlrpc.client.ServerProxy(f"{ODOO_CONFIG['url']}/xmlrpc/2/object")
-        return uid, models
-    except Exception as e:
-        print(f"Error al conectar con Odoo: {str(e)}")
-        return None, None
+    return inventory_transfers.connect()
+
+def odoo_connection_error():
+    """Mensaje de error de conexión, indicando si el circuito está abierto"""
+    return inventory_transfers.connection_error()
+
+def create_inventory_transfer(source_location_id, dest_location_id, products_data, idempotency_key=None):
+    """Crear transferencia interna en Odoo (ver InventoryTransfers.create)"""
+    return inventory_transfers.create(source_location_id, dest_location_id, products_data, idempotency_key)
+
+def send_queued_transfer(source_location_id, dest_location_id, products_data, idempotency_key):
+    """Crear en Odoo la transferencia de un grupo de escaneos en cola"""
+    with rpc_lane(LANE_BULK):
+        return create_inventory_transfer(source_location_id, dest_location_id, products_data, idempotency_key)
 
-def create_inventory_transfer(source_location_id, dest_location_id, products_data):
+# Bandeja de salida persistente: los escaneos se confirman al instante y se
+# envían a Odoo en segundo plano
+transfer_outbox = TransferOutbox(app.config['OUTBOX_DB'], send_queued_transfer)
+
+def open_draft_transfer(source_location_id, dest_location_id, session_key):
+    """Crear la transferencia en borrador de una sesión de escaneo incremental"""
+    uid, models = get_odoo_connection()
+    if not uid or not models:
+        raise ConnectionError(odoo_connection_error())
+    
+    picking_type_ids = models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.picking.type', 'search',
+        [[('code', '=', 'internal')]]
+    )
+    if not picking_type_ids:
+        raise ValueError('No se encontró tipo de transferencia interna')
+    
+    return models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.picking', 'create', [{
+            'picking_type_id': picking_type_ids[0],
+            'location_id': int(source_location_id),
+            'location_dest_id': int(dest_location_id),
+            'origin': f'Transferencia desde App Scanner [{session_key}]'
+        }]
+    )
+
+def apply_scanned_products(picking_id, source_location_id, dest_location_id, new_products, known_moves, retry=False):
     """
-    Crear transferencia interna en Odoo
+    Añadir escaneos a una transferencia en borrador
     
     Args:
+        picking_id: ID de la transferencia en borrador
         source_location_id: ID de la ubicación origen
         dest_location_id: ID de la ubicación destino
-        products_data: diccionario {barcode: quantity}
+        new_products: {barcode: cantidad} de productos sin movimiento todavía
+        known_moves: {barcode: (move_id, cantidad total)} de movimientos a actualizar
+        retry: el intento anterior falló; puede que Odoo sí creara los
+            movimientos y se perdiera la respuesta, así que se buscan antes
+            de crearlos otra vez
     
     Returns:
-        dict: Resultado de la operación
+        tuple: ({barcode: move_id} creados, [barcodes no encontrados])
     """
-    try:
-        # Log para depuración
-        print(f"Source location ID: {source_location_id}, type: {type(source_location_id)}")
-        print(f"Dest location ID: {dest_location_id}, type: {type(dest_location_id)}")
-        print(f"Número de productos diferentes: {len(products_data)}")
-        print(f"Total de unidades: {sum(products_data.values())}")
-        
-        # Verificar que las ubicaciones son válidas
-        if not source_location_id or not dest_location_id:
-            return {'success': False, 'message': 'Debes seleccionar ubicaciones de origen y destino'}
-            
-        # Convertir a enteros después de validar
-        source_location_id = int(source_location_id)
-        dest_location_id = int(dest_location_id)
-        
-        # Limitar cantidades grandes de productos (XML-RPC generalmente tiene límite de 2^31-1)
-        max_int = 100  # Limitamos a 100 unidades por producto para evitar problemas
-        limited_products = {}
-        for barcode, qty in products_data.items():
-            if qty > max_int:
-                print(f"Producto {barcode} tiene {qty} unidades, limitando a {max_int}")
-                limited_products[barcode] = max_int
-            else:
-                limited_products[barcode] = qty
-        
-        # Si hay más de 20 productos diferentes, dividirlos en lotes
-        max_products = 20
-        if len(limited_products) > max_products:
-            print(f"Demasiados productos diferentes, limitando a {max_products}")
-            limited_products = dict(list(limited_products.items())[:max_products])
-        
-        # Conexión con Odoo
-        uid, models = get_odoo_connection()
-        if not uid or not models:
-            return {'success': False, 'message': 'Error de conexión con Odoo'}
-        
-        # Crear picking (transferencia)
-        picking_type_ids = models.execute_kw(
-            ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-            'stock.picking.type', 'search',
-            [[('code', '=', 'internal')]]
-        )
-        
-        if not picking_type_ids:
-            return {'success': False, 'message': 'No se encontró tipo de transferencia interna'}
-        
-        picking_vals = {
-            'picking_type_id': picking_type_ids[0],
-            'location_id': source_location_id,
-            'location_dest_id': dest_location_id,
-            'origin': 'Transferencia desde App Scanner'
-        }
-        
-        picking_id = models.execute_kw(
+    uid, models = get_odoo_connection()
+    if not uid or not models:
+        raise ConnectionError(odoo_connection_error())
+    
+    # Las cantidades se escriben en valor absoluto, así que repetir estas
+    # escrituras en un reintento no duplica nada. Los movimientos con la
+    # misma cantidad total comparten una sola llamada.
+    by_quantity = {}
+    for move_id, total in known_moves.values():
+        by_quantity.setdefault(total, []).append(move_id)
+    if by_quantity:
+        odoo_client.execute_many(ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'], [
+            ('stock.move', 'write', [move_ids, {'product_uom_qty': total}])
+            for total, move_ids in by_quantity.items()
+        ])
+    
+    if not new_products:
+        return {}, []
+    
+    # Resolver todos los códigos nuevos con una sola consulta
+    products = models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'product.product', 'search_read',
+        [[('barcode', 'in', list(new_products))]],
+        {'fields': ['id', 'barcode', 'uom_id']}
+    )
+    by_barcode = {}
+    for product in products:
+        by_barcode.setdefault(product['barcode'], product)
+    
+    barcodes = [barcode for barcode in new_products if barcode in by_barcode]
+    not_found = [barcode for barcode in new_products if barcode not in by_barcode]
+    if not barcodes:
+        return {}, not_found
+    
+    created = {}
+    if retry:
+        # Reutilizar los movimientos que ya existen en el borrador; la
+        # cantidad nueva es el total del producto, así que se escribe tal cual
+        existing = models.execute_kw(
             ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-            'stock.picking', 'create', [picking_vals]
+            'stock.move', 'search_read',
+            [[('picking_id', '=', picking_id),
+              ('product_id', 'in', [by_barcode[barcode]['id'] for barcode in barcodes])]],
+            {'fields': ['id', 'product_id']}
         )
+        move_by_product = {}
+        for move in existing:
+            move_by_product.setdefault(move['product_id'][0], move['id'])
+        by_quantity = {}
+        for barcode in barcodes:
+            move_id = move_by_product.get(by_barcode[barcode]['id'])
+            if move_id:
+                created[barcode] = move_id
+                by_quantity.setdefault(new_products[barcode], []).append(move_id)
+        if by_quantity:
+            odoo_client.execute_many(ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'], [
+                ('stock.move', 'write', [move_ids, {'product_uom_qty': total}])
+                for total, move_ids in by_quantity.items()
+            ])
+        barcodes = [barcode for barcode in barcodes if barcode not in created]
+        if not barcodes:
+            return created, not_found
+    
+    move_ids = models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.move', 'create', [[{
+            'name': f'Movimiento de {barcode}',
+            'product_id': by_barcode[barcode]['id'],
+            'product_uom_qty': new_products[barcode],
+            'picking_id': picking_id,
+            'location_id': int(source_location_id),
+            'location_dest_id': int(dest_location_id),
+            'product_uom': by_barcode[barcode]['uom_id'][0] if by_barcode[barcode].get('uom_id') else 1,
+        } for barcode in barcodes]]
+    )
+    if not isinstance(move_ids, list):
+        move_ids = [move_ids]
+    created.update(zip(barcodes, move_ids))
+    return created, not_found
+
+def confirm_draft_transfer(picking_id, source_location_id, quantities, moves):
+    """
+    Confirmar la transferencia de una sesión de escaneo
+    
+    Antes de confirmar aplica a las cantidades acumuladas los mismos límites
+    y la misma política de disponibilidad que create_inventory_transfer: los
+    movimientos que quedan fuera se eliminan y las cantidades recortadas se
+    reescriben. Si la política rechaza la transferencia, o no queda nada que
+    transferir, se elimina el borrador.
+    
+    Args:
+        picking_id: ID de la transferencia en borrador
+        source_location_id: ID de la ubicación origen
+        quantities: {barcode: cantidad aplicada}
+        moves: {barcode: ID del movimiento}
+    
+    Returns:
+        dict: resultado ('success', 'products_count' o 'message', 'shortages',
+            y los códigos que no se transfieren por el límite de productos
+            ('products_dropped') o se recortan a 100 unidades ('products_capped'))
+    """
+    uid, models = get_odoo_connection()
+    if not uid or not models:
+        raise ConnectionError(odoo_connection_error())
+    
+    # Movimientos que siguen en el borrador (un reintento puede encontrar
+    # eliminados los que ya se descartaron)
+    barcode_by_move = {move_id: barcode for barcode, move_id in moves.items()}
+    existing = models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.move', 'search_read',
+        [[('id', 'in', list(barcode_by_move))]],
+        {'fields': ['id', 'product_id']}
+    )
+    product_ids = {barcode_by_move[move['id']]: move['product_id'][0] for move in existing}
+    
+    limited = limit_transfer_products({
+        barcode: qty for barcode, qty in quantities.items() if barcode in product_ids
+    })
+    dropped_barcodes = [barcode for barcode in product_ids if barcode not in limited]
+    capped_barcodes = [barcode for barcode, qty in limited.items() if qty < quantities[barcode]]
+    requested, shortages, rejection = inventory_transfers.apply_availability_policy(
+        models, uid, source_location_id, limited, product_ids
+    )
+    if rejection:
+        discard_draft_transfer(picking_id)
+        return {'success': False, 'message': rejection, 'shortages': shortages}
+    
+    # Quitar lo que queda fuera de los límites o sin stock y reescribir lo recortado
+    dropped = [moves[barcode] for barcode in product_ids if barcode not in requested]
+    calls = []
+    if dropped:
+        calls.append(('stock.move', 'unlink', [dropped]))
+    by_quantity = {}
+    for barcode, qty in requested.items():
+        if qty != quantities[barcode]:
+            by_quantity.setdefault(qty, []).append(moves[barcode])
+    calls += [('stock.move', 'write', [move_ids, {'product_uom_qty': qty}]) for qty, move_ids in by_quantity.items()]
+    if calls:
+        odoo_client.execute_many(ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'], calls)
+    
+    models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.picking', 'action_confirm', [picking_id]
+    )
+    return {'success': True, 'products_count': len(requested), 'shortages': shortages,
+            'products_dropped': dropped_barcodes, 'products_capped': capped_barcodes}
+
+def discard_draft_transfer(picking_id):
+    """Eliminar la transferencia en borrador de una sesión descartada"""
+    uid, models = get_odoo_connection()
+    if not uid or not models:
+        raise ConnectionError(odoo_connection_error())
+    models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.picking', 'unlink', [picking_id]
+    )
+
+# Sesiones de escaneo incremental: la transferencia se va construyendo en
+# Odoo mientras se escanea y al final solo se confirma. Se guardan en la
+# base de datos de la bandeja para sobrevivir a reinicios y poder atenderse
+# desde cualquier proceso de la aplicación
+scan_sessions = ScanSessionManager(app.config['OUTBOX_DB'], open_draft_transfer, apply_scanned_products,
+                                   confirm_draft_transfer, discard_draft_transfer)
+
+RECEPTION_STATES = ['assigned', 'partially_available', 'confirmed']
+
+def read_reception_transfers(models, uid, domain):
+    """
+    Leer transferencias con los datos que muestra la recepción
+    
+    Args:
+        models: proxy de modelos de Odoo
+        uid: ID de usuario
+        domain: dominio de búsqueda sobre stock.picking
+    
+    Returns:
+        list: transferencias con nombres de ubicaciones, estado y fecha formateados
+    """
+    transfers = models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.picking', 'search_read',
+        [domain],
+        {'fields': ['id', 'name', 'origin', 'state', 'location_id', 'location_dest_id', 'move_line_ids', 'create_date', 'write_date']}
+    )
+    
+    # Obtener nombres de ubicaciones
+    location_ids = set()
+    for transfer in transfers:
+        location_ids.add(transfer['location_id'][0])
+        location_ids.add(transfer['location_dest_id'][0])
+    
+    locations = get_location_names(models, uid, location_ids)
+    
+    # Estado en texto
+    states = {
+        'draft': 'Borrador',
+        'confirmed': 'Esperando disponibilidad',
+        'waiting': 'Esperando otra operación',
+        'partially_available': 'Parcialmente disponible',
+        'assigned': 'Listo para transferir',
+        'done': 'Realizado',
+        'cancel': 'Cancelado'
+    }
+    
+    for transfer in transfers:
+        # Añadir nombres de ubicaciones
+        transfer['location_name'] = locations.get(transfer['location_id'][0], 'Desconocido')
+        transfer['location_dest_name'] = locations.get(transfer['location_dest_id'][0], 'Desconocido')
         
-        # Procesar cada producto
-        moves_to_create = []
-        products_not_found = []
-        
-        for barcode, qty in limited_products.items():
-            # Buscar producto por código de barras
-            product_ids = models.execute_kw(
-                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                'product.product', 'search',
-                [[('barcode', '=', barcode)]]
-            )
-            
-            if not product_ids:
-                products_not_found.append(barcode)
-                continue
-                
-            product_id = product_ids[0]
-            
-            # Obtener la unidad de medida del producto
-            product_data = models.execute_kw(
-                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                'product.product', 'read',
-                [product_id],
-                {'fields': ['uom_id']}
-            )
-            
-            uom_id = product_data[0]['uom_id'][0] if product_data and product_data[0].get('uom_id') else 1
-            
-            # Crear movimiento de stock
-            move_vals = {
-                'name': f'Movimiento de {barcode}',
-                'product_id': product_id,
-                'product_uom_qty': qty,
-                'picking_id': picking_id,
-                'location_id': source_location_id,
-                'location_dest_id': dest_location_id,
-                'product_uom': uom_id,
-            }
-            
-            moves_to_create.append(move_vals)
-        
-        # Crear los movimientos en lote, máximo 5 a la vez para evitar límites
-        batch_size = 5
-        for i in range(0, len(moves_to_create), batch_size):
-            batch = moves_to_create[i:i+batch_size]
-            models.execute_kw(
-                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                'stock.move', 'create', [batch]
-            )
-            print(f"Creado lote {i//batch_size + 1} de {(len(moves_to_create) + batch_size - 1) // batch_size}")
+        # Contar productos (una línea de movimiento por ID, sin leerlas)
+        transfer['products_count'] = len(transfer['move_line_ids'])
         
-        # Confirmar la transferencia si se crearon movimientos
-        if moves_to_create:
-            models.execute_kw(
-                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                'stock.picking', 'action_confirm', [picking_id]
-            )
-            
-            result = {
-                'success': True,
-                'picking_id': picking_id,
-                'products_count': len(moves_to_create),
-                'products_not_found': products_not_found
-            }
-        else:
-            # Eliminar picking si no hay productos válidos
-            models.execute_kw(
-                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                'stock.picking', 'unlink', [picking_id]
-            )
-            result = {
-                'success': False,
-                'message': 'No se encontraron productos válidos',
-                'products_not_found': products_not_found
-            }
-            
-        return result
+        transfer['state_label'] = states.get(transfer['state'], transfer['state'])
         
-    except Exception as e:
-        print(f"Error en create_inventory_transfer: {str(e)}")
-        return {'success': False, 'message': str(e)}
+        # Formatear fecha
+        if transfer.get('create_date'):
+            try:
+                date_obj = datetime.strptime(transfer['create_date'], "%Y-%m-%d %H:%M:%S")
+                transfer['create_date'] = date_obj.strftime("%d/%m/%Y %H:%M")
+            except:
+                pass
+    
+    return transfers
 
 def get_pending_transfers(location_id=None, search_term=None):
     """Obtener transferencias pendientes para recepción"""
@@ -256,85 +544,48 @@ def get_pending_transfers(location_id=None, search_term=None):
             return []
         
         # Construir dominio para búsqueda
-        domain = [('state', 'in', ['assigned', 'partially_available', 'confirmed'])]
+        domain = [('state', 'in', RECEPTION_STATES)]
         
         if location_id:
-            domain.append(('location_dest_id', '=', int(location_id)))
+            # La ubicación incluye sus sububicaciones (p. ej. una zona completa)
+            tree = location_cache.get()
+            subtree = tree.subtree(location_id) if tree else None
+            if subtree:
+                domain.append(('location_dest_id', 'in', sorted(subtree)))
+            else:
+                domain.append(('location_dest_id', 'child_of', int(location_id)))
             
         if search_term:
             domain.append('|')
             domain.append(('name', 'ilike', search_term))
             domain.append(('origin', 'ilike', search_term))
         
-        # Obtener transferencias
-        transfers = models.execute_kw(
-            ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-            'stock.picking', 'search_read',
-            [domain],
-            {'fields': ['id', 'name', 'origin', 'state', 'location_id', 'location_dest_id', 'move_line_ids', 'create_date']}
-        )
-        
-        # Obtener nombres de ubicaciones
-        location_ids = set()
-        for transfer in transfers:
-            location_ids.add(transfer['location_id'][0])
-            location_ids.add(transfer['location_dest_id'][0])
-        
-        locations = {}
-        if location_ids:
-            loc_data = models.execute_kw(
-                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                'stock.location', 'read',
-                [list(location_ids)],
-                {'fields': ['id', 'name', 'complete_name']}
-            )
-            for loc in loc_data:
-                locations[loc['id']] = loc['complete_name'] or loc['name']
-        
-        # Contar productos por transferencia
-        for transfer in transfers:
-            # Añadir nombres de ubicaciones
-            transfer['location_name'] = locations.get(transfer['location_id'][0], 'Desconocido')
-            transfer['location_dest_name'] = locations.get(transfer['location_dest_id'][0], 'Desconocido')
-            
-            # Contar productos
-            if transfer['move_line_ids']:
-                move_lines = models.execute_kw(
-                    ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                    'stock.move.line', 'read',
-                    [transfer['move_line_ids']],
-                    {'fields': ['product_id', 'product_uom_qty']}
-                )
-                transfer['products_count'] = len(move_lines)
-            else:
-                transfer['products_count'] = 0
-                
-            # Estado en texto
-            states = {
-                'draft': 'Borrador',
-                'confirmed': 'Esperando disponibilidad',
-                'waiting': 'Esperando otra operación',
-                'partially_available': 'Parcialmente disponible',
-                'assigned': 'Listo para transferir',
-                'done': 'Realizado',
-                'cancel': 'Cancelado'
-            }
-            transfer['state_label'] = states.get(transfer['state'], transfer['state'])
-            
-            # Formatear fecha
-            if transfer.get('create_date'):
-                try:
-                    date_obj = datetime.strptime(transfer['create_date'], "%Y-%m-%d %H:%M:%S")
-                    transfer['create_date'] = date_obj.strftime("%d/%m/%Y %H:%M")
-                except:
-                    pass
-        
-        return transfers
+        return read_reception_transfers(models, uid, domain)
         
     except Exception as e:
         print(f"Error al obtener transferencias: {str(e)}")
         return []
 
+def fetch_board_transfers(since=None):
+    """
+    Transferencias para el tablero de recepción en vivo
+    
+    Args:
+        since: si se indica, solo las modificadas desde ese write_date (en
+            cualquier estado); si no, todas las pendientes
+    """
+    uid, models = get_odoo_connection()
+    if not uid or not models:
+        raise ConnectionError(odoo_connection_error())
+    
+    with rpc_lane(LANE_BULK):
+        if since is None:
+            return read_reception_transfers(models, uid, [('state', 'in', RECEPTION_STATES)])
+        return read_reception_transfers(models, uid, [('write_date', '>=', since)])
+
+# Un solo sondeo de Odoo para todos los navegadores con la recepción abierta
+reception_board = ReceptionBoard(fetch_board_transfers, fetch_board_transfers)
+
 def get_transfer_details(transfer_id):
     """Obtener detalles de una transferencia específica"""
     try:
@@ -355,18 +606,23 @@ def get_transfer_details(transfer_id):
             
         transfer = transfer_data[0]
         
-        # Obtener nombres de ubicaciones
-        loc_data = models.execute_kw(
-            ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-            'stock.location', 'read',
-            [[transfer['location_id'][0], transfer['location_dest_id'][0]]],
-            {'fields': ['id', 'name', 'complete_name']}
-        )
+        # Las ubicaciones y los movimientos solo dependen de la transferencia:
+        # se consultan en paralelo (los nombres suelen salir de la caché)
+        def read_locations():
+            return get_location_names(models, uid, [transfer['location_id'][0], transfer['location_dest_id'][0]])
+        
+        def read_moves():
+            if not transfer['move_ids_without_package']:
+                return []
+            return models.execute_kw(
+                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+                'stock.move', 'read',
+                [transfer['move_ids_without_package']],
+                {'fields': ['product_id', 'product_uom_qty', 'state']}
+            )
+        
+        locations, moves = odoo_client.run_concurrently(read_locations, read_moves)
         
-        locations = {}
-        for loc in loc_data:
-            locations[loc['id']] = loc['complete_name'] or loc['name']
-            
         transfer['location_name'] = locations.get(transfer['location_id'][0], 'Desconocido')
         transfer['location_dest_name'] = locations.get(transfer['location_dest_id'][0], 'Desconocido')
         
@@ -393,14 +649,7 @@ def get_transfer_details(transfer_id):
         # Obtener productos de la transferencia
         productos = []
         
-        if transfer['move_ids_without_package']:
-            moves = models.execute_kw(
-                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                'stock.move', 'read',
-                [transfer['move_ids_without_package']],
-                {'fields': ['product_id', 'product_uom_qty', 'state']}
-            )
-            
+        if moves:
             product_ids = [move['product_id'][0] for move in moves]
             products_data = models.execute_kw(
                 ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
@@ -433,7 +682,7 @@ def validate_transfer(transfer_id):
     try:
         uid, models = get_odoo_connection()
         if not uid or not models:
-            return False, "Error de conexión con Odoo"
+            return False, odoo_connection_error()
         
         # Validar la transferencia
         result = models.execute_kw(
@@ -459,6 +708,362 @@ def validate_transfer(transfer_id):
         error_msg = str(e)
         return False, f"Error al validar transferencia: {error_msg}"
 
+def validate_transfers(transfer_ids):
+    """
+    Validar varias transferencias en Odoo con el mínimo de llamadas
+    
+    Lee el estado de todas las transferencias en una sola consulta, llama a
+    button_validate con la lista completa y procesa en lote el asistente de
+    transferencia inmediata si Odoo lo devuelve. Si Odoo rechaza la llamada
+    en lote (algunas versiones solo validan una transferencia por llamada),
+    se valida una por una. Al final se releen los estados para informar del
+    resultado de cada transferencia.
+    
+    Args:
+        transfer_ids: lista de IDs de transferencias
+    
+    Returns:
+        dict: {transfer_id: (éxito, mensaje)}
+    """
+    transfer_ids = [int(transfer_id) for transfer_id in transfer_ids]
+    results = {}
+    
+    try:
+        uid, models = get_odoo_connection()
+        if not uid or not models:
+            message = odoo_connection_error()
+            return {transfer_id: (False, message) for transfer_id in transfer_ids}
+        
+        pickings = models.execute_kw(
+            ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+            'stock.picking', 'read',
+            [transfer_ids],
+            {'fields': ['id', 'name', 'state']}
+        )
+        found = {picking['id']: picking for picking in pickings}
+        
+        to_validate = []
+        for transfer_id in transfer_ids:
+            picking = found.get(transfer_id)
+            if not picking:
+                results[transfer_id] = (False, "No se encontró la transferencia")
+            elif picking['state'] in ('done', 'cancel'):
+                results[transfer_id] = (False, f"{picking['name']}: ya está {'realizada' if picking['state'] == 'done' else 'cancelada'}")
+            else:
+                to_validate.append(transfer_id)
+        
+        if not to_validate:
+            return results
+        
+        try:
+            result = models.execute_kw(
+                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+                'stock.picking', 'button_validate',
+                [to_validate]
+            )
+            
+            # El asistente de transferencia inmediata cubre todas las transferencias del lote
+            if isinstance(result, dict) and result.get('res_model') == 'stock.immediate.transfer':
+                wizard_id = result.get('res_id')
+                if wizard_id:
+                    models.execute_kw(
+                        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+                        'stock.immediate.transfer', 'process',
+                        [wizard_id]
+                    )
+        except xmlrpc.client.Fault as e:
+            print(f"Validación en lote rechazada por Odoo ({e.faultString}); validando una por una")
+            for transfer_id in to_validate:
+                success, message = validate_transfer(transfer_id)
+                if not success:
+                    results[transfer_id] = (False, message)
+        
+        # Releer estados para confirmar qué quedó validado
+        final_states = models.execute_kw(
+            ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+            'stock.picking', 'read',
+            [to_validate],
+            {'fields': ['id', 'state']}
+        )
+        states = {picking['id']: picking['state'] for picking in final_states}
+        
+        for transfer_id in to_validate:
+            if transfer_id in results:
+                continue
+            name = found[transfer_id]['name']
+            if states.get(transfer_id) == 'done':
+                results[transfer_id] = (True, f"{name}: validada correctamente")
+            else:
+                # Otro asistente (p. ej. pedido pendiente) requiere atención manual
+                results[transfer_id] = (False, f"{name}: requiere revisión manual (estado: {states.get(transfer_id, 'desconocido')})")
+        
+        return results
+        
+    except Exception as e:
+        error_msg = str(e)
+        for transfer_id in transfer_ids:
+            results.setdefault(transfer_id, (False, f"Error al validar transferencia: {error_msg}"))
+        return results
+
+def count_transfer_moves(transfer_ids):
+    """
+    Contar los movimientos de varias transferencias con una sola consulta
+    
+    Se cuentan los mismos movimientos que muestra la página de detalle
+    (move_ids_without_package), que son los que se pueden verificar.
+    """
+    uid, models = get_odoo_connection()
+    if not uid or not models:
+        return None
+    
+    pickings = models.execute_kw(
+        ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+        'stock.picking', 'read',
+        [[int(transfer_id) for transfer_id in transfer_ids]],
+        {'fields': ['id', 'move_ids_without_package']}
+    )
+    return {picking['id']: len(picking['move_ids_without_package']) for picking in pickings}
+
+def render_and_print_labels(label_items, printer=None, cups_server=None):
+    """
+    Renderizar (desde la caché) e imprimir un lote de etiquetas
+    
+    Args:
+        label_items: lista de tuplas (barcode, nombre, precio, copias)
+        printer: impresora destino (si está vacía solo se generan)
+        cups_server: servidor CUPS (opcional)
+    
+    Returns:
+        tuple: (etiquetas generadas, etiquetas enviadas a la impresora)
+    """
+    generated_count = sum(copies for _, _, _, copies in label_items)
+    with phase('render'):
+        labels_to_print = [
+            (label_cache.get(barcode, name, price), copies)
+            for barcode, name, price, copies in label_items
+        ]
+    
+    # Imprimir si se seleccionó impresora, por una sola conexión
+    printed_count = 0
+    if printer and labels_to_print:
+        from label_generator import print_labels
+        
+        with phase('print'):
+            printed_count = print_labels(labels_to_print, printer, cups_server)
+        
+        # Registrar lo impreso solo si el lote completo llegó a la impresora
+        if printed_count == generated_count:
+            label_history.record(label_items)
+    
+    return generated_count, printed_count
+
+def search_read_paged(models, uid, model, domain, fields, batch_size=2000, lane=None):
+    """
+    Leer registros con search_read en lotes ordenados por id (generador)
+    
+    Args:
+        lane: carril de RPC para pedir cada página (opcional). Se fija solo
+            mientras dura cada llamada y no entre un yield y el siguiente:
+            quien consume el generador puede hacerlo en otro contexto.
+    """
+    offset = 0
+    while True:
+        token = set_rpc_lane(lane) if lane else None
+        try:
+            records = models.execute_kw(
+                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+                model, 'search_read',
+                [domain],
+                {'fields': fields, 'order': 'id', 'offset': offset, 'limit': batch_size}
+            )
+        finally:
+            if token is not None:
+                reset_rpc_lane(token)
+        for record in records:
+            yield record
+        if len(records) < batch_size:
+            break
+        offset += batch_size
+
+def load_catalog_records():
+    """Registros de productos con código de barras, leídos de Odoo por páginas (generador)"""
+    with rpc_lane(LANE_BULK):
+        uid, models = get_odoo_connection()
+    if not uid or not models:
+        return None
+    return search_read_paged(models, uid, 'product.product', [('barcode', '!=', False)], CATALOG_FIELDS,
+                             lane=LANE_BULK)
+
+# Catálogo para búsquedas exactas por código de barras: archivo compartido
+# por todos los procesos o, si no se configura, catálogo compacto en memoria
+if app.config['PRODUCT_CATALOG_FILE']:
+    product_catalog = SharedProductCatalog(app.config['PRODUCT_CATALOG_FILE'], load_catalog_records,
+                                           app.config['PRODUCT_CATALOG_REFRESH_SECONDS'])
+else:
+    product_catalog = ProductCatalog(load_catalog_records, app.config['PRODUCT_CATALOG_REFRESH_SECONDS'])
+
+# Índice local de productos para búsquedas por prefijo. Se construye con los
+# registros del catálogo de códigos de barras (sin otra descarga de Odoo) y
+# se reconstruye cada vez que el catálogo cambia de versión
+product_index = ProductIndex(product_catalog.records, version=lambda: product_catalog.loaded_at)
+
+def get_products_by_barcode(barcodes):
+    """
+    Datos de varios productos por código de barras
+    
+    Usa el catálogo local y consulta a Odoo, en una sola llamada, solo los
+    códigos que no contiene (o todos si aún se está cargando).
+    
+    Returns:
+        dict: {barcode: producto con CATALOG_FIELDS}
+    """
+    product_catalog.start()
+    found, missing = product_catalog.lookup_many(barcodes)
+    if missing:
+        uid, models = get_odoo_connection()
+        if uid and models:
+            for product in models.execute_kw(
+                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+                'product.product', 'search_read',
+                [[('barcode', 'in', missing)]],
+                {'fields': CATALOG_FIELDS}
+            ):
+                found.setdefault(product['barcode'], product)
+    return found
+
+def get_products_changed_since(since=None, batch_size=2000):
+    """
+    Obtener productos con código de barras modificados desde una fecha
+    
+    Incluye los cambios hechos en la plantilla del producto (donde vive
+    list_price). Los productos se leen en lotes con search_read.
+    
+    Args:
+        since: fecha 'YYYY-MM-DD HH:MM:SS' (UTC); si es None se lee todo el catálogo
+        batch_size: número de productos por consulta
+    
+    Returns:
+        list: tuplas (barcode, nombre, precio, 1) o None si hay error
+    """
+    try:
+        uid, models = get_odoo_connection()
+        if not uid or not models:
+            return None
+        
+        domain = [('barcode', '!=', False)]
+        if since:
+            domain += ['|', ('write_date', '>', since), ('product_tmpl_id.write_date', '>', since)]
+        
+        return [
+            (product['barcode'], product.get('name', 'Desconocido'), product.get('list_price', 0.0), 1)
+            for product in search_read_paged(models, uid, 'product.product', domain,
+                                             ['name', 'barcode', 'list_price'], batch_size)
+        ]
+        
+    except Exception as e:
+        print(f"Error al obtener productos modificados: {str(e)}")
+        return None
+
+def get_picking_label_items(picking_id):
+    """
+    Obtener las etiquetas a imprimir para una transferencia completa
+    
+    Lee los movimientos y sus productos en dos consultas en lote y calcula
+    el número de etiquetas de cada producto a partir de product_uom_qty.
+    
+    Args:
+        picking_id: ID de la transferencia (stock.picking)
+    
+    Returns:
+        tuple: (lista de (barcode, nombre, precio, copias) o None si hay error,
+                lista de nombres de productos sin código de barras)
+    """
+    try:
+        uid, models = get_odoo_connection()
+        if not uid or not models:
+            return None, []
+        
+        moves = models.execute_kw(
+            ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+            'stock.move', 'search_read',
+            [[('picking_id', '=', int(picking_id))]],
+            {'fields': ['product_id', 'product_uom_qty']}
+        )
+        
+        # Sumar cantidades por producto
+        quantities = Counter()
+        for move in moves:
+            if move.get('product_id'):
+                quantities[move['product_id'][0]] += move['product_uom_qty'] or 0
+        
+        if not quantities:
+            return [], []
+        
+        products = models.execute_kw(
+            ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
+            'product.product', 'read',
+            [list(quantities)],
+            {'fields': ['name', 'barcode', 'list_price']}
+        )
+        
+        items = []
+        missing_barcode = []
+        for product in products:
+            copies = int(math.ceil(quantities[product['id']]))
+            if copies <= 0:
+                continue
+            if not product.get('barcode'):
+                missing_barcode.append(product.get('name', str(product['id'])))
+                continue
+            items.append((product['barcode'], product.get('name', 'Desconocido'), product.get('list_price', 0.0), copies))
+        
+        return items, missing_barcode
+        
+    except Exception as e:
+        print(f"Error al obtener productos de la transferencia {picking_id}: {str(e)}")
+        return None, []
+
+@app.route('/health')
+def health():
+    """Estado de la aplicación y del circuito de conexión con Odoo"""
+    breaker = odoo_client.breaker.snapshot()
+    status = 'ok' if breaker['state'] == 'closed' else 'degraded'
+    return jsonify({
+        'status': status,
+        'odoo': breaker,
+        'rpc_gate': odoo_client.bulkhead.snapshot(),
+        'outbox': {key: value for key, value in transfer_outbox.stats().items() if key != 'recent_failures'},
+        'product_catalog': product_catalog.stats()
+    }), (200 if status == 'ok' else 503)
+
+@app.route('/metrics')
+def metrics():
+    """Métricas de llamadas a Odoo y de rutas en formato de Prometheus"""
+    return Response(metrics_registry.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/profiles')
+def profiles():
+    """Perfiles de peticiones guardados"""
+    return render_template('profiles.html', profiles=request_profiler.list(),
+                           enabled=app.config['PROFILING_ENABLED'])
+
+@app.route('/profiles/<name>')
+def profile_detail(name):
+    """Estadísticas de un perfil en texto, o el archivo .prof con ?download=1"""
+    if request.args.get('download') == '1':
+        path = request_profiler.path(name)
+        if path is None:
+            abort(404)
+        return send_file(path, as_attachment=True, download_name=f'{name}.prof')
+    
+    sort = request.args.get('sort', 'cumulative')
+    if sort not in ('cumulative', 'tottime', 'ncalls'):
+        sort = 'cumulative'
+    stats = request_profiler.stats_text(name, sort=sort)
+    if stats is None:
+        abort(404)
+    return Response(stats, mimetype='text/plain')
+
 @app.route('/get_printers')
 def get_printers():
     """API para obtener impresoras de un servidor CUPS"""
@@ -488,11 +1093,17 @@ def lookup_product():
     if not barcode:
         return jsonify({'success': False, 'message': 'No se proporcionó un código de barras'})
     
+    # Primero en el catálogo local; los productos nuevos se buscan en Odoo
+    product_catalog.start()
+    product = product_catalog.get(barcode)
+    if product:
+        return jsonify({'success': True, 'name': product['name'], 'price': product['list_price']})
+    
     try:
         # Buscar producto en Odoo
         uid, models = get_odoo_connection()
         if not uid or not models:
-            return jsonify({'success': False, 'message': 'Error de conexión con Odoo'})
+            return jsonify({'success': False, 'message': odoo_connection_error()})
         
         product_ids = models.execute_kw(
             ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
@@ -520,6 +1131,27 @@ def lookup_product():
         return jsonify({'success': False, 'message': str(e)})
 
 
+@app.route('/search_products')
+def search_products():
+    """API de búsqueda por prefijo de código de barras o nombre (typeahead)"""
+    query = request.args.get('q', '').strip()
+    try:
+        limit = min(max(int(request.args.get('limit', 10)), 1), 50)
+    except ValueError:
+        limit = 10
+    
+    # El índice se construye en segundo plano en la primera búsqueda, a
+    # partir del catálogo de códigos de barras
+    product_catalog.start()
+    product_index.start()
+    
+    results = [
+        {'barcode': barcode, 'name': name, 'price': price}
+        for barcode, name, price in product_index.search(query, limit)
+    ]
+    return jsonify({'success': True, 'ready': product_index.ready, 'results': results})
+
+
 @app.route('/labels', methods=['GET', 'POST'])
 def labels():
     """Página de generación de etiquetas"""
@@ -556,21 +1188,24 @@ def labels():
                     # Convertir precio a número
                     price = float(price)
                     
-                    # Generar y guardar etiqueta
-                    filename = f"label_{barcode}.png"
-                    filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-                    generate_product_label(barcode, product_name, price, filepath)
+                    # Obtener etiqueta desde la caché (se renderiza solo si cambió)
+                    with phase('render'):
+                        label_key, label = label_cache.get_entry(barcode, product_name, price)
                     
                     # Si se seleccionó impresora, imprimir
                     if printer:
-                        success = generate_and_print(barcode, product_name, price, printer)
+                        from label_generator import print_label
+                        
+                        with phase('print'):
+                            success = print_label(label, printer, cups_server) is not None
                         if success:
+                            label_history.record([(barcode, product_name, price)])
                             flash('Etiqueta enviada a impresión', 'success')
                         else:
                             flash('Error al imprimir la etiqueta', 'error')
                     
                     # URL para mostrar/descargar la etiqueta
-                    label_url = f"/static/uploads/{filename}"
+                    label_url = url_for('label_image', key=label_key)
                     return render_template('labels.html', printers=printers, label_url=label_url)
                     
                 except ValueError:
@@ -598,54 +1233,29 @@ def labels():
                 
                 try:
                     # Leer el archivo CSV
-                    barcodes = []
-                    with open(filepath, 'r') as csvfile:
-                        csv_reader = csv.reader(csvfile)
-                        for row in csv_reader:
-                            if row and row[0].strip():
-                                barcodes.append(row[0].strip())
-                    
-                    # Obtener información de productos desde Odoo
-                    product_data = {}
-                    uid, models = get_odoo_connection()
-                    if uid and models:
-                        for barcode in list(set(barcodes)):
-                            product_ids = models.execute_kw(
-                                ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                                'product.product', 'search',
-                                [[('barcode', '=', barcode)]]
-                            )
-                            
-                            if product_ids:
-                                product_info = models.execute_kw(
-                                    ODOO_CONFIG['db'], uid, ODOO_CONFIG['password'],
-                                    'product.product', 'read',
-                                    [product_ids[0]],
-                                    {'fields': ['name', 'list_price']}
-                                )[0]
-                                
-                                product_data[barcode] = {
-                                    'name': product_info.get('name', 'Desconocido'),
-                                    'price': product_info.get('list_price', 0.0)
-                                }
+                    with phase('csv'):
+                        barcodes = []
+                        with open(filepath, 'r') as csvfile:
+                            csv_reader = csv.reader(csvfile)
+                            for row in csv_reader:
+                                if row and row[0].strip():
+                                    barcodes.append(row[0].strip())
                     
-                    # Generar etiquetas
-                    generated_count = 0
-                    printed_count = 0
+                    # Obtener información de productos (catálogo local y Odoo)
+                    with phase('odoo'):
+                        product_data = {
+                            barcode: {'name': product.get('name') or 'Desconocido', 'price': product.get('list_price') or 0.0}
+                            for barcode, product in get_products_by_barcode(barcodes).items()
+                        }
                     
-                    for barcode in barcodes:
-                        if barcode in product_data:
-                            product_info = product_data[barcode]
-                            name = product_info['name']
-                            price = product_info['price']
-                            
-                            # Generar etiqueta
-                            generated_count += 1
-                            
-                            # Imprimir si se seleccionó impresora
-                            if printer:
-                                if generate_and_print(barcode, name, price, printer):
-                                    printed_count += 1
+                    # Generar etiquetas: una sola imagen por producto, con
+                    # tantas copias como veces aparezca en el archivo
+                    copies = Counter(barcode for barcode in barcodes if barcode in product_data)
+                    label_items = [
+                        (barcode, product_data[barcode]['name'], product_data[barcode]['price'], count)
+                        for barcode, count in copies.items()
+                    ]
+                    generated_count, printed_count = render_and_print_labels(label_items, printer, cups_server)
                     
                     if generated_count > 0:
                         flash(f'Se procesaron {generated_count} etiquetas.', 'success')
@@ -658,8 +1268,78 @@ def labels():
                     flash(f'Error al procesar el archivo: {str(e)}', 'error')
             else:
                 flash('Tipo de archivo no permitido', 'error')
+        
+        # Generar etiquetas para todos los productos de una transferencia
+        elif 'generate_from_picking' in request.form:
+            picking_id = request.form.get('picking_id', '').strip()
+            printer = request.form.get('printer')
+            
+            if not picking_id.isdigit():
+                flash('Debes indicar un ID de transferencia válido', 'error')
+                return redirect(url_for('labels'))
+            
+            with phase('odoo'):
+                items, missing_barcode = get_picking_label_items(int(picking_id))
+            
+            if items is None:
+                flash('No se pudo obtener la transferencia desde Odoo', 'error')
+            elif items:
+                generated_count, printed_count = render_and_print_labels(items, printer, cups_server)
+                flash(f'Se procesaron {generated_count} etiquetas de la transferencia #{picking_id}.', 'success')
+                if printer:
+                    flash(f'Se enviaron {printed_count} etiquetas a la impresora.', 'success')
+                if missing_barcode:
+                    flash(f'{len(missing_barcode)} productos sin código de barras: {", ".join(missing_barcode)}', 'warning')
+            else:
+                flash('La transferencia no tiene productos con código de barras.', 'warning')
+        
+        # Reimprimir solo las etiquetas cuyo nombre o precio cambió
+        elif 'generate_changed' in request.form:
+            printer = request.form.get('printer')
+            full_scan = bool(request.form.get('full_scan'))
+            mark_only = bool(request.form.get('mark_only'))
+            
+            if not printer and not mark_only:
+                flash('Selecciona una impresora para reimprimir los cambios', 'error')
+                return redirect(url_for('labels'))
+            
+            # Margen de seguridad: los productos repetidos se descartan al comparar
+            sync_time = (datetime.utcnow() - timedelta(minutes=5)).strftime('%Y-%m-%d %H:%M:%S')
+            since = None if full_scan else label_history.last_sync
+            with phase('odoo'):
+                candidates = get_products_changed_since(since)
+            
+            if candidates is None:
+                flash('No se pudieron obtener los productos desde Odoo', 'error')
+                return redirect(url_for('labels'))
+            
+            changed = label_history.changed(candidates)
+            
+            if mark_only:
+                label_history.record(changed, last_sync=sync_time)
+                flash(f'Se registraron {len(changed)} etiquetas como impresas sin imprimirlas.', 'success')
+            elif changed:
+                generated_count, printed_count = render_and_print_labels(changed, printer, cups_server)
+                flash(f'{len(changed)} de {len(candidates)} productos revisados cambiaron de nombre o precio.', 'success')
+                flash(f'Se enviaron {printed_count} de {generated_count} etiquetas a la impresora.', 'success')
+                if printed_count == generated_count:
+                    label_history.record([], last_sync=sync_time)
+                else:
+                    flash('Algunas etiquetas no se imprimieron; se volverán a incluir en la próxima ejecución.', 'warning')
+            else:
+                label_history.record([], last_sync=sync_time)
+                flash(f'No hay etiquetas con cambios ({len(candidates)} productos revisados).', 'info')
     
-    return render_template('labels.html', printers=printers)
+    return render_template('labels.html', printers=printers, picking_id=request.args.get('picking', ''),
+                           label_history=label_history)
+
+@app.route('/labels/image/<key>.png')
+def label_image(key):
+    """Servir una etiqueta desde la caché de etiquetas renderizadas"""
+    data = label_cache.read(key)
+    if data is None:
+        abort(404)
+    return send_file(io.BytesIO(data), mimetype='image/png', download_name=f"label_{key[:12]}.png")
 
 @app.route('/reports', methods=['GET', 'POST'])
 def reports():
@@ -685,8 +1365,11 @@ def reports():
                 report_name = f"inventory_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
                 report_path = os.path.join(app.config['UPLOAD_FOLDER'], report_name)
                 
-                # Crear el reporte
-                pdf_path = create_inventory_report(filepath, get_odoo_connection, report_path)
+                # Crear el reporte (reportlab se carga con el primer reporte)
+                from report_generator import create_inventory_report
+                
+                product_catalog.start()
+                pdf_path = create_inventory_report(filepath, get_odoo_connection, report_path, catalog=product_catalog)
                 
                 # Crear URL relativa al reporte
                 report_url = f"/static/uploads/{report_name}"
@@ -708,7 +1391,12 @@ def serve_upload(filename):
 @app.route('/')
 def index():
     locations = get_odoo_locations()
-    return render_template('index.html', locations=locations)
+    return render_template('index.html', locations=locations, outbox=transfer_outbox.stats())
+
+@app.route('/outbox')
+def outbox_status():
+    """API con el estado de la bandeja de transferencias pendientes"""
+    return jsonify(transfer_outbox.stats())
 
 @app.route('/scan', methods=['POST'])
 def process_scan():
@@ -721,19 +1409,21 @@ def process_scan():
         flash('No se han proporcionado códigos de barras', 'error')
         return redirect(url_for('index'))
     
+    if not source_location or not dest_location:
+        flash('Debes seleccionar ubicaciones de origen y destino', 'error')
+        return redirect(url_for('index'))
+    if not source_location.isdigit() or not dest_location.isdigit():
+        flash('Ubicaciones de origen o destino no válidas', 'error')
+        return redirect(url_for('index'))
+    
     # Procesar los códigos escaneados (uno por línea)
     codes_list = [code.strip() for code in scanned_codes.strip().split('\n') if code.strip()]
     products_counter = Counter(codes_list)
     
-    # Crear la transferencia
-    result = create_inventory_transfer(source_location, dest_location, products_counter)
-    
-    if result.get('success'):
-        flash(f'Transferencia creada con éxito. Se transfirieron {result["products_count"]} productos.', 'success')
-        if result.get('products_not_found'):
-            flash(f'No se encontraron {len(result["products_not_found"])} productos: {", ".join(result["products_not_found"])}', 'warning')
-    else:
-        flash(f'Error al crear transferencia: {result.get("message")}', 'error')
+    # Registrar el envío en la bandeja local; la transferencia se crea en segundo plano
+    submission_id = transfer_outbox.enqueue(source_location, dest_location, products_counter)
+    flash(f'Escaneo #{submission_id} registrado ({sum(products_counter.values())} unidades). '
+          f'La transferencia se creará en Odoo en segundo plano.', 'success')
     
     return redirect(url_for('index'))
 
@@ -768,35 +1458,29 @@ def upload_file():
             
             print(f"Leídos {len(barcodes)} códigos de barras del archivo CSV")
             
-            # Procesar en pequeños lotes (10 códigos a la vez)
+            if not source_location or not dest_location:
+                flash('Debes seleccionar ubicaciones de origen y destino', 'error')
+                return redirect(url_for('index'))
+            if not source_location.isdigit() or not dest_location.isdigit():
+                flash('Ubicaciones de origen o destino no válidas', 'error')
+                return redirect(url_for('index'))
+            
+            # Registrar en la bandeja en pequeños lotes (10 códigos a la vez);
+            # el envío en segundo plano los agrupa en transferencias
             batch_size = 10
-            success_count = 0
-            failed_count = 0
-            total_processed = 0
+            queued_count = 0
             
             for i in range(0, len(barcodes), batch_size):
-                batch = barcodes[i:i+batch_size]
-                batch_counter = Counter(batch)
-                
-                print(f"Procesando lote {i//batch_size + 1} de {(len(barcodes) + batch_size - 1) // batch_size}")
-                print(f"Códigos en este lote: {batch}")
-                
-                # Crear una transferencia para este pequeño lote
-                result = create_inventory_transfer(source_location, dest_location, batch_counter)
-                
-                if result.get('success'):
-                    success_count += 1
-                    total_processed += result.get('products_count', 0)
-                else:
-                    failed_count += 1
-                    print(f"Error en lote {i//batch_size + 1}: {result.get('message')}")
+                batch_counter = Counter(barcodes[i:i+batch_size])
+                transfer_outbox.enqueue(source_location, dest_location, batch_counter)
+                queued_count += 1
             
             # Mensaje final
-            if success_count > 0:
-                flash(f'Se crearon {success_count} transferencias con un total de {total_processed} productos procesados.', 'success')
-            
-            if failed_count > 0:
-                flash(f'Fallaron {failed_count} transferencias. Verifica los logs para más detalles.', 'warning')
+            if queued_count > 0:
+                flash(f'Se registraron {len(barcodes)} códigos en {queued_count} envíos. '
+                      f'Las transferencias se crearán en Odoo en segundo plano.', 'success')
+            else:
+                flash('El archivo no contiene códigos de barras.', 'warning')
                 
         except Exception as e:
             print(f"Error al procesar archivo: {str(e)}")
@@ -816,13 +1500,30 @@ def config():
         ODOO_CONFIG['username'] = request.form.get('username')
         ODOO_CONFIG['password'] = request.form.get('password')
         
+        # Protocolo de conexión
+        if request.form.get('transport') in ('xmlrpc', 'jsonrpc'):
+            ODOO_CONFIG['transport'] = request.form.get('transport')
+        
+        # Política ante falta de stock en la ubicación origen
+        if request.form.get('availability_policy') in ('off', 'flag', 'trim', 'reject'):
+            ODOO_CONFIG['availability_policy'] = request.form.get('availability_policy')
+        
+        # Timeouts de conexión y de lectura (segundos)
+        for key in ('connect_timeout', 'read_timeout'):
+            try:
+                ODOO_CONFIG[key] = max(float(request.form.get(key)), 1.0)
+            except (TypeError, ValueError):
+                ODOO_CONFIG[key] = DEFAULT_CONFIG[key]
+        
         # Guardar configuración en archivo
         save_config()
         
-        # Probar conexión
+        # Probar conexión (descartando uids, conexiones, el estado del circuito
+        # y las ubicaciones de la conexión anterior)
+        odoo_client.reset()
+        location_cache.invalidate()
         try:
-            common = xmlrpc.client.ServerProxy(f"{ODOO_CONFIG['url']}/xmlrpc/2/common")
-            uid = common.authenticate(ODOO_CONFIG['db'], ODOO_CONFIG['username'], ODOO_CONFIG['password'], {})
+            uid = odoo_client.authenticate(force=True)
             if uid:
                 flash('Conexión exitosa a Odoo. Configuración guardada.', 'success')
             else:
@@ -837,10 +1538,77 @@ def config():
 @app.route('/add_barcode', methods=['POST'])
 def add_barcode():
     """API para añadir un código de barras escaneado (para AJAX)"""
-    barcode = request.json.get('barcode')
-    if barcode:
-        return jsonify({'success': True, 'barcode': barcode})
-    return jsonify({'success': False, 'message': 'Código de barras no proporcionado'})
+    barcode = (request.json.get('barcode') or '').strip()
+    session_id = request.json.get('session_id')
+    if not barcode:
+        return jsonify({'success': False, 'message': 'Código de barras no proporcionado'})
+    
+    if session_id:
+        # Modo incremental: el escaneo se aplica a la transferencia en segundo plano
+        state = scan_sessions.add(session_id, barcode)
+        if state is None:
+            return jsonify({'success': False, 'message': 'La sesión de escaneo no existe o ya terminó'}), 404
+        return jsonify({'success': True, 'barcode': barcode, 'session': state})
+    
+    return jsonify({'success': True, 'barcode': barcode})
+
+@app.route('/scan_session/start', methods=['POST'])
+def start_scan_session():
+    """Iniciar una sesión de escaneo incremental"""
+    data = request.json or {}
+    source_location = data.get('source_location')
+    dest_location = data.get('dest_location')
+    
+    if not source_location or not dest_location:
+        return jsonify({'success': False, 'message': 'Debes seleccionar ubicaciones de origen y destino'}), 400
+    if not str(source_location).isdigit() or not str(dest_location).isdigit():
+        return jsonify({'success': False, 'message': 'Ubicaciones de origen o destino no válidas'}), 400
+    
+    state = scan_sessions.open(source_location, dest_location)
+    return jsonify({'success': True, 'session': state})
+
+@app.route('/scan_session/<session_id>', methods=['GET'])
+def scan_session_status(session_id):
+    """Estado de una sesión de escaneo incremental"""
+    session_state = scan_sessions.get(session_id)
+    if session_state is None:
+        return jsonify({'success': False, 'message': 'La sesión de escaneo no existe o ya terminó'}), 404
+    return jsonify({'success': True, 'session': scan_sessions.snapshot(session_state)})
+
+@app.route('/scan_session/<session_id>/confirm', methods=['POST'])
+def confirm_scan_session(session_id):
+    """Confirmar la transferencia construida durante el escaneo"""
+    result = scan_sessions.confirm(session_id)
+    
+    if result.get('retryable'):
+        # La sesión sigue abierta y el navegador puede reintentar
+        return jsonify(result)
+    
+    if result['success']:
+        message = f'Transferencia creada con éxito. ID: {result["picking_id"]}, Productos: {result["products_count"]}'
+        if result.get('products_not_found'):
+            message += f' | Productos no encontrados: {", ".join(result["products_not_found"])}'
+        if result.get('shortages'):
+            message += f' | Stock insuficiente en origen: {describe_shortages(result["shortages"])}'
+        if result.get('products_dropped'):
+            message += (f' | No transferidos (máximo {MAX_TRANSFER_PRODUCTS} productos): '
+                        f'{", ".join(result["products_dropped"])}')
+        if result.get('products_capped'):
+            message += (f' | Limitados a {MAX_PRODUCT_QUANTITY} unidades: '
+                        f'{", ".join(result["products_capped"])}')
+        flash(message, 'success')
+    else:
+        message = result['message']
+        if result.get('products_not_found'):
+            message += f' | Productos no encontrados: {", ".join(result["products_not_found"])}'
+        flash(message, 'error')
+    
+    return jsonify(result)
+
+@app.route('/scan_session/<session_id>/cancel', methods=['POST'])
+def cancel_scan_session(session_id):
+    """Descartar una sesión de escaneo y su transferencia en borrador"""
+    return jsonify({'success': scan_sessions.cancel(session_id)})
 
 @app.route('/recepcion')
 def recepcion():
@@ -849,11 +1617,11 @@ def recepcion():
     ubicacion_id = request.args.get('ubicacion')
     busqueda = request.args.get('buscar', '')
     
-    # Obtener transferencias pendientes
-    transferencias = get_pending_transfers(ubicacion_id, busqueda)
-    
-    # Obtener ubicaciones para el filtro
-    ubicaciones = get_odoo_locations()
+    # Obtener transferencias pendientes y ubicaciones para el filtro en paralelo
+    transferencias, ubicaciones = odoo_client.run_concurrently(
+        lambda: get_pending_transfers(ubicacion_id, busqueda),
+        get_location_filter_options
+    )
     
     return render_template('recepcion.html', 
                           transferencias=transferencias, 
@@ -861,6 +1629,56 @@ def recepcion():
                           ubicacion_seleccionada=ubicacion_id,
                           busqueda=busqueda)
 
+@app.route('/recepcion/stream')
+def recepcion_stream():
+    """Cambios de las transferencias pendientes en vivo (Server-Sent Events)"""
+    ubicacion_id = request.args.get('ubicacion')
+    busqueda = request.args.get('buscar', '').strip().lower()
+    
+    if ubicacion_id and not ubicacion_id.isdigit():
+        # Con un error HTTP el navegador deja de reconectar el EventSource
+        return jsonify({'success': False, 'message': 'Ubicación no válida'}), 400
+    
+    # Mismos filtros que la página, aplicados sobre la vista compartida
+    subtree = None
+    if ubicacion_id:
+        tree = location_cache.get()
+        subtree = (tree.subtree(ubicacion_id) if tree else None) or {int(ubicacion_id)}
+    
+    def visible(transfer):
+        if subtree is not None and transfer['location_dest_id'][0] not in subtree:
+            return False
+        if busqueda and busqueda not in (transfer.get('name') or '').lower() \
+                and busqueda not in (transfer.get('origin') or '').lower():
+            return False
+        return True
+    
+    def generate():
+        events = reception_board.subscribe()
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    event = events.get(timeout=15)
+                except queue.Empty:
+                    # Comentario para mantener viva la conexión
+                    yield ': ping\n\n'
+                    continue
+                
+                if event['type'] == 'snapshot':
+                    event = {'type': 'snapshot', 'transfers': [t for t in event['transfers'] if visible(t)]}
+                elif event['type'] == 'upsert' and not visible(event['transfer']):
+                    # Pudo dejar de cumplir el filtro: el navegador la quita si la tenía
+                    event = {'type': 'remove', 'id': event['transfer']['id']}
+                yield ReceptionBoard.format_event(event)
+        finally:
+            reception_board.unsubscribe(events)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/recepcion/<int:id>')
 def procesar_recepcion(id):
     """Página para procesar la recepción de una transferencia específica"""
@@ -959,10 +1777,113 @@ def validar_transferencia(id):
         flash(message, 'error')
         return redirect(url_for('procesar_recepcion', id=id))
 
+@app.route('/validar_lote', methods=['POST'])
+def validar_lote():
+    """Validar en una sola acción varias transferencias ya verificadas"""
+    if request.is_json:
+        ids = (request.json or {}).get('ids', [])
+    else:
+        ids = request.form.getlist('transfer_ids')
+    
+    try:
+        ids = list(dict.fromkeys(int(transfer_id) for transfer_id in ids))
+    except (TypeError, ValueError):
+        ids = []
+    
+    if not ids:
+        if request.is_json:
+            return jsonify({'success': False, 'message': 'No se seleccionaron transferencias'}), 400
+        flash('No se seleccionaron transferencias', 'error')
+        return redirect(url_for('recepcion'))
+    
+    # Solo se validan las transferencias con todos sus productos verificados
+    results = {}
+    try:
+        move_counts = count_transfer_moves(ids)
+    except Exception as e:
+        move_counts = None
+        print(f"Error al contar movimientos: {str(e)}")
+    
+    if move_counts is None:
+        message = odoo_connection_error()
+        results = {transfer_id: (False, message) for transfer_id in ids}
+    else:
+        verified_ids = []
+        for transfer_id in ids:
+            verified = session.get(f'verificados_{transfer_id}', [])
+            if move_counts.get(transfer_id) and len(verified) == move_counts[transfer_id]:
+                verified_ids.append(transfer_id)
+            else:
+                results[transfer_id] = (False, f"Transferencia #{transfer_id}: faltan productos por verificar")
+        if verified_ids:
+            results.update(validate_transfers(verified_ids))
+    
+    validated = [transfer_id for transfer_id, (success, _) in results.items() if success]
+    for transfer_id in validated:
+        session.pop(f'verificados_{transfer_id}', None)
+    
+    if request.is_json:
+        return jsonify({
+            'success': bool(validated),
+            'validated': len(validated),
+            'results': [
+                {'id': transfer_id, 'success': success, 'message': message}
+                for transfer_id, (success, message) in results.items()
+            ]
+        })
+    
+    if validated:
+        flash(f'{len(validated)} de {len(ids)} transferencias validadas correctamente', 'success')
+    for transfer_id, (success, message) in results.items():
+        if not success:
+            flash(message, 'error')
+    return redirect(url_for('recepcion'))
+
 @app.route('/menu')
 def menu():
     """Página de menú principal"""
     return render_template('menu.html')
 
+def start_services():
+    """
+    Arranque con efectos de la aplicación (idempotente)
+    
+    Crea la carpeta de uploads, abre (y migra) la base de datos de la bandeja
+    y arranca el envío en segundo plano de la bandeja de transferencias y de
+    las sesiones de escaneo. El resto de subsistemas se inicializan la
+    primera vez que se usan: la caché de etiquetas crea su directorio con la
+    primera etiqueta, reportlab se carga con el primer reporte PDF, PIL,
+    python-barcode y pycups con la primera etiqueta, y los catálogos con la
+    primera búsqueda.
+    """
+    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+    transfer_outbox.start()
+    # Recupera las sesiones de escaneo que quedaron a medias al reiniciar
+    scan_sessions.start()
+
+@app.before_first_request
+def start_services_on_first_request():
+    # Para servidores que cargan `app:app` directamente en lugar de create_app()
+    start_services()
+
+def create_app():
+    """
+    Punto de entrada de la aplicación para servidores WSGI
+    (por ejemplo `gunicorn 'app:create_app()'`)
+    
+    No construye una aplicación nueva: las rutas se registran sobre la
+    aplicación única del módulo al importarlo. Al importar el módulo solo
+    se lee config.json (o se crea con los valores por defecto si no
+    existe); no se abren bases de datos, no se crean directorios ni se
+    arrancan hilos, y los archivos de la caché y del historial de
+    etiquetas se leen la primera vez que se usan. Los servicios en
+    segundo plano se arrancan aquí, en start_services().
+    
+    Returns:
+        Flask: la aplicación del módulo, con sus servicios arrancados
+    """
+    start_services()
+    return app
+
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5010)
\ No newline at end of file
+    create_app().run(debug=True, host='0.0.0.0', port=5010)
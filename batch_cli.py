@@ -0,0 +1,371 @@
+# batch_cli.py
+"""
+Procesamiento por lotes de archivos de conteo desde la línea de comandos.
+
+Procesa todos los CSV de uno o varios directorios, patrones o archivos sin
+pasar por el navegador:
+
+    report     reporte de inventario por archivo (PDF o CSV)
+    labels     cola de etiquetas por archivo (PNG + spool.csv), opcionalmente
+               enviada a una impresora
+    transfer   transferencia interna en Odoo por archivo
+
+Los archivos se leen en paralelo y los productos de todos ellos se
+consultan en Odoo una sola vez (consultas 'barcode in' en bloques); cada
+archivo se procesa después en su propio proceso (PDF y etiquetas consumen
+CPU) o hilo (las transferencias solo esperan a Odoo). Al terminar se
+imprime un resumen y se guarda en summary.json en el directorio de salida.
+
+Uso:
+    python batch_cli.py report conteos/ --output salida/ --format pdf
+    python batch_cli.py labels "tiendas/*/conteo_*.csv" --output etiquetas/ --printer Zebra
+    python batch_cli.py transfer conteos/ --output salida/ --source 12 --dest 8
+"""
+import argparse
+import csv
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from inventory_transfer import InventoryTransfers, split_transfer_products
+from odoo_client import OdooClient, LANE_BULK, rpc_lane
+from report_generator import analyze_csv_file
+
+CONFIG_FILE = 'config.json'
+
+# Extensiones aceptadas al recorrer un directorio (las mismas que la subida web)
+INPUT_EXTENSIONS = ('.csv', '.txt')
+
+# Códigos de barras por consulta 'barcode in' al catálogo
+LOOKUP_BATCH_SIZE = 500
+
+PRODUCT_FIELDS = ['name', 'barcode', 'default_code', 'list_price', 'qty_available']
+
+
+def expand_inputs(inputs):
+    """
+    Resolver directorios, patrones y archivos a una lista de archivos sin duplicados
+
+    Returns:
+        list: rutas absolutas en el orden en que se indicaron
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            matches = sorted(
+                os.path.join(item, name) for name in os.listdir(item)
+                if name.lower().endswith(INPUT_EXTENSIONS) and os.path.isfile(os.path.join(item, name))
+            )
+        elif os.path.isfile(item):
+            matches = [item]
+        else:
+            matches = sorted(path for path in glob.glob(item, recursive=True) if os.path.isfile(path))
+        files.extend(os.path.abspath(path) for path in matches)
+    return list(dict.fromkeys(files))
+
+
+def output_names(files):
+    """Nombre base de salida para cada archivo (se desambiguan los repetidos)"""
+    names = {}
+    used = Counter()
+    for path in files:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        used[stem] += 1
+        names[path] = stem if used[stem] == 1 else f'{stem}_{used[stem]}'
+    return names
+
+
+def load_odoo_config():
+    with open(CONFIG_FILE, 'r') as f:
+        return json.load(f)
+
+
+def fetch_products(client, config, barcodes):
+    """
+    Consultar en Odoo los productos de todos los archivos a la vez
+
+    Args:
+        barcodes: códigos de barras únicos de todos los archivos
+
+    Returns:
+        dict: {barcode: producto}
+    """
+    uid = client.authenticate()
+    barcodes = sorted(barcodes)
+    batches = [barcodes[i:i + LOOKUP_BATCH_SIZE] for i in range(0, len(barcodes), LOOKUP_BATCH_SIZE)]
+
+    def lookup(batch):
+        return lambda: client.models.execute_kw(
+            config['db'], uid, config['password'],
+            'product.product', 'search_read',
+            [[('barcode', 'in', batch)]],
+            {'fields': PRODUCT_FIELDS}
+        )
+
+    products = {}
+    with rpc_lane(LANE_BULK):
+        for records in client.run_concurrently(*[lookup(batch) for batch in batches]):
+            for product in records:
+                if product.get('barcode'):
+                    products[product['barcode']] = product
+    return products
+
+
+# --- Trabajos por archivo -----------------------------------------------------
+
+def _read_counter(path):
+    """Conteo de códigos de un archivo (la excepción se devuelve para informarla en el resumen)"""
+    try:
+        return analyze_csv_file(path)
+    except Exception as e:
+        return e
+
+
+def _report_job(path, counter, products, output_base, output_format):
+    """Generar el reporte de un archivo en PDF o CSV"""
+    if output_format == 'pdf':
+        from report_generator import generate_pdf_report
+
+        return generate_pdf_report(counter, products, output_base + '.pdf')
+
+    output = output_base + '.csv'
+    with open(output, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['barcode', 'nombre', 'referencia', 'cantidad', 'precio', 'valor', 'encontrado'])
+        for barcode, count in counter.items():
+            product = products.get(barcode)
+            if product:
+                price = product.get('list_price') or 0.0
+                writer.writerow([barcode, product.get('name', ''), product.get('default_code') or '',
+                                 count, f'{price:.2f}', f'{price * count:.2f}', 'si'])
+            else:
+                writer.writerow([barcode, '', '', count, '0.00', '0.00', 'no'])
+    return output
+
+
+def _labels_job(path, counter, products, output_base, printer=None, cups_server=None):
+    """Renderizar la cola de etiquetas de un archivo (una imagen por producto con sus copias)"""
+    from label_generator import generate_product_label, print_labels
+
+    spool_dir = output_base + '_etiquetas'
+    os.makedirs(spool_dir, exist_ok=True)
+    spool = []
+    for position, (barcode, copies) in enumerate(counter.items(), 1):
+        product = products.get(barcode)
+        if not product:
+            continue
+        name, price = product.get('name', 'Desconocido'), product.get('list_price') or 0.0
+        image = os.path.join(spool_dir, f'{position:05d}_{barcode}.png')
+        generate_product_label(barcode, name, price, image)
+        spool.append((os.path.basename(image), barcode, name, price, copies))
+
+    with open(os.path.join(spool_dir, 'spool.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['archivo', 'barcode', 'nombre', 'precio', 'copias'])
+        writer.writerows(spool)
+
+    printed = None
+    if printer and spool:
+        printed = print_labels(
+            ((os.path.join(spool_dir, image), copies) for image, _, _, _, copies in spool),
+            printer, cups_server
+        )
+    return {'output': spool_dir, 'labels': sum(item[4] for item in spool), 'printed': printed}
+
+
+def _file_key(path, source, dest):
+    """Clave de idempotencia: el mismo archivo hacia las mismas ubicaciones crea una sola transferencia"""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return f'batch-{digest.hexdigest()[:16]}-{source}-{dest}'
+
+
+def _transfer_job(transfers, path, counter, source, dest):
+    """
+    Crear las transferencias de un archivo con la misma lógica que la aplicación
+
+    Una transferencia admite hasta 20 productos y 100 unidades por producto,
+    así que el archivo se reparte en varias (como hace la bandeja de envíos
+    de la aplicación) sin perder unidades.
+    """
+    key = _file_key(path, source, dest)
+    picking_ids, not_found, shortages = [], [], []
+    for part, chunk in enumerate(split_transfer_products(counter), 1):
+        result = transfers.create(source, dest, chunk, idempotency_key=f'{key}-{part}')
+        # Un bloque sin ningún producto conocido no impide crear los demás
+        if not result['success'] and not set(chunk) <= set(result.get('products_not_found', [])):
+            return {'success': False, 'message': result['message'], 'picking_ids': picking_ids}
+        if result.get('picking_id'):
+            picking_ids.append(result['picking_id'])
+        not_found.extend(barcode for barcode in result.get('products_not_found', []) if barcode not in not_found)
+        shortages.extend(result.get('shortages', []))
+    return {'success': bool(picking_ids), 'picking_ids': picking_ids, 'products_not_found': not_found,
+            'shortages': shortages, 'message': None if picking_ids else 'No se encontraron productos válidos'}
+
+
+# --- Ejecución ----------------------------------------------------------------
+
+def make_executor(mode, workers):
+    """Pool de trabajadores para un modo: hilos para transferencias, procesos para PDF y etiquetas"""
+    if mode == 'transfer':
+        return ThreadPoolExecutor(max_workers=workers)
+    # 'spawn': los procesos no heredan los hilos del cliente de Odoo
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def run(mode, files, output_dir, workers, output_format='pdf', source=None, dest=None,
+        printer=None, cups_server=None, executor=None):
+    """
+    Procesar los archivos y devolver el resumen de la ejecución
+
+    Args:
+        executor: pool de make_executor a reutilizar (si no se indica se crea
+            uno para esta ejecución y se cierra al terminar)
+
+    Returns:
+        dict: totales y resultado por archivo
+    """
+    started = time.perf_counter()
+    output_dir = os.path.abspath(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    names = output_names(files)
+    results = {path: {'file': path, 'success': False} for path in files}
+
+    # 1. Lectura de los archivos en paralelo
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        counters = dict(zip(files, pool.map(_read_counter, files)))
+    for path, counter in counters.items():
+        if isinstance(counter, Exception):
+            results[path]['message'] = f'Error al leer el archivo: {counter}'
+        else:
+            results[path].update(units=sum(counter.values()), distinct=len(counter))
+    readable = [path for path in files if not isinstance(counters[path], Exception)]
+
+    # 2. Una sola consulta de catálogo para todos los archivos
+    products = {}
+    transfers = None
+    if mode == 'transfer' and readable:
+        config = load_odoo_config()
+        transfers = InventoryTransfers(OdooClient(lambda: config), lambda: config)
+    if mode in ('report', 'labels') and readable:
+        config = load_odoo_config()
+        client = OdooClient(lambda: config)
+        all_barcodes = set().union(*(counters[path] for path in readable))
+        try:
+            products = fetch_products(client, config, all_barcodes)
+        except Exception as e:
+            print(f"Error al consultar productos en Odoo: {str(e)}")
+            for path in readable:
+                results[path]['message'] = f'Error al consultar productos en Odoo: {str(e)}'
+            readable = []
+        print(f"Catálogo: {len(products)} de {len(all_barcodes)} códigos encontrados en Odoo")
+
+    # 3. Un trabajo por archivo
+    def submit(pool, path):
+        counter = counters[path]
+        output_base = os.path.join(output_dir, names[path])
+        if mode == 'transfer':
+            return pool.submit(_transfer_job, transfers, path, counter, source, dest)
+        subset = {barcode: products[barcode] for barcode in counter if barcode in products}
+        results[path].update(found=len(subset), missing=len(counter) - len(subset))
+        if mode == 'report':
+            return pool.submit(_report_job, path, counter, subset, output_base, output_format)
+        return pool.submit(_labels_job, path, counter, subset, output_base, printer, cups_server)
+
+    pool = executor or make_executor(mode, workers)
+    try:
+        file_started = {path: time.perf_counter() for path in readable}
+        futures = {path: submit(pool, path) for path in readable}
+        for path, future in futures.items():
+            result = results[path]
+            try:
+                outcome = future.result()
+            except Exception as e:
+                result['message'] = str(e)
+                continue
+            finally:
+                result['seconds'] = round(time.perf_counter() - file_started[path], 2)
+            if mode == 'report':
+                result.update(success=True, output=outcome)
+            elif mode == 'labels':
+                result.update(success=True, **outcome)
+            else:
+                result.update(success=outcome['success'], message=outcome.get('message'),
+                              picking_ids=outcome.get('picking_ids', []),
+                              missing=len(outcome.get('products_not_found', [])),
+                              shortages=len({shortage['barcode'] for shortage in outcome.get('shortages', [])}))
+    finally:
+        if executor is None:
+            pool.shutdown()
+
+    summary = {
+        'mode': mode,
+        'files': len(files),
+        'succeeded': sum(1 for result in results.values() if result['success']),
+        'failed': sum(1 for result in results.values() if not result['success']),
+        'units': sum(result.get('units', 0) for result in results.values()),
+        'seconds': round(time.perf_counter() - started, 2),
+        'results': list(results.values()),
+    }
+    with open(os.path.join(output_dir, 'summary.json'), 'w') as f:
+        json.dump(summary, f, indent=4)
+    return summary
+
+
+def print_summary(summary):
+    print(f"\n{'archivo':<40} {'estado':<8} {'unidades':>9} {'códigos':>8} {'tiempo (s)':>10}  detalle")
+    for result in summary['results']:
+        name = os.path.basename(result['file'])
+        status = 'OK' if result['success'] else 'ERROR'
+        if result['success']:
+            detail = result.get('output') or f"transferencias {', '.join(map(str, result.get('picking_ids', [])))}"
+            if result.get('missing'):
+                detail += f" ({result['missing']} no encontrados)"
+            if result.get('shortages'):
+                detail += f" ({result['shortages']} con stock insuficiente en origen)"
+        else:
+            detail = result.get('message') or ''
+        print(f"{name[:40]:<40} {status:<8} {result.get('units', 0):>9} {result.get('distinct', 0):>8} "
+              f"{result.get('seconds', 0):>10}  {detail}")
+    print(f"\n{summary['succeeded']} de {summary['files']} archivos procesados correctamente "
+          f"({summary['units']} unidades) en {summary['seconds']}s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Procesamiento por lotes de archivos de conteo')
+    parser.add_argument('mode', choices=['report', 'labels', 'transfer'])
+    parser.add_argument('inputs', nargs='+', help='directorios, patrones (glob) o archivos CSV')
+    parser.add_argument('--output', '-o', required=True, help='directorio de salida')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='archivos procesados a la vez')
+    parser.add_argument('--format', choices=['pdf', 'csv'], default='pdf', help='formato del reporte')
+    parser.add_argument('--source', type=int, help='ubicación origen (modo transfer)')
+    parser.add_argument('--dest', type=int, help='ubicación destino (modo transfer)')
+    parser.add_argument('--printer', help='impresora para enviar las etiquetas (modo labels)')
+    parser.add_argument('--cups-server', help='servidor CUPS (modo labels)')
+    args = parser.parse_args(argv)
+
+    if args.mode == 'transfer' and (not args.source or not args.dest):
+        parser.error('el modo transfer necesita --source y --dest')
+
+    files = expand_inputs(args.inputs)
+    if not files:
+        print('No se encontraron archivos para procesar')
+        return 1
+
+    print(f"Procesando {len(files)} archivos ({args.mode}) con {min(args.workers, len(files))} trabajadores")
+    summary = run(args.mode, files, args.output, max(1, min(args.workers, len(files))), args.format,
+                  args.source, args.dest, args.printer, args.cups_server)
+    print_summary(summary)
+    return 0 if summary['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
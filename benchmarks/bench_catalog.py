@@ -0,0 +1,191 @@
+# benchmarks/bench_catalog.py
+"""
+Memoria y velocidad de búsqueda del catálogo compacto frente a un dict de dicts.
+
+Construye con los mismos registros sintéticos un diccionario
+{barcode: registro de search_read} (lo que guardaría una caché ingenua) y
+un CompactCatalog, y mide para cada uno la memoria asignada (tracemalloc),
+el tiempo de construcción y búsquedas por segundo con un 90% de aciertos.
+También escribe la instantánea compartida (catalog_snapshot) y, con
+--workers, la abre desde varios procesos a la vez para comprobar cuánta
+memoria privada añade cada uno (Private_* de /proc/self/smaps_rollup).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_catalog --products 250000,1000000 --lookups 500000 --workers 4
+"""
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from benchmarks.fake_odoo import _ean13
+from catalog_snapshot import CatalogSnapshot, write_snapshot
+from product_catalog import CompactCatalog
+
+
+def synthetic_records(count, seed=1):
+    """Registros con la forma de search_read de product.product (generador)"""
+    rng = random.Random(seed)
+    words = ['Arroz', 'Leche', 'Café', 'Azúcar', 'Aceite', 'Jabón', 'Galletas', 'Harina', 'Atún', 'Refresco']
+    for i in range(1, count + 1):
+        yield {
+            'id': i,
+            'barcode': _ean13(750000000000 + i),
+            'name': f"{rng.choice(words)} {rng.choice(['Premium', 'Clásico', 'Light', 'Familiar'])} {i}",
+            'default_code': f'P{i:07d}',
+            'list_price': round(rng.uniform(0.5, 250), 2),
+            'uom_id': [1, 'Unidad(es)'],
+        }
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    structure = build()
+    elapsed = time.perf_counter() - started
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return structure, elapsed, current, peak
+
+
+def _lookups_per_second(lookup, keys):
+    started = time.perf_counter()
+    for key in keys:
+        lookup(key)
+    return len(keys) / (time.perf_counter() - started)
+
+
+def _memory_kb():
+    """Memoria privada y compartida del proceso en KB (Linux)"""
+    totals = {'private': 0, 'shared': 0}
+    try:
+        with open('/proc/self/smaps_rollup') as f:
+            for line in f:
+                key, _, value = line.partition(':')
+                if key.startswith('Private_'):
+                    totals['private'] += int(value.split()[0])
+                elif key.startswith('Shared_'):
+                    totals['shared'] += int(value.split()[0])
+    except OSError:
+        pass
+    return totals
+
+
+def _snapshot_worker(path, keys, barrier, queue):
+    before = _memory_kb()
+    snapshot = CatalogSnapshot(path)
+    barrier.wait()
+    rate = _lookups_per_second(snapshot.get, keys)
+    # Tocar todas las páginas del archivo para que cuenten en la medición
+    for position in range(0, len(snapshot), 64):
+        snapshot._record(position)
+    barrier.wait()
+    after = _memory_kb()
+    queue.put({'lookups_per_s': rate,
+               'private_mb': (after['private'] - before['private']) / 1024,
+               'shared_mb': (after['shared'] - before['shared']) / 1024})
+
+
+def run_workers(path, keys, workers):
+    """Abrir la misma instantánea desde varios procesos y medir su memoria"""
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(workers)
+    queue = context.Queue()
+    processes = [context.Process(target=_snapshot_worker, args=(path, keys, barrier, queue))
+                 for _ in range(workers)]
+    for process in processes:
+        process.start()
+    results = [queue.get() for _ in processes]
+    for process in processes:
+        process.join()
+    return {
+        'workers': workers,
+        'lookups_per_s': round(sum(result['lookups_per_s'] for result in results)),
+        'private_mb_per_worker': round(max(result['private_mb'] for result in results), 1),
+        'shared_mb_per_worker': round(max(result['shared_mb'] for result in results), 1),
+    }
+
+
+def run(products, lookups, workers=0):
+    rng = random.Random(2)
+    keys = [_ean13(750000000000 + rng.randint(1, int(products / 0.9))) for _ in range(lookups)]
+
+    results = {}
+    dicts, build_s, current, peak = _measure(
+        lambda: {record['barcode']: record for record in synthetic_records(products)})
+    results['dict_of_dicts'] = {
+        'build_s': round(build_s, 2),
+        'memory_mb': round(current / 1048576, 1),
+        'peak_mb': round(peak / 1048576, 1),
+        'lookups_per_s': round(_lookups_per_second(dicts.get, keys)),
+    }
+    del dicts
+
+    catalog, build_s, current, peak = _measure(lambda: CompactCatalog(synthetic_records(products)))
+    results['compact_catalog'] = {
+        'build_s': round(build_s, 2),
+        'memory_mb': round(current / 1048576, 1),
+        'peak_mb': round(peak / 1048576, 1),
+        'lookups_per_s': round(_lookups_per_second(catalog.get, keys)),
+    }
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'product_catalog.bin')
+        started = time.perf_counter()
+        write_snapshot(path, catalog, 1)
+        write_s = time.perf_counter() - started
+        del catalog
+        snapshot, open_s, current, peak = _measure(lambda: CatalogSnapshot(path))
+        results['mmap_snapshot'] = {
+            'build_s': round(write_s + open_s, 2),
+            'memory_mb': round(current / 1048576, 1),
+            'peak_mb': round(peak / 1048576, 1),
+            'lookups_per_s': round(_lookups_per_second(snapshot.get, keys)),
+            'file_mb': round(os.path.getsize(path) / 1048576, 1),
+        }
+        del snapshot
+        if workers:
+            results['mmap_workers'] = run_workers(path, keys[:max(len(keys) // workers, 1)], workers)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark del catálogo compacto de productos')
+    parser.add_argument('--products', default='250000', help='tamaños del catálogo separados por comas')
+    parser.add_argument('--lookups', type=int, default=200000)
+    parser.add_argument('--workers', type=int, default=0,
+                        help='procesos que abren a la vez la instantánea compartida (0 = no medir)')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    args = parser.parse_args(argv)
+
+    all_results = {}
+    print(f"{'productos':>10} {'estructura':<16} {'memoria (MB)':>13} {'pico (MB)':>10} {'carga (s)':>10} {'búsquedas/s':>12}")
+    for products in [int(value) for value in args.products.split(',') if value.strip()]:
+        results = all_results[products] = run(products, args.lookups, args.workers)
+        for name, result in results.items():
+            if name == 'mmap_workers':
+                continue
+            print(f"{products:>10} {name:<16} {result['memory_mb']:>13} {result['peak_mb']:>10} "
+                  f"{result['build_s']:>10} {result['lookups_per_s']:>12}")
+        ratio = results['dict_of_dicts']['memory_mb'] / max(results['compact_catalog']['memory_mb'], 0.1)
+        print(f"{'':>10} memoria dict/compacto: {ratio:.1f}x; "
+              f"instantánea en disco: {results['mmap_snapshot']['file_mb']} MB")
+        if 'mmap_workers' in results:
+            shared = results['mmap_workers']
+            print(f"{'':>10} {shared['workers']} procesos con la instantánea: "
+                  f"{shared['private_mb_per_worker']} MB privados y {shared['shared_mb_per_worker']} MB "
+                  f"compartidos por proceso, {shared['lookups_per_s']} búsquedas/s en total")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(all_results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,238 @@
+# benchmarks/bench_render.py
+"""
+Rendimiento del renderizado de etiquetas y de la generación del reporte PDF.
+
+Etiquetas: mide por separado generate_product_label (dibujo y codificación
+PNG) y el envío del trabajo a una impresora nula que acepta los datos sin
+imprimir, y calcula etiquetas por segundo de cada paso y del total.
+
+Reporte: genera el PDF de generate_pdf_report con 1k, 10k y 100k filas
+sintéticas (un 5% sin datos de Odoo) y mide filas por segundo y memoria
+máxima (RSS). Cada tamaño corre en un proceso nuevo para que la memoria
+máxima de uno no contamine la del siguiente. El tiempo del PDF crece más
+que linealmente con las filas (la tabla se parte página a página), así que
+el tamaño de 100k puede tardar varios minutos.
+
+No necesita Odoo, CUPS ni red. Los resultados se guardan en JSON junto con
+el commit actual para comparar ejecuciones (--compare).
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_render --labels 500 --pdf-rows 1000,10000,100000 --json render.json
+    python -m benchmarks.bench_render --compare render.json
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+
+class NullPrinter:
+    """
+    Conexión de CUPS que acepta los trabajos sin imprimir
+
+    Implementa los métodos de pycups que usa label_generator._submit_job,
+    así que el envío recorre el mismo camino que con una impresora real
+    salvo la red.
+    """
+
+    def __init__(self):
+        self.jobs = 0
+        self.bytes = 0
+
+    def getPrinters(self):
+        return {'null': {}}
+
+    def getDefault(self):
+        return 'null'
+
+    def createJob(self, printer_name, title, options):
+        self.jobs += 1
+        return self.jobs
+
+    def startDocument(self, printer_name, job_id, name, mime_type, last):
+        from label_generator import HTTP_CONTINUE
+        return HTTP_CONTINUE
+
+    def writeRequestData(self, data, length):
+        from label_generator import HTTP_CONTINUE
+        self.bytes += length
+        return HTTP_CONTINUE
+
+    def finishDocument(self, printer_name):
+        return None
+
+    def cancelJob(self, job_id):
+        return None
+
+
+def _products(count, seed=1):
+    from benchmarks.fake_odoo import _ean13
+
+    rng = random.Random(seed)
+    words = ['Arroz', 'Leche', 'Café', 'Azúcar', 'Aceite', 'Jabón', 'Galletas', 'Harina', 'Atún', 'Refresco']
+    return [
+        (_ean13(750000000000 + i), f"{rng.choice(words)} {rng.choice(['Premium', 'Clásico', 'Light'])} {i}",
+         round(rng.uniform(0.5, 250), 2))
+        for i in range(1, count + 1)
+    ]
+
+
+def bench_labels(count):
+    """
+    Etiquetas por segundo: renderizado + PNG y envío a la impresora nula
+
+    Returns:
+        dict: tiempos y etiquetas por segundo de cada paso
+    """
+    from label_generator import generate_product_label, _submit_job
+
+    products = _products(count)
+    generate_product_label(*products[0])  # calentamiento (fuentes, módulos de barcode)
+
+    images = []
+    started = time.perf_counter()
+    for barcode_number, name, price in products:
+        images.append(generate_product_label(barcode_number, name, price).getvalue())
+    render = time.perf_counter() - started
+
+    printer = NullPrinter()
+    started = time.perf_counter()
+    for image in images:
+        _submit_job(printer, 'null', image)
+    submit = time.perf_counter() - started
+
+    total = render + submit
+    return {
+        'labels': count,
+        'render_s': round(render, 4),
+        'submit_s': round(submit, 4),
+        'render_per_s': round(count / render, 1) if render else None,
+        'submit_per_s': round(count / submit, 1) if submit else None,
+        'labels_per_s': round(count / total, 1) if total else None,
+        'avg_png_bytes': round(printer.bytes / max(printer.jobs, 1)),
+    }
+
+
+def _max_rss_mb():
+    # En Linux se usa VmHWM: ru_maxrss se hereda a través de exec y el proceso
+    # nuevo arrastraría el máximo del proceso que lo lanzó
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    # ru_maxrss está en KB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _pdf_worker(rows):
+    """Generar un PDF de `rows` filas (en un proceso nuevo)"""
+    from report_generator import generate_pdf_report
+
+    baseline = _max_rss_mb()
+    rng = random.Random(rows)
+    barcode_counter = {}
+    product_data = {}
+    for barcode_number, name, price in _products(rows):
+        barcode_counter[barcode_number] = rng.randint(1, 50)
+        if int(barcode_number[-4:-1]) % 20:  # ~5% sin datos de Odoo
+            product_data[barcode_number] = {'name': name, 'barcode': barcode_number, 'list_price': price}
+
+    with tempfile.TemporaryDirectory() as directory:
+        output = os.path.join(directory, 'reporte.pdf')
+        started = time.perf_counter()
+        generate_pdf_report(barcode_counter, product_data, output)
+        elapsed = time.perf_counter() - started
+        size = os.path.getsize(output)
+
+    return {
+        'rows': rows,
+        'seconds': round(elapsed, 3),
+        'rows_per_s': round(rows / elapsed, 1) if elapsed else None,
+        'pdf_bytes': size,
+        'baseline_rss_mb': baseline,
+        'peak_rss_mb': _max_rss_mb(),
+    }
+
+
+def bench_pdf(rows):
+    """Filas por segundo y memoria máxima del reporte PDF de `rows` filas"""
+    with multiprocessing.get_context('spawn').Pool(1) as pool:
+        return pool.apply(_pdf_worker, (rows,))
+
+
+def _commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _print_comparison(results, previous):
+    print(f"\nComparación con {previous.get('commit') or 'ejecución anterior'} ({previous.get('date')}):")
+    labels, old_labels = results.get('labels'), previous.get('labels')
+    if labels and old_labels and old_labels.get('labels_per_s'):
+        print(f"  etiquetas/s: {old_labels['labels_per_s']} -> {labels['labels_per_s']} "
+              f"({labels['labels_per_s'] / old_labels['labels_per_s']:.2f}x)")
+    old_pdf = {entry['rows']: entry for entry in previous.get('pdf', [])}
+    for entry in results.get('pdf', []):
+        old = old_pdf.get(entry['rows'])
+        if old and old.get('rows_per_s'):
+            print(f"  PDF {entry['rows']} filas: {old['rows_per_s']} -> {entry['rows_per_s']} filas/s "
+                  f"({entry['rows_per_s'] / old['rows_per_s']:.2f}x), RSS {old['peak_rss_mb']} -> {entry['peak_rss_mb']} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de etiquetas y reportes PDF')
+    parser.add_argument('--labels', type=int, default=300, help='etiquetas a renderizar (0 para omitir)')
+    parser.add_argument('--pdf-rows', default='1000,10000,100000', help='tamaños del reporte separados por comas (vacío para omitir)')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    parser.add_argument('--compare', help='resultados JSON de una ejecución anterior')
+    args = parser.parse_args(argv)
+
+    results = {
+        'commit': _commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': f"{platform.system()} {platform.machine()} ({os.cpu_count()} CPU)",
+    }
+
+    if args.labels:
+        results['labels'] = labels = bench_labels(args.labels)
+        print(f"Etiquetas: {labels['labels']} | render+PNG {labels['render_per_s']}/s | "
+              f"envío {labels['submit_per_s']}/s | total {labels['labels_per_s']}/s | "
+              f"PNG medio {labels['avg_png_bytes']} bytes")
+
+    row_counts = [int(value) for value in args.pdf_rows.split(',') if value.strip()]
+    if row_counts:
+        print(f"{'filas':>8} {'tiempo (s)':>11} {'filas/s':>10} {'PDF (KB)':>10} {'RSS máx (MB)':>13}")
+        results['pdf'] = []
+        for rows in row_counts:
+            entry = bench_pdf(rows)
+            results['pdf'].append(entry)
+            print(f"{entry['rows']:>8} {entry['seconds']:>11.3f} {entry['rows_per_s']:>10} "
+                  f"{entry['pdf_bytes'] // 1024:>10} {entry['peak_rss_mb']:>13}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            _print_comparison(results, json.load(f))
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,172 @@
+# benchmarks/bench_rpc.py
+"""
+Número de llamadas a Odoo, tiempo y bytes de las operaciones principales.
+
+Arranca el Odoo simulado con una latencia fija por llamada y ejecuta las
+funciones reales de la aplicación (crear transferencia, recepción, detalle
+de transferencia, datos del reporte) con catálogos y transferencias del
+tamaño indicado. Las llamadas se cuentan en el servidor, así que se
+incluyen también las que la aplicación hace por su cuenta (caché de
+ubicaciones, búsquedas de productos...).
+
+El número de llamadas de cada escenario se compara con el presupuesto de
+benchmarks/rpc_budget.json; si alguno lo supera el script termina con
+código 1. Con --update-budget se guardan los valores actuales.
+
+La aplicación lee config.json y crea sus archivos (outbox.db, uploads...)
+en el directorio actual, por eso se ejecuta dentro de un directorio
+temporal.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_rpc --products 5000 --pickings 500 --latency 0.005
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.fake_odoo import _ean13, spawn_server, fetch_stats, reset_stats
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rpc_budget.json')
+
+
+def _barcodes(count):
+    """Códigos de barras de los primeros `count` productos del conjunto sintético"""
+    return [_ean13(750000000000 + i) for i in range(1, count + 1)]
+
+
+def _scenarios(app_module, products):
+    from report_generator import get_product_data_from_odoo
+
+    locations = app_module.get_odoo_locations()
+    source, dest = locations[0]['id'], locations[1]['id']
+    zone_id = 1  # la primera ubicación del conjunto sintético es una zona
+
+    def transfer(count):
+        def run():
+            result = app_module.create_inventory_transfer(source, dest, {barcode: 2 for barcode in _barcodes(count)})
+            if not result['success']:
+                raise RuntimeError(result['message'])
+            return result['products_count']
+        return run
+
+    def product_data(count):
+        return lambda: len(get_product_data_from_odoo(_barcodes(count), app_module.get_odoo_connection))
+
+    scenarios = {
+        'create_transfer_5': transfer(5),
+        'create_transfer_20': transfer(20),
+        'pending_transfers': lambda: len(app_module.get_pending_transfers()),
+        'pending_transfers_zone': lambda: len(app_module.get_pending_transfers(zone_id)),
+        'transfer_details': lambda: len(app_module.get_transfer_details(1)[1]),
+        'product_data_100': product_data(100),
+    }
+    if products >= 1000:
+        scenarios['product_data_1000'] = product_data(1000)
+    return scenarios
+
+
+def run(url, products, transport):
+    """
+    Ejecutar los escenarios contra el servidor simulado
+
+    Returns:
+        dict: {escenario: {rows, rpcs, wall_s, bytes_in, bytes_out, calls}}
+    """
+    workdir = tempfile.mkdtemp(prefix='bench_rpc_')
+    with open(os.path.join(workdir, 'config.json'), 'w') as f:
+        json.dump({'url': url, 'db': 'bench', 'username': 'admin', 'password': 'admin',
+                   'transport': transport, 'rpc_retries': 0}, f, indent=4)
+    os.chdir(workdir)
+
+    import app as app_module
+
+    # Calentamiento: autenticación y árbol de ubicaciones quedan en caché,
+    # como en una aplicación que ya lleva un rato en marcha
+    app_module.get_odoo_connection()
+    app_module.location_cache.get()
+
+    results = {}
+    for name, scenario in _scenarios(app_module, products).items():
+        reset_stats(url)
+        started = time.perf_counter()
+        rows = scenario()
+        wall = time.perf_counter() - started
+        stats = fetch_stats(url)
+        results[name] = {
+            'rows': rows,
+            'rpcs': stats['rpcs'],
+            'wall_s': round(wall, 4),
+            'bytes_in': stats['bytes_in'],
+            'bytes_out': stats['bytes_out'],
+            'calls': stats['calls'],
+        }
+    return results
+
+
+def check_budget(results, budget):
+    """Escenarios cuyo número de llamadas supera el presupuesto"""
+    return [
+        (name, result['rpcs'], budget[name])
+        for name, result in results.items()
+        if name in budget and result['rpcs'] > budget[name]
+    ]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de llamadas a Odoo por operación')
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--pickings', type=int, default=500)
+    parser.add_argument('--moves-per-picking', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.005, help='segundos añadidos a cada llamada')
+    parser.add_argument('--transport', default='xmlrpc', choices=['xmlrpc', 'jsonrpc'])
+    parser.add_argument('--budget', default=BUDGET_FILE, help='archivo JSON con el máximo de llamadas por escenario')
+    parser.add_argument('--update-budget', action='store_true', help='guardar las llamadas actuales como presupuesto')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    args = parser.parse_args(argv)
+
+    budget_path = os.path.abspath(args.budget)
+    json_path = os.path.abspath(args.json) if args.json else None
+    # La aplicación se importa desde la raíz del repositorio aunque se ejecute en otro directorio
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    process, url = spawn_server(products=args.products, pickings=args.pickings,
+                                moves_per_picking=args.moves_per_picking, latency=args.latency)
+    try:
+        results = run(url, args.products, args.transport)
+    finally:
+        process.kill()
+
+    budget = {}
+    if os.path.exists(budget_path):
+        with open(budget_path) as f:
+            budget = json.load(f)
+
+    print(f"{'escenario':<24} {'filas':>6} {'llamadas':>9} {'presup.':>8} {'total (s)':>10} {'enviado':>10} {'recibido':>10}")
+    for name, result in results.items():
+        print(f"{name:<24} {result['rows']:>6} {result['rpcs']:>9} {budget.get(name, '-'):>8} "
+              f"{result['wall_s']:>10.4f} {result['bytes_in']:>10} {result['bytes_out']:>10}")
+        detail = ', '.join(f'{call}={count}' for call, count in sorted(result['calls'].items()))
+        print(f"{'':<24} {detail}")
+
+    if json_path:
+        with open(json_path, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.update_budget:
+        with open(budget_path, 'w') as f:
+            json.dump({name: result['rpcs'] for name, result in results.items()}, f, indent=4)
+            f.write('\n')
+        print(f"Presupuesto actualizado en {budget_path}")
+        return 0
+
+    exceeded = check_budget(results, budget)
+    for name, rpcs, allowed in exceeded:
+        print(f"REGRESIÓN: {name} hizo {rpcs} llamadas (presupuesto {allowed})")
+    return 1 if exceeded else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
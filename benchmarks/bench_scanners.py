@@ -0,0 +1,283 @@
+# benchmarks/bench_scanners.py
+"""
+Generador de carga con escáneres virtuales contra la aplicación Flask.
+
+Cada escáner es un hilo con su propia sesión (cookie) que repite el flujo
+de un operario:
+
+    POST /scan                 envío de un escaneo de 5-20 códigos
+    GET  /recepcion            lista de transferencias pendientes
+    GET  /recepcion/<id>       detalle de una transferencia
+    POST /verificar/<id>       una vez por producto de la transferencia
+    POST /validar/<id>         validación al terminar
+
+Para cada nivel de concurrencia se ejecuta el flujo durante un tiempo fijo
+y se informa de peticiones por segundo y latencias p50/p95/p99 por ruta.
+
+Por defecto arranca el Odoo simulado y la aplicación (servidor threaded de
+Werkzeug, como en producción) en procesos aparte para que su CPU no se
+mezcle con la de los escáneres. Con --app-url se puede apuntar a una
+instancia ya en marcha; en ese caso --odoo-url debe ser el Odoo al que
+está conectada, para preparar los datos del flujo.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_scanners --concurrency 1,5,10,25,50 --duration 20 --latency 0.005
+"""
+import argparse
+import http.cookiejar
+import itertools
+import json
+import logging
+import math
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import xmlrpc.client
+
+from benchmarks.fake_odoo import spawn_server
+
+ROUTES = ['/scan', '/recepcion', '/recepcion/<id>', '/verificar/<id>', '/validar/<id>']
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Las redirecciones (302 tras un POST) se miden como respuesta, sin seguirlas"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+def serve_app(odoo_url, host='127.0.0.1', port=0):
+    """
+    Arrancar la aplicación en este proceso conectada al Odoo indicado
+
+    La aplicación lee config.json y crea sus archivos en el directorio
+    actual, así que se ejecuta en un directorio temporal.
+    """
+    from werkzeug.serving import make_server
+
+    workdir = tempfile.mkdtemp(prefix='bench_scanners_')
+    with open(os.path.join(workdir, 'config.json'), 'w') as f:
+        json.dump({'url': odoo_url, 'db': 'bench', 'username': 'admin', 'password': 'admin'}, f, indent=4)
+    os.chdir(workdir)
+
+    import app as app_module
+
+    server = make_server(host, port, app_module.create_app(), threaded=True)
+    print(f'http://{host}:{server.server_port}', flush=True)
+    # Sin los mensajes de depuración de la aplicación ni el log de cada petición
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    sys.stdout = open(os.devnull, 'w')
+    server.serve_forever()
+
+
+def spawn_app(odoo_url):
+    """
+    Arrancar la aplicación en un proceso aparte
+
+    Returns:
+        tuple: (proceso, URL base)
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    command = [sys.executable, '-m', 'benchmarks.bench_scanners', '--serve-app', odoo_url]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True, cwd=root,
+                               env={**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [root, os.environ.get('PYTHONPATH')]))})
+    url = process.stdout.readline().strip()
+    if not url.startswith('http'):
+        process.kill()
+        raise RuntimeError('No se pudo arrancar la aplicación')
+    return process, url
+
+
+def load_flow_data(odoo_url):
+    """
+    Ubicaciones, códigos de barras y transferencias abiertas para el flujo
+
+    Returns:
+        dict: {'locations': [ids], 'barcodes': [...], 'pickings': [(id, [barcodes])]}
+    """
+    common = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/common', allow_none=True)
+    models = xmlrpc.client.ServerProxy(f'{odoo_url}/xmlrpc/2/object', allow_none=True)
+    uid = common.authenticate('bench', 'admin', 'admin', {})
+
+    def call(model, method, *args, **kwargs):
+        return models.execute_kw('bench', uid, 'admin', model, method, list(args), kwargs)
+
+    locations = call('stock.location', 'search', [('usage', '=', 'internal')])
+    products = call('product.product', 'search_read', [], fields=['barcode'], limit=2000)
+    pickings = call('stock.picking', 'search_read', [('state', 'in', ['assigned', 'partially_available', 'confirmed'])],
+                    fields=['move_ids_without_package'])
+    moves = call('stock.move', 'read', [move_id for picking in pickings for move_id in picking['move_ids_without_package']],
+                 fields=['product_id'])
+    product_ids = {move['product_id'][0] for move in moves}
+    barcodes = {product['id']: product['barcode']
+                for product in call('product.product', 'read', sorted(product_ids), fields=['barcode'])}
+    move_barcodes = {move['id']: barcodes.get(move['product_id'][0]) for move in moves}
+    return {
+        'locations': locations,
+        'barcodes': [product['barcode'] for product in products if product.get('barcode')],
+        'pickings': [
+            (picking['id'], [move_barcodes[move_id] for move_id in picking['move_ids_without_package'] if move_barcodes.get(move_id)])
+            for picking in pickings
+        ],
+    }
+
+
+class Scanner:
+    """Un escáner virtual con su propia sesión"""
+
+    def __init__(self, base_url, data, next_picking, record, seed):
+        self.base_url = base_url
+        self.data = data
+        self.next_picking = next_picking
+        self.record = record
+        self.rng = random.Random(seed)
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), _NoRedirect())
+
+    def request(self, route, path, form=None):
+        body = urllib.parse.urlencode(form).encode('utf-8') if form is not None else None
+        started = time.perf_counter()
+        try:
+            with self.opener.open(self.base_url + path, data=body, timeout=120) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        except OSError:
+            status = None
+        self.record(route, time.perf_counter() - started, status is not None and status < 500)
+
+    def run_flow(self):
+        source, dest = self.rng.sample(self.data['locations'], 2)
+        codes = [self.rng.choice(self.data['barcodes']) for _ in range(self.rng.randint(5, 20))]
+        self.request('/scan', '/scan', {'source_location': source, 'dest_location': dest,
+                                        'scanned_codes': '\n'.join(codes)})
+        self.request('/recepcion', '/recepcion')
+
+        picking_id, barcodes = self.next_picking()
+        self.request('/recepcion/<id>', f'/recepcion/{picking_id}')
+        for barcode in barcodes:
+            self.request('/verificar/<id>', f'/verificar/{picking_id}', {'barcode': barcode})
+        self.request('/validar/<id>', f'/validar/{picking_id}', {})
+
+
+def _percentile(values, fraction):
+    if not values:
+        return None
+    # Percentil por rango más cercano
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def run_level(base_url, data, concurrency, duration, seed=1):
+    """
+    Ejecutar `concurrency` escáneres durante `duration` segundos
+
+    Returns:
+        dict: {ruta: {requests, errors, rps, p50_ms, p95_ms, p99_ms}}
+    """
+    samples = {route: [] for route in ROUTES}
+    errors = {route: 0 for route in ROUTES}
+    lock = threading.Lock()
+    pickings = itertools.cycle(data['pickings'])
+
+    def record(route, elapsed, ok):
+        with lock:
+            samples[route].append(elapsed)
+            if not ok:
+                errors[route] += 1
+
+    def next_picking():
+        with lock:
+            return next(pickings)
+
+    deadline = time.perf_counter() + duration
+
+    def worker(index):
+        scanner = Scanner(base_url, data, next_picking, record, seed * 1000 + index)
+        while time.perf_counter() < deadline:
+            scanner.run_flow()
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    results = {}
+    for route in ROUTES:
+        values = sorted(samples[route])
+        results[route] = {
+            'requests': len(values),
+            'errors': errors[route],
+            'rps': round(len(values) / elapsed, 1),
+            'p50_ms': round(_percentile(values, 0.50) * 1000, 1) if values else None,
+            'p95_ms': round(_percentile(values, 0.95) * 1000, 1) if values else None,
+            'p99_ms': round(_percentile(values, 0.99) * 1000, 1) if values else None,
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Carga con escáneres virtuales contra la aplicación')
+    parser.add_argument('--concurrency', default='1,5,10,25', help='niveles de concurrencia separados por comas')
+    parser.add_argument('--duration', type=float, default=20, help='segundos por nivel')
+    parser.add_argument('--latency', type=float, default=0.005, help='latencia por llamada del Odoo simulado')
+    parser.add_argument('--products', type=int, default=5000)
+    parser.add_argument('--pickings', type=int, default=2000)
+    parser.add_argument('--app-url', help='usar una instancia ya en marcha en lugar de arrancar una')
+    parser.add_argument('--odoo-url', help='Odoo de la instancia indicada en --app-url')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    parser.add_argument('--serve-app', metavar='ODOO_URL', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve_app:
+        serve_app(args.serve_app)
+        return
+
+    if args.app_url and not args.odoo_url:
+        parser.error('--app-url necesita --odoo-url')
+
+    processes = []
+    try:
+        odoo_url, app_url = args.odoo_url, args.app_url
+        if not app_url:
+            odoo_process, odoo_url = spawn_server(products=args.products, pickings=args.pickings, latency=args.latency)
+            processes.append(odoo_process)
+            app_process, app_url = spawn_app(odoo_url)
+            processes.append(app_process)
+
+        data = load_flow_data(odoo_url)
+        if len(data['locations']) < 2 or not data['pickings']:
+            raise SystemExit('El Odoo no tiene ubicaciones o transferencias pendientes suficientes para el flujo')
+
+        results = {}
+        print(f"{'escáneres':>9} {'ruta':<17} {'peticiones':>10} {'errores':>8} {'pet/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for concurrency in [int(value) for value in args.concurrency.split(',') if value.strip()]:
+            level = run_level(app_url, data, concurrency, args.duration)
+            results[concurrency] = level
+            for route, stats in level.items():
+                print(f"{concurrency:>9} {route:<17} {stats['requests']:>10} {stats['errors']:>8} {stats['rps']:>8} "
+                      f"{stats['p50_ms'] if stats['p50_ms'] is not None else '-':>8} "
+                      f"{stats['p95_ms'] if stats['p95_ms'] is not None else '-':>8} "
+                      f"{stats['p99_ms'] if stats['p99_ms'] is not None else '-':>8}")
+    finally:
+        for process in processes:
+            process.kill()
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,178 @@
+# benchmarks/bench_startup.py
+"""
+Tiempo de importación y de arranque de la aplicación.
+
+Cada medición corre en un proceso nuevo (en un directorio temporal, porque
+la aplicación crea allí sus archivos) y toma:
+  import_s         importar el módulo app
+  startup_s        create_app(): carpeta de uploads y servicios en segundo plano
+  first_request_s  primera petición (GET /menu) con el cliente de pruebas
+  rss_mb           memoria residente al terminar
+  deferred_s       lo que cuesta cargar después los subsistemas diferidos
+                   (reportlab para PDF; PIL y python-barcode para etiquetas)
+
+Además comprueba que tras arrancar y servir la primera petición no se haya
+cargado ninguno de los módulos prohibidos del presupuesto (pandas, reportlab,
+PIL, barcode, cups): un nodo que solo escanea no debe cargarlos.
+
+Los tiempos (mediana de --runs ejecuciones) se comparan con
+benchmarks/startup_budget.json; si alguno lo supera o se cargó un módulo
+prohibido el script termina con código 1. Con --update-budget se guardan
+los tiempos actuales con un 50% de margen (y al menos 10 ms) para el ruido
+de la máquina.
+
+Es un benchmark que se ejecuta a mano (como bench_rpc): nada lo lanza
+automáticamente, así que el presupuesto solo se comprueba cuando alguien
+lo ejecuta, por ejemplo antes de publicar una versión o al añadir una
+dependencia. El código de salida permite usarlo en un script o en CI.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BUDGET_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'startup_budget.json')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TIMINGS = ['import_s', 'startup_s', 'first_request_s', 'rss_mb']
+DEFAULT_FORBIDDEN = ['pandas', 'reportlab', 'PIL', 'barcode', 'cups']
+BUDGET_MARGIN = 1.5
+BUDGET_MIN_SECONDS = 0.01
+
+
+def _rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def _loaded(modules):
+    return sorted(name for name in modules if name in sys.modules)
+
+
+def measure(forbidden):
+    """Medir en este proceso (recién arrancado) la importación y el arranque"""
+    started = time.perf_counter()
+    import app as app_module
+    imported = time.perf_counter()
+    flask_app = app_module.create_app()
+    ready = time.perf_counter()
+    flask_app.test_client().get('/menu')
+    served = time.perf_counter()
+    loaded = _loaded(forbidden)
+    rss = _rss_mb()
+
+    # Coste de los subsistemas diferidos, ya fuera del arranque
+    deferred = time.perf_counter()
+    try:
+        import label_generator  # noqa: F401
+        import reportlab.platypus  # noqa: F401
+        deferred_s = round(time.perf_counter() - deferred, 4)
+    except ImportError:
+        deferred_s = None
+
+    return {
+        'import_s': round(imported - started, 4),
+        'startup_s': round(ready - imported, 4),
+        'first_request_s': round(served - ready, 4),
+        'rss_mb': round(rss, 1) if rss is not None else None,
+        'deferred_s': deferred_s,
+        'forbidden_loaded': loaded,
+    }
+
+
+def run(runs, forbidden):
+    """Ejecutar `runs` mediciones en procesos nuevos y devolver la mediana"""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT, env.get('PYTHONPATH')]))
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix='bench_startup_') as workdir:
+            output = subprocess.run(
+                [sys.executable, '-m', 'benchmarks.bench_startup', '--measure', '--forbidden', ','.join(forbidden)],
+                cwd=workdir, env=env, capture_output=True, text=True, check=True
+            ).stdout
+        # La última línea es el JSON; antes pueden ir mensajes de la aplicación
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    results = {}
+    for key in TIMINGS + ['deferred_s']:
+        values = [sample[key] for sample in samples if sample[key] is not None]
+        results[key] = round(statistics.median(values), 4) if values else None
+    results['forbidden_loaded'] = sorted({name for sample in samples for name in sample['forbidden_loaded']})
+    return results
+
+
+def check_budget(results, budget):
+    """Problemas frente al presupuesto: tiempos excedidos y módulos prohibidos cargados"""
+    problems = [
+        f"{key} = {results[key]} (presupuesto {budget[key]})"
+        for key in TIMINGS
+        if budget.get(key) is not None and results[key] is not None and results[key] > budget[key]
+    ]
+    problems += [f"se cargó el módulo {name} al arrancar" for name in results['forbidden_loaded']]
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de importación y arranque de la aplicación')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', default=BUDGET_FILE, help='archivo JSON con los máximos de arranque')
+    parser.add_argument('--update-budget', action='store_true', help='guardar los tiempos actuales (con margen) como presupuesto')
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--forbidden', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure:
+        print(json.dumps(measure(args.forbidden.split(',') if args.forbidden else [])))
+        return 0
+
+    budget = {}
+    if os.path.exists(args.budget):
+        with open(args.budget) as f:
+            budget = json.load(f)
+    forbidden = budget.get('forbidden_modules', DEFAULT_FORBIDDEN)
+
+    results = run(args.runs, forbidden)
+    print(f"{'medida':<18} {'mediana':>10} {'presup.':>10}")
+    for key in TIMINGS + ['deferred_s']:
+        print(f"{key:<18} {results[key] if results[key] is not None else '-':>10} {budget.get(key, '-'):>10}")
+    print(f"módulos prohibidos cargados: {', '.join(results['forbidden_loaded']) or 'ninguno'}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+    if args.update_budget:
+        # Con un mínimo para los tiempos muy cortos, que varían mucho de una ejecución a otra
+        updated = {
+            key: round(max(results[key] * BUDGET_MARGIN, BUDGET_MIN_SECONDS if key.endswith('_s') else 0), 3)
+            for key in TIMINGS if results[key] is not None
+        }
+        updated['forbidden_modules'] = forbidden
+        with open(args.budget, 'w') as f:
+            json.dump(updated, f, indent=4)
+            f.write('\n')
+        print(f"Presupuesto actualizado en {args.budget}")
+        return 0
+
+    problems = check_budget(results, budget)
+    for problem in problems:
+        print(f"REGRESIÓN: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+# benchmarks/bench_transport.py
+"""
+Comparación de transportes XML-RPC y JSON-RPC contra un Odoo simulado.
+
+Mide tiempo total y CPU del cliente (serialización y parseo) para lecturas
+grandes de productos y de transferencias con sus movimientos. El servidor
+simulado corre en otro proceso para que su CPU no se mezcle con la medida.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_transport --products 20000 --pickings 2000 --repeat 5
+"""
+import argparse
+import json
+import time
+
+from benchmarks.fake_odoo import spawn_server
+from odoo_client import OdooClient
+
+PRODUCT_FIELDS = ['id', 'name', 'barcode', 'default_code', 'list_price', 'qty_available', 'uom_id']
+PICKING_FIELDS = ['id', 'name', 'origin', 'state', 'location_id', 'location_dest_id', 'move_ids_without_package', 'create_date']
+
+
+def _scenarios(client, config):
+    db, password = config['db'], config['password']
+    uid = client.authenticate()
+    models = client.models
+
+    def products():
+        return len(models.execute_kw(db, uid, password, 'product.product', 'search_read', [[]], {'fields': PRODUCT_FIELDS}))
+
+    def pickings():
+        pickings = models.execute_kw(db, uid, password, 'stock.picking', 'search_read', [[]], {'fields': PICKING_FIELDS})
+        move_ids = [move_id for picking in pickings for move_id in picking['move_ids_without_package']]
+        moves = models.execute_kw(db, uid, password, 'stock.move', 'read', [move_ids],
+                                  {'fields': ['product_id', 'product_uom_qty', 'state']})
+        return len(pickings) + len(moves)
+
+    def small_calls():
+        # Muchas llamadas pequeñas seguidas sobre la misma conexión
+        calls = [('product.product', 'read', [[product_id]], {'fields': ['name', 'list_price']}) for product_id in range(1, 201)]
+        return len(client.execute_many(db, uid, password, calls))
+
+    return {'product_search_read': products, 'picking_with_moves': pickings, 'many_small_reads': small_calls}
+
+
+def run(url, transports, repeat):
+    results = {}
+    for transport in transports:
+        config = {'url': url, 'db': 'bench', 'username': 'admin', 'password': 'admin',
+                  'transport': transport, 'read_timeout': 600, 'rpc_retries': 0}
+        client = OdooClient(lambda: config)
+        for name, scenario in _scenarios(client, config).items():
+            scenario()  # calentamiento
+            wall, cpu = [], []
+            for _ in range(repeat):
+                started_wall, started_cpu = time.perf_counter(), time.process_time()
+                rows = scenario()
+                wall.append(time.perf_counter() - started_wall)
+                cpu.append(time.process_time() - started_cpu)
+            results.setdefault(name, {})[transport] = {
+                'rows': rows,
+                'wall_s': round(min(wall), 4),
+                'client_cpu_s': round(min(cpu), 4),
+            }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark de transportes XML-RPC / JSON-RPC')
+    parser.add_argument('--products', type=int, default=20000)
+    parser.add_argument('--pickings', type=int, default=2000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='guardar los resultados en este archivo')
+    args = parser.parse_args(argv)
+
+    process, url = spawn_server(products=args.products, pickings=args.pickings)
+    try:
+        results = run(url, ['xmlrpc', 'jsonrpc'], args.repeat)
+    finally:
+        process.kill()
+
+    print(f"{'escenario':<22} {'transporte':<10} {'filas':>8} {'total (s)':>10} {'CPU cliente (s)':>16}")
+    for name, by_transport in results.items():
+        for transport, result in by_transport.items():
+            print(f"{name:<22} {transport:<10} {result['rows']:>8} {result['wall_s']:>10.4f} {result['client_cpu_s']:>16.4f}")
+        xml, js = by_transport['xmlrpc'], by_transport['jsonrpc']
+        if js['client_cpu_s']:
+            print(f"{'':<22} {'':<10} CPU XML/JSON: {xml['client_cpu_s'] / js['client_cpu_s']:.1f}x  "
+                  f"tiempo XML/JSON: {xml['wall_s'] / max(js['wall_s'], 1e-9):.1f}x")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
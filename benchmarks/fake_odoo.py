@@ -0,0 +1,531 @@
+# benchmarks/fake_odoo.py
+"""
+Servidor local que imita los endpoints de Odoo usados por la aplicación.
+
+Atiende /xmlrpc/2/common, /xmlrpc/2/object y /jsonrpc sobre un conjunto de
+datos sintético en memoria (ubicaciones, productos, transferencias,
+movimientos y quants), suficiente para medir la aplicación sin un Odoo real.
+
+Cada llamada puede llevar una latencia añadida (--latency) y el servidor
+cuenta llamadas y bytes: GET /_stats las devuelve y POST /_reset las pone a
+cero.
+
+Uso:
+    python -m benchmarks.fake_odoo --port 8069 --products 10000 --pickings 500 --latency 0.02
+"""
+import argparse
+import json
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+import xmlrpc.client
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+FAKE_UID = 2
+
+STATES_OPEN = ['assigned', 'partially_available', 'confirmed']
+
+
+def _ean13(number):
+    """Construir un EAN-13 válido a partir de un número de 12 dígitos"""
+    digits = f"{number:012d}"[-12:]
+    total = sum(int(d) * (3 if i % 2 else 1) for i, d in enumerate(digits))
+    return digits + str((10 - total % 10) % 10)
+
+
+def build_dataset(products=1000, pickings=100, moves_per_picking=5, locations=40, seed=1):
+    """
+    Generar un conjunto de datos sintético
+
+    Returns:
+        dict: {modelo: {id: registro}}
+    """
+    rng = random.Random(seed)
+    now = datetime(2024, 1, 1, 12, 0, 0)
+
+    def stamp(minutes):
+        return (now - timedelta(minutes=minutes)).strftime('%Y-%m-%d %H:%M:%S')
+
+    data = {model: {} for model in (
+        'stock.location', 'product.product', 'stock.picking.type', 'stock.picking',
+        'stock.move', 'stock.move.line', 'stock.quant', 'stock.immediate.transfer',
+    )}
+
+    # Ubicaciones: una zona (vista) cada 10 ubicaciones internas
+    zone_id = None
+    for i in range(1, locations + 1):
+        if i % 10 == 1:
+            zone_id = i
+            data['stock.location'][i] = {
+                'id': i, 'name': f'Zona {i // 10 + 1}', 'complete_name': f'WH/Zona {i // 10 + 1}',
+                'usage': 'view', 'location_id': False, 'write_date': stamp(1000),
+            }
+        else:
+            zone = data['stock.location'][zone_id]
+            data['stock.location'][i] = {
+                'id': i, 'name': f'Estante {i}', 'complete_name': f"{zone['complete_name']}/Estante {i}",
+                'usage': 'internal', 'location_id': [zone_id, zone['complete_name']], 'write_date': stamp(1000),
+            }
+    internal_ids = [loc['id'] for loc in data['stock.location'].values() if loc['usage'] == 'internal']
+
+    words = ['Arroz', 'Leche', 'Café', 'Azúcar', 'Aceite', 'Jabón', 'Galletas', 'Harina', 'Atún', 'Refresco']
+    for i in range(1, products + 1):
+        name = f"{rng.choice(words)} {rng.choice(['Premium', 'Clásico', 'Light', 'Familiar'])} {i}"
+        data['product.product'][i] = {
+            'id': i, 'name': name, 'barcode': _ean13(750000000000 + i), 'default_code': f'P{i:06d}',
+            'list_price': round(rng.uniform(0.5, 250), 2), 'qty_available': rng.randint(0, 500),
+            'uom_id': [1, 'Unidad(es)'], 'product_tmpl_id': [i, name], 'active': True,
+            'write_date': stamp(rng.randint(0, 100000)),
+        }
+
+    data['stock.picking.type'][1] = {'id': 1, 'name': 'Transferencias internas', 'code': 'internal'}
+
+    move_id = 0
+    for i in range(1, pickings + 1):
+        source, dest = rng.sample(internal_ids, 2)
+        picking = {
+            'id': i, 'name': f'WH/INT/{i:05d}', 'origin': f'Pedido {i}', 'state': rng.choice(STATES_OPEN + ['done']),
+            'picking_type_id': [1, 'Transferencias internas'],
+            'location_id': [source, data['stock.location'][source]['complete_name']],
+            'location_dest_id': [dest, data['stock.location'][dest]['complete_name']],
+            'move_ids_without_package': [], 'move_line_ids': [],
+            'create_date': stamp(rng.randint(0, 5000)), 'write_date': stamp(rng.randint(0, 5000)),
+        }
+        for product_id in rng.sample(range(1, products + 1), min(moves_per_picking, products)):
+            move_id += 1
+            product = data['product.product'][product_id]
+            qty = float(rng.randint(1, 20))
+            data['stock.move'][move_id] = {
+                'id': move_id, 'name': f"Movimiento de {product['barcode']}",
+                'picking_id': [i, picking['name']], 'product_id': [product_id, product['name']],
+                'product_uom_qty': qty, 'product_uom': [1, 'Unidad(es)'], 'state': picking['state'],
+                'location_id': picking['location_id'], 'location_dest_id': picking['location_dest_id'],
+            }
+            data['stock.move.line'][move_id] = {
+                'id': move_id, 'picking_id': [i, picking['name']], 'move_id': [move_id, product['name']],
+                'product_id': [product_id, product['name']], 'product_uom_qty': qty,
+            }
+            picking['move_ids_without_package'].append(move_id)
+            picking['move_line_ids'].append(move_id)
+        data['stock.picking'][i] = picking
+
+    quant_id = 0
+    for product_id in range(1, products + 1):
+        for location_id in rng.sample(internal_ids, min(2, len(internal_ids))):
+            quant_id += 1
+            data['stock.quant'][quant_id] = {
+                'id': quant_id, 'product_id': [product_id, data['product.product'][product_id]['name']],
+                'location_id': [location_id, data['stock.location'][location_id]['complete_name']],
+                'quantity': float(rng.randint(0, 200)), 'reserved_quantity': 0.0,
+            }
+
+    return data
+
+
+class OdooError(Exception):
+    """Error devuelto al cliente como Fault (XML-RPC) o error JSON-RPC"""
+
+
+class FakeOdoo:
+    """Implementación en memoria de los métodos de ORM usados por la aplicación"""
+
+    def __init__(self, data, latency=0.0):
+        self.data = data
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.stats_lock = threading.Lock()
+        self.reset_stats()
+
+    # --- Estadísticas de llamadas ---------------------------------------------
+
+    def reset_stats(self):
+        with self.stats_lock:
+            self.calls = Counter()
+            self.bytes_in = 0
+            self.bytes_out = 0
+
+    def record_call(self, name, bytes_in, bytes_out):
+        with self.stats_lock:
+            self.calls[name] += 1
+            self.bytes_in += bytes_in
+            self.bytes_out += bytes_out
+
+    def stats(self):
+        with self.stats_lock:
+            return {
+                'rpcs': sum(self.calls.values()),
+                'calls': dict(self.calls),
+                'bytes_in': self.bytes_in,
+                'bytes_out': self.bytes_out,
+            }
+
+    # --- Evaluación de dominios ---------------------------------------------
+
+    def _value(self, record, field):
+        # Campos relacionales con punto (product_tmpl_id.write_date): se
+        # aproximan con el campo final del propio registro
+        if '.' in field:
+            field = field.rsplit('.', 1)[1]
+        value = record.get(field, False)
+        if isinstance(value, list) and len(value) == 2 and isinstance(value[1], str):
+            return value[0]
+        return value
+
+    def _match_leaf(self, record, leaf):
+        field, operator, target = leaf
+        value = self._value(record, field)
+        if operator == '=':
+            return value == target or (target is False and not value)
+        if operator == '!=':
+            return value != target and not (target is False and not value)
+        if operator == 'in':
+            if isinstance(value, list):
+                return any(v in target for v in value)
+            return value in target
+        if operator == 'not in':
+            return value not in target
+        if operator in ('ilike', 'like'):
+            return str(target).lower() in str(value or '').lower()
+        if operator == '=ilike':
+            return str(target).lower() == str(value or '').lower()
+        if operator == 'child_of':
+            targets = target if isinstance(target, list) else [target]
+            return value in self._descendants('stock.location', targets)
+        if operator in ('>', '<', '>=', '<='):
+            if value is False:
+                return False
+            return {'>': value > target, '<': value < target, '>=': value >= target, '<=': value <= target}[operator]
+        raise OdooError(f"Operador no soportado: {operator}")
+
+    def _descendants(self, model, ids):
+        result = set(ids)
+        changed = True
+        while changed:
+            changed = False
+            for record in self.data[model].values():
+                parent = record.get('location_id')
+                if parent and parent[0] in result and record['id'] not in result:
+                    result.add(record['id'])
+                    changed = True
+        return result
+
+    def _match(self, record, domain):
+        stack = []
+        for token in reversed(domain):
+            if token in ('|', '&'):
+                first, second = stack.pop(), stack.pop()
+                stack.append(first or second if token == '|' else first and second)
+            elif token == '!':
+                stack.append(not stack.pop())
+            else:
+                stack.append(self._match_leaf(record, token))
+        return all(stack)
+
+    # --- Métodos del ORM ------------------------------------------------------
+
+    def _records(self, model):
+        if model not in self.data:
+            raise OdooError(f"Modelo desconocido: {model}")
+        return self.data[model]
+
+    def _read(self, record, fields):
+        if not fields:
+            return dict(record)
+        result = {'id': record['id']}
+        for field in fields:
+            result[field] = record.get(field, False)
+        return result
+
+    def search(self, model, domain, offset=0, limit=None, order=None, count=False):
+        records = [r for r in self._records(model).values() if self._match(r, domain)]
+        if order:
+            key, _, direction = order.partition(' ')
+            records.sort(key=lambda r: r.get(key) or 0, reverse=direction.strip().lower() == 'desc')
+        if count:
+            return len(records)
+        records = records[offset:offset + limit if limit else None]
+        return [r['id'] for r in records]
+
+    def execute(self, model, method, args, kwargs):
+        with self.lock:
+            records = self._records(model)
+
+            if method in ('search', 'search_count'):
+                domain = args[0] if args else kwargs.get('domain', [])
+                return self.search(model, domain, kwargs.get('offset', 0), kwargs.get('limit'),
+                                   kwargs.get('order'), count=method == 'search_count')
+
+            if method == 'search_read':
+                domain = args[0] if args else kwargs.get('domain', [])
+                ids = self.search(model, domain, kwargs.get('offset', 0), kwargs.get('limit'), kwargs.get('order'))
+                return [self._read(records[i], kwargs.get('fields')) for i in ids]
+
+            if method == 'read':
+                ids = args[0]
+                ids = ids if isinstance(ids, list) else [ids]
+                fields = kwargs.get('fields') or (args[1] if len(args) > 1 else None)
+                return [self._read(records[i], fields) for i in ids if i in records]
+
+            if method == 'read_group':
+                domain, fields, groupby = args[0], args[1], args[2]
+                groupby = groupby[0] if isinstance(groupby, list) else groupby
+                groups = {}
+                for record in records.values():
+                    if not self._match(record, domain):
+                        continue
+                    key = record.get(groupby)
+                    key = tuple(key) if isinstance(key, list) else key
+                    group = groups.setdefault(key, {groupby: record.get(groupby), f'{groupby}_count': 0})
+                    group[f'{groupby}_count'] += 1
+                    for field in fields:
+                        name = field.split(':')[0]
+                        if name != groupby and isinstance(record.get(name), (int, float)):
+                            group[name] = group.get(name, 0) + record[name]
+                return list(groups.values())
+
+            if method == 'create':
+                values = args[0]
+                created = [self._create(model, vals) for vals in (values if isinstance(values, list) else [values])]
+                return created if isinstance(values, list) else created[0]
+
+            if method == 'write':
+                ids, vals = args[0], args[1]
+                for record_id in (ids if isinstance(ids, list) else [ids]):
+                    records[record_id].update(self._normalize(model, vals))
+                    records[record_id]['write_date'] = self._now()
+                return True
+
+            if method == 'unlink':
+                ids = args[0]
+                for record_id in (ids if isinstance(ids, list) else [ids]):
+                    record = records.pop(record_id, None)
+                    # Como en Odoo, un movimiento eliminado deja de estar en su transferencia
+                    if model == 'stock.move' and record and record.get('picking_id'):
+                        picking = self.data['stock.picking'].get(record['picking_id'][0])
+                        if picking is not None and record_id in picking['move_ids_without_package']:
+                            picking['move_ids_without_package'].remove(record_id)
+                return True
+
+            if method == 'action_confirm':
+                return self._set_state(model, args[0], 'confirmed')
+
+            if method == 'button_validate':
+                return self._set_state(model, args[0], 'done')
+
+            if method == 'process':
+                return True
+
+            raise OdooError(f"Método no soportado: {model}.{method}")
+
+    @staticmethod
+    def _now():
+        return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+    def _normalize(self, model, vals):
+        """Convertir IDs de campos many2one en pares [id, nombre]"""
+        relations = {
+            'location_id': 'stock.location', 'location_dest_id': 'stock.location',
+            'product_id': 'product.product', 'picking_id': 'stock.picking',
+            'picking_type_id': 'stock.picking.type', 'product_uom': None,
+        }
+        normalized = {}
+        for field, value in vals.items():
+            if field in relations and isinstance(value, int) and not isinstance(value, bool):
+                related = self.data.get(relations[field] or '', {}).get(value, {})
+                value = [value, related.get('complete_name') or related.get('name') or str(value)]
+            normalized[field] = value
+        return normalized
+
+    def _create(self, model, vals):
+        records = self._records(model)
+        record_id = max(records, default=0) + 1
+        record = {'id': record_id, 'state': 'draft', 'create_date': self._now(), 'write_date': self._now()}
+        record.update(self._normalize(model, vals))
+        if model == 'stock.picking':
+            record.setdefault('name', f'WH/INT/{record_id:05d}')
+            record.setdefault('move_ids_without_package', [])
+            record.setdefault('move_line_ids', [])
+        records[record_id] = record
+        if model == 'stock.move' and record.get('picking_id'):
+            picking = self.data['stock.picking'].get(record['picking_id'][0])
+            if picking is not None:
+                picking['move_ids_without_package'].append(record_id)
+        return record_id
+
+    def _set_state(self, model, ids, state):
+        ids = ids if isinstance(ids, list) else [ids]
+        for record_id in ids:
+            record = self._records(model)[record_id]
+            record['state'] = state
+            record['write_date'] = self._now()
+            if model == 'stock.picking':
+                for move_id in record.get('move_ids_without_package', []):
+                    self.data['stock.move'][move_id]['state'] = state
+        return True
+
+    # --- Servicios ------------------------------------------------------------
+
+    def dispatch(self, service, method, args):
+        if service == 'common':
+            if method == 'authenticate':
+                return FAKE_UID
+            if method == 'version':
+                return {'server_version': '12.0-fake', 'protocol_version': 1}
+            raise OdooError(f"Método no soportado: common.{method}")
+        if service == 'object' and method == 'execute_kw':
+            model, model_method = args[3], args[4]
+            model_args = args[5] if len(args) > 5 else []
+            model_kwargs = args[6] if len(args) > 6 else {}
+            return self.execute(model, model_method, model_args, model_kwargs or {})
+        raise OdooError(f"Servicio no soportado: {service}.{method}")
+
+
+class FakeOdooHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Cabeceras y cuerpo salen en escrituras separadas: sin esto, Nagle y el
+    # ACK retardado añaden ~40 ms a cada respuesta en conexiones keep-alive
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/_stats':
+            self._send(json.dumps(self.server.odoo.stats()).encode('utf-8'), 'application/json')
+        else:
+            self.send_error(404)
+
+    @staticmethod
+    def _call_name(service, method, args):
+        if service == 'object' and method == 'execute_kw' and len(args) > 4:
+            return f'{args[3]}.{args[4]}'
+        return f'{service}.{method}'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        odoo = self.server.odoo
+
+        if self.path == '/_reset':
+            odoo.reset_stats()
+            self._send(b'{}', 'application/json')
+            return
+
+        if self.path.startswith('/xmlrpc/2/'):
+            service = self.path.rsplit('/', 1)[1]
+            params, method = xmlrpc.client.loads(body)
+            name = self._call_name(service, method, params)
+            try:
+                result = odoo.dispatch(service, method, list(params))
+                response = xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True)
+            except Exception as e:
+                response = xmlrpc.client.dumps(xmlrpc.client.Fault(1, str(e)), allow_none=True)
+            payload, content_type = response.encode('utf-8'), 'text/xml'
+
+        elif self.path == '/jsonrpc':
+            request = json.loads(body)
+            params = request.get('params', {})
+            name = self._call_name(params.get('service'), params.get('method'), params.get('args', []))
+            try:
+                result = odoo.dispatch(params.get('service'), params.get('method'), params.get('args', []))
+                response = {'jsonrpc': '2.0', 'id': request.get('id'), 'result': result}
+            except Exception as e:
+                response = {'jsonrpc': '2.0', 'id': request.get('id'), 'error': {
+                    'code': 200, 'message': 'Odoo Server Error', 'data': {'name': type(e).__name__, 'message': str(e)},
+                }}
+            payload, content_type = json.dumps(response).encode('utf-8'), 'application/json'
+
+        else:
+            self.send_error(404)
+            return
+
+        # Latencia simulada de red y servidor (fuera del lock: las llamadas
+        # concurrentes esperan en paralelo, como con un Odoo real)
+        if odoo.latency:
+            time.sleep(odoo.latency)
+        odoo.record_call(name, len(body), len(payload))
+        self._send(payload, content_type)
+
+
+def start_server(data, host='127.0.0.1', port=0, latency=0.0):
+    """
+    Arrancar el servidor en un hilo de este proceso
+
+    Args:
+        latency: segundos de espera añadidos a cada llamada
+
+    Returns:
+        tuple: (servidor, URL base)
+    """
+    server = ThreadingHTTPServer((host, port), FakeOdooHandler)
+    server.daemon_threads = True
+    server.odoo = FakeOdoo(data, latency)
+    threading.Thread(target=server.serve_forever, name='fake-odoo', daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def spawn_server(**options):
+    """
+    Arrancar el servidor en un proceso aparte (para no mezclar su CPU con la del cliente)
+
+    Args:
+        options: opciones de la línea de comandos (products, pickings, latency, ...)
+
+    Returns:
+        tuple: (proceso, URL base)
+    """
+    command = [sys.executable, '-m', 'benchmarks.fake_odoo', '--port', '0']
+    for option, value in options.items():
+        command += [f"--{option.replace('_', '-')}", str(value)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    url = process.stdout.readline().strip()
+    if not url.startswith('http'):
+        process.kill()
+        raise RuntimeError('No se pudo arrancar el servidor de Odoo simulado')
+    return process, url
+
+
+def fetch_stats(url):
+    """Estadísticas de llamadas de un servidor simulado en marcha"""
+    with urllib.request.urlopen(f'{url}/_stats') as response:
+        return json.loads(response.read())
+
+
+def reset_stats(url):
+    """Poner a cero las estadísticas de llamadas de un servidor simulado"""
+    urllib.request.urlopen(urllib.request.Request(f'{url}/_reset', data=b'', method='POST')).close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Servidor local que imita a Odoo')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8069)
+    parser.add_argument('--products', type=int, default=1000)
+    parser.add_argument('--pickings', type=int, default=100)
+    parser.add_argument('--moves-per-picking', type=int, default=5)
+    parser.add_argument('--locations', type=int, default=40)
+    parser.add_argument('--latency', type=float, default=0.0, help='segundos añadidos a cada llamada')
+    args = parser.parse_args(argv)
+
+    data = build_dataset(args.products, args.pickings, args.moves_per_picking, args.locations)
+    server, url = start_server(data, args.host, args.port, args.latency)
+    print(url, flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
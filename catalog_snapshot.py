@@ -0,0 +1,351 @@
+# catalog_snapshot.py
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from array import array
+
+from product_catalog import CompactCatalog
+
+# Formato del archivo (little-endian):
+#   cabecera   HEADER
+#   registros  RECORD x número de productos, ordenados por código de barras
+#   índice     tabla hash de direccionamiento abierto: uint32 por cubeta con
+#              (posición del registro + 1), 0 = vacía; crc32 del código
+#   textos     códigos, nombres y referencias en UTF-8 (desplazamientos
+#              relativos al inicio de esta sección)
+MAGIC = b'PCATSNAP'
+VERSION = 1
+HEADER = struct.Struct('<8sIIIIQQQQd')   # magic, versión, productos, cubetas, reservado,
+                                         # registros, índice, textos, generación, fecha
+RECORD = struct.Struct('<iidIIIIII')     # id, uom_id, precio, código (desp, long),
+                                         # nombre (desp, long), referencia (desp, long)
+BUCKET = struct.Struct('<I')
+
+
+def _bucket_count(records):
+    count = 8
+    while count < records * 2:
+        count *= 2
+    return count
+
+
+def write_snapshot(path, catalog, generation):
+    """
+    Escribir un CompactCatalog como archivo de instantánea
+
+    Se escribe en un archivo temporal del mismo directorio y se renombra al
+    final: quien abra `path` ve siempre una instantánea completa.
+    """
+    count = len(catalog)
+    buckets = _bucket_count(count)
+    mask = buckets - 1
+
+    records = bytearray(RECORD.size * count)
+    index = array('I', bytes(4 * buckets))
+    strings = []
+    strings_size = 0
+    names, codes = catalog.names, catalog.codes
+
+    for position in range(count):
+        barcode = catalog.barcodes[position].encode('utf-8')
+        name = names.data[names.offsets[position]:names.offsets[position + 1]]
+        code = codes.data[codes.offsets[position]:codes.offsets[position + 1]]
+        fields = []
+        for text in (barcode, name, code):
+            fields += [strings_size, len(text)]
+            strings.append(text)
+            strings_size += len(text)
+        RECORD.pack_into(records, position * RECORD.size,
+                         catalog.ids[position], catalog.uom_ids[position], catalog.prices[position], *fields)
+
+        bucket = zlib.crc32(barcode) & mask
+        while index[bucket]:
+            bucket = (bucket + 1) & mask
+        index[bucket] = position + 1
+
+    records_offset = HEADER.size
+    index_offset = records_offset + len(records)
+    strings_offset = index_offset + 4 * buckets
+    header = HEADER.pack(MAGIC, VERSION, count, buckets, 0,
+                         records_offset, index_offset, strings_offset, generation, time.time())
+
+    directory = os.path.dirname(os.path.abspath(path))
+    temp_path = os.path.join(directory, f'.{os.path.basename(path)}.{os.getpid()}.tmp')
+    try:
+        with open(temp_path, 'wb') as f:
+            f.write(header)
+            f.write(records)
+            f.write(index.tobytes())
+            for text in strings:
+                f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def read_header(path):
+    """Cabecera de una instantánea como dict (None si no existe o no es válida)"""
+    try:
+        with open(path, 'rb') as f:
+            data = f.read(HEADER.size)
+    except OSError:
+        return None
+    if len(data) < HEADER.size:
+        return None
+    magic, version, count, buckets, _, _, _, _, generation, built_at = HEADER.unpack(data)
+    if magic != MAGIC or version != VERSION:
+        return None
+    return {'products': count, 'buckets': buckets, 'generation': generation, 'built_at': built_at}
+
+
+class CatalogSnapshot:
+    """
+    Instantánea del catálogo abierta en memoria compartida (mmap de solo lectura).
+
+    Las búsquedas leen directamente del archivo mapeado, sin copiarlo: todos
+    los procesos que abren el mismo archivo comparten sus páginas en la
+    caché del sistema operativo. Tiene la misma interfaz de búsqueda que
+    CompactCatalog.
+
+    Args:
+        path: ruta del archivo escrito con write_snapshot
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.identity = (stat.st_dev, stat.st_ino, stat.st_mtime_ns)
+        self.size = stat.st_size
+        (magic, version, self.count, self.buckets, _, self._records, self._index, self._strings,
+         self.generation, self.built_at) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} no es una instantánea de catálogo válida')
+        self._mask = self.buckets - 1
+
+    def __len__(self):
+        return self.count
+
+    def _text(self, offset, length):
+        start = self._strings + offset
+        return self._mm[start:start + length].decode('utf-8')
+
+    def _position(self, barcode):
+        encoded = str(barcode).encode('utf-8')
+        mm, strings = self._mm, self._strings
+        bucket = zlib.crc32(encoded) & self._mask
+        while True:
+            slot = BUCKET.unpack_from(mm, self._index + 4 * bucket)[0]
+            if not slot:
+                return None
+            position = slot - 1
+            offset, length = struct.unpack_from('<II', mm, self._records + position * RECORD.size + 16)
+            if length == len(encoded) and mm[strings + offset:strings + offset + length] == encoded:
+                return position
+            bucket = (bucket + 1) & self._mask
+
+    def _record(self, position):
+        (product_id, uom_id, price, barcode_offset, barcode_length, name_offset, name_length,
+         code_offset, code_length) = RECORD.unpack_from(self._mm, self._records + position * RECORD.size)
+        return {
+            'id': product_id,
+            'barcode': self._text(barcode_offset, barcode_length),
+            'name': self._text(name_offset, name_length),
+            'default_code': self._text(code_offset, code_length) or False,
+            'list_price': price,
+            'uom_id': uom_id or False,
+        }
+
+    def get(self, barcode):
+        """Producto con ese código de barras o None"""
+        position = self._position(barcode)
+        return None if position is None else self._record(position)
+
+    def lookup_many(self, barcodes):
+        """
+        Buscar varios códigos a la vez
+
+        Returns:
+            tuple: ({barcode: producto}, [códigos no encontrados])
+        """
+        found, missing = {}, []
+        for barcode in dict.fromkeys(str(barcode) for barcode in barcodes):
+            position = self._position(barcode)
+            if position is None:
+                missing.append(barcode)
+            else:
+                found[barcode] = self._record(position)
+        return found, missing
+
+    def records(self):
+        """Todos los productos, ordenados por código de barras (generador)"""
+        for position in range(self.count):
+            yield self._record(position)
+
+
+class SharedProductCatalog:
+    """
+    Catálogo de productos compartido entre varios procesos de la aplicación.
+
+    El catálogo vive en un archivo de instantánea mapeado en memoria. Cada
+    proceso revisa cada `check_interval` segundos si apareció una
+    generación nueva (el archivo se reemplaza con un renombrado atómico) y
+    cambia a ella; la anterior se libera cuando terminan las búsquedas que
+    la usan. Cuando la instantánea supera `refresh_interval`, solo el
+    proceso que consigue el bloqueo del archivo .lock la reconstruye desde
+    Odoo; los demás siguen usando la actual hasta que aparece la nueva.
+
+    Misma interfaz que ProductCatalog: mientras no haya instantánea, o para
+    los códigos que no contiene, quien lo usa debe consultar a Odoo.
+
+    Args:
+        path: ruta del archivo de instantánea
+        loader: función sin argumentos que devuelve un iterable de registros
+            de product.product con CATALOG_FIELDS (o None si falla)
+        refresh_interval: antigüedad máxima de la instantánea en segundos
+        check_interval: segundos entre comprobaciones de generación nueva
+    """
+
+    def __init__(self, path, loader, refresh_interval=600, check_interval=5):
+        self.path = os.path.abspath(path)
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.check_interval = check_interval
+        self._snapshot = None
+        self._lock = threading.Lock()
+        self._thread = None
+        self._retry_at = 0
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    @property
+    def loaded_at(self):
+        snapshot = self._snapshot
+        return snapshot.built_at if snapshot is not None else None
+
+    def start(self):
+        """Abrir la instantánea existente y arrancar la vigilancia en segundo plano"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='product-catalog', daemon=True)
+            self._thread.start()
+        self.reopen()
+
+    def _run(self):
+        while True:
+            try:
+                self.reopen()
+                snapshot = self._snapshot
+                stale = snapshot is None or time.time() - snapshot.built_at > self.refresh_interval
+                if stale and time.time() >= self._retry_at:
+                    self.refresh(wait=False)
+            except Exception as e:
+                print(f"Error al vigilar el catálogo compartido: {str(e)}")
+            time.sleep(self.check_interval)
+
+    def reopen(self):
+        """Cambiar a la instantánea del archivo si es distinta de la abierta"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return False
+        current = self._snapshot
+        if current is not None and current.identity == (stat.st_dev, stat.st_ino, stat.st_mtime_ns):
+            return False
+        try:
+            snapshot = CatalogSnapshot(self.path)
+        except (OSError, ValueError) as e:
+            print(f"No se pudo abrir la instantánea del catálogo: {str(e)}")
+            return False
+        self._snapshot = snapshot
+        return True
+
+    def refresh(self, wait=True):
+        """
+        Reconstruir la instantánea desde Odoo (un solo proceso a la vez)
+
+        Args:
+            wait: esperar al bloqueo si otro proceso está reconstruyendo; si
+                es False y está ocupado no se hace nada
+
+        Returns:
+            bool: True si este proceso escribió una generación nueva
+        """
+        # Solo existe en sistemas POSIX; se importa aquí para que importar el
+        # módulo (y leer instantáneas) funcione en cualquier sistema
+        import fcntl
+
+        with open(self.path + '.lock', 'a') as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if wait else fcntl.LOCK_NB))
+            except BlockingIOError:
+                return False
+            try:
+                header = read_header(self.path)
+                # Otro proceso pudo reconstruirla mientras se esperaba el bloqueo
+                if not wait and header and time.time() - header['built_at'] <= self.refresh_interval:
+                    return False
+                started = time.time()
+                # Si Odoo falla no se reintenta hasta el siguiente intervalo
+                self._retry_at = started + self.refresh_interval
+                records = self.loader()
+                if records is None:
+                    return False
+                catalog = CompactCatalog(records)
+                generation = (header['generation'] if header else 0) + 1
+                write_snapshot(self.path, catalog, generation)
+                del catalog
+                print(f"Catálogo compartido actualizado: generación {generation}, "
+                      f"{os.path.getsize(self.path) / 1048576:.1f} MB en {time.time() - started:.1f}s")
+            except Exception as e:
+                print(f"Error al reconstruir el catálogo compartido: {str(e)}")
+                return False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+        self.reopen()
+        return True
+
+    def get(self, barcode):
+        """Producto con ese código de barras o None (también si no hay instantánea)"""
+        snapshot = self._snapshot
+        return snapshot.get(barcode) if snapshot is not None else None
+
+    def lookup_many(self, barcodes):
+        """
+        Buscar varios códigos a la vez
+
+        Returns:
+            tuple: ({barcode: producto}, [códigos no encontrados o todos si no hay instantánea])
+        """
+        snapshot = self._snapshot
+        if snapshot is None:
+            return {}, list(dict.fromkeys(str(barcode) for barcode in barcodes))
+        return snapshot.lookup_many(barcodes)
+
+    def records(self):
+        """Todos los productos de la instantánea (generador), o None si no hay"""
+        snapshot = self._snapshot
+        return snapshot.records() if snapshot is not None else None
+
+    def stats(self):
+        snapshot = self._snapshot
+        return {
+            'ready': snapshot is not None,
+            'products': len(snapshot) if snapshot is not None else 0,
+            'generation': snapshot.generation if snapshot is not None else None,
+            'file_bytes': snapshot.size if snapshot is not None else 0,
+            'loaded_at': snapshot.built_at if snapshot is not None else None,
+        }
+
+    def __len__(self):
+        snapshot = self._snapshot
+        return len(snapshot) if snapshot is not None else 0
@@ -0,0 +1,333 @@
+# inventory_transfer.py
+"""
+Creación de transferencias internas en Odoo.
+
+No depende de Flask: lo usan la aplicación web (escaneos, bandeja de envíos
+y sesiones de escaneo) y el procesamiento por lotes de batch_cli.
+"""
+from odoo_client import is_retryable_error
+
+# Límites de una transferencia (XML-RPC generalmente tiene límite de 2^31-1)
+MAX_TRANSFER_PRODUCTS = 20
+MAX_PRODUCT_QUANTITY = 100
+
+# Política por defecto si la ubicación origen no tiene stock suficiente
+DEFAULT_AVAILABILITY_POLICY = 'flag'
+
+
+def describe_shortages(shortages):
+    """Texto corto con los faltantes de stock"""
+    return ', '.join(f"{s['barcode']} ({s['available']}/{s['requested']})" for s in shortages)
+
+
+def limit_transfer_products(products_data):
+    """
+    Aplicar los límites de una transferencia: 100 unidades por producto y 20 productos distintos
+
+    Args:
+        products_data: diccionario {barcode: quantity}
+
+    Returns:
+        dict: {barcode: quantity} dentro de los límites (se conservan los primeros productos)
+    """
+    limited_products = {}
+    for barcode, qty in products_data.items():
+        if qty > MAX_PRODUCT_QUANTITY:
+            print(f"Producto {barcode} tiene {qty} unidades, limitando a {MAX_PRODUCT_QUANTITY}")
+            limited_products[barcode] = MAX_PRODUCT_QUANTITY
+        else:
+            limited_products[barcode] = qty
+
+    if len(limited_products) > MAX_TRANSFER_PRODUCTS:
+        print(f"Demasiados productos diferentes, limitando a {MAX_TRANSFER_PRODUCTS}")
+        limited_products = dict(list(limited_products.items())[:MAX_TRANSFER_PRODUCTS])
+
+    return limited_products
+
+
+def split_transfer_products(products_data):
+    """
+    Repartir un conteo en partes que respetan los límites de una transferencia
+
+    Las cantidades de más de 100 unidades se reparten en varias partes (como
+    hace la bandeja de envíos), así que no se pierde ninguna unidad. Si
+    ninguna cantidad supera el límite, las partes son bloques consecutivos de
+    20 productos.
+
+    Args:
+        products_data: diccionario {barcode: quantity}
+
+    Returns:
+        list: diccionarios {barcode: quantity}, uno por transferencia
+    """
+    parts = []
+    for barcode, qty in products_data.items():
+        position = 0
+        while qty > 0:
+            # Primera parte que aún no tiene este producto y admite uno más
+            while position < len(parts) and (barcode in parts[position] or
+                                             len(parts[position]) >= MAX_TRANSFER_PRODUCTS):
+                position += 1
+            if position == len(parts):
+                parts.append({})
+            parts[position][barcode] = min(qty, MAX_PRODUCT_QUANTITY)
+            qty -= parts[position][barcode]
+    return parts
+
+
+class InventoryTransfers:
+    """
+    Transferencias internas en Odoo con los límites y la política de stock de la aplicación
+
+    Args:
+        client: OdooClient a usar
+        get_config: función que devuelve la configuración de Odoo vigente
+            (db, password y availability_policy)
+    """
+
+    def __init__(self, client, get_config):
+        self.client = client
+        self.get_config = get_config
+
+    def connect(self):
+        """Establecer conexión con Odoo y devolver uid y models (None, None si falla)"""
+        try:
+            uid = self.client.authenticate()
+            return uid, self.client.models
+        except Exception as e:
+            print(f"Error al conectar con Odoo: {str(e)}")
+            return None, None
+
+    def connection_error(self):
+        """Mensaje de error de conexión, indicando si el circuito está abierto"""
+        breaker = self.client.breaker.snapshot()
+        if breaker['state'] != 'closed':
+            return (f"Odoo no disponible ({breaker['last_error']}). "
+                    f"Reintento automático en {breaker['retry_in'] or 0:.0f}s")
+        return 'Error de conexión con Odoo'
+
+    def find_source_shortages(self, models, uid, source_location_id, requested):
+        """
+        Comparar las cantidades pedidas con el stock libre de la ubicación origen
+
+        Hace una sola consulta read_group sobre stock.quant para todos los
+        productos (incluyendo las sububicaciones del origen).
+
+        Args:
+            models: proxy de modelos de Odoo
+            uid: ID de usuario
+            source_location_id: ID de la ubicación origen
+            requested: {product_id: (barcode, cantidad pedida)}
+
+        Returns:
+            list: [{'barcode', 'requested', 'available'}] de los productos con faltante
+        """
+        config = self.get_config()
+        groups = models.execute_kw(
+            config['db'], uid, config['password'],
+            'stock.quant', 'read_group',
+            [[('product_id', 'in', list(requested)), ('location_id', 'child_of', int(source_location_id))],
+             ['product_id', 'quantity', 'reserved_quantity'],
+             ['product_id']],
+            {'lazy': False}
+        )
+        available = {}
+        for group in groups:
+            if group.get('product_id'):
+                available[group['product_id'][0]] = (group.get('quantity') or 0) - (group.get('reserved_quantity') or 0)
+
+        shortages = []
+        for product_id, (barcode, qty) in requested.items():
+            free = max(available.get(product_id, 0), 0)
+            if free < qty:
+                shortages.append({'barcode': barcode, 'requested': qty, 'available': int(free)})
+        return shortages
+
+    def apply_availability_policy(self, models, uid, source_location_id, requested, product_ids):
+        """
+        Comprobar el stock de la ubicación origen según availability_policy
+
+        Args:
+            models: proxy de modelos de Odoo
+            uid: ID de usuario
+            source_location_id: ID de la ubicación origen
+            requested: {barcode: cantidad} de productos encontrados en Odoo
+            product_ids: {barcode: product_id}
+
+        Returns:
+            tuple: ({barcode: cantidad} a transferir (recortada con 'trim'),
+                    lista de faltantes, mensaje de rechazo o None)
+        """
+        requested = dict(requested)
+        shortages = []
+        policy = self.get_config().get('availability_policy', DEFAULT_AVAILABILITY_POLICY)
+        if requested and policy != 'off':
+            shortages = self.find_source_shortages(models, uid, source_location_id, {
+                product_ids[barcode]: (barcode, qty) for barcode, qty in requested.items()
+            })
+            if shortages and policy == 'reject':
+                return requested, shortages, 'Stock insuficiente en la ubicación origen: ' + describe_shortages(shortages)
+            if shortages and policy == 'trim':
+                for shortage in shortages:
+                    if shortage['available'] > 0:
+                        requested[shortage['barcode']] = shortage['available']
+                    else:
+                        del requested[shortage['barcode']]
+
+        if not requested:
+            return requested, shortages, ('No se encontraron productos válidos' if not shortages else
+                                          'Sin stock en la ubicación origen: ' + describe_shortages(shortages))
+        return requested, shortages, None
+
+    def create(self, source_location_id, dest_location_id, products_data, idempotency_key=None):
+        """
+        Crear transferencia interna en Odoo
+
+        Args:
+            source_location_id: ID de la ubicación origen
+            dest_location_id: ID de la ubicación destino
+            products_data: diccionario {barcode: quantity}
+            idempotency_key: clave opcional; si ya existe una transferencia
+                confirmada con esa clave no se crea otra
+
+        Returns:
+            dict: Resultado de la operación ('retryable' indica si el error es temporal)
+        """
+        try:
+            # Log para depuración
+            print(f"Source location ID: {source_location_id}, type: {type(source_location_id)}")
+            print(f"Dest location ID: {dest_location_id}, type: {type(dest_location_id)}")
+            print(f"Número de productos diferentes: {len(products_data)}")
+            print(f"Total de unidades: {sum(products_data.values())}")
+
+            # Verificar que las ubicaciones son válidas
+            if not source_location_id or not dest_location_id:
+                return {'success': False, 'message': 'Debes seleccionar ubicaciones de origen y destino'}
+
+            # Convertir a enteros después de validar
+            source_location_id = int(source_location_id)
+            dest_location_id = int(dest_location_id)
+
+            limited_products = limit_transfer_products(products_data)
+
+            # Conexión con Odoo
+            uid, models = self.connect()
+            if not uid or not models:
+                return {'success': False, 'message': self.connection_error(), 'retryable': True}
+            config = self.get_config()
+
+            origin = 'Transferencia desde App Scanner'
+            if idempotency_key:
+                origin = f'{origin} [{idempotency_key}]'
+
+                # Si un intento anterior ya creó la transferencia, no duplicarla
+                existing = models.execute_kw(
+                    config['db'], uid, config['password'],
+                    'stock.picking', 'search_read',
+                    [[('origin', '=', origin)]],
+                    {'fields': ['id', 'state', 'move_ids_without_package']}
+                )
+                for picking in existing:
+                    if picking['state'] != 'draft':
+                        return {
+                            'success': True,
+                            'picking_id': picking['id'],
+                            'products_count': len(picking['move_ids_without_package']),
+                            'products_not_found': []
+                        }
+                    # Transferencia incompleta de un intento interrumpido
+                    models.execute_kw(
+                        config['db'], uid, config['password'],
+                        'stock.picking', 'unlink', [picking['id']]
+                    )
+
+            # Resolver todos los productos con una sola consulta
+            products = models.execute_kw(
+                config['db'], uid, config['password'],
+                'product.product', 'search_read',
+                [[('barcode', 'in', list(limited_products))]],
+                {'fields': ['id', 'barcode', 'uom_id']}
+            )
+            products_by_barcode = {}
+            for product in products:
+                products_by_barcode.setdefault(product['barcode'], product)
+
+            products_not_found = [barcode for barcode in limited_products if barcode not in products_by_barcode]
+            requested = {barcode: qty for barcode, qty in limited_products.items() if barcode in products_by_barcode}
+
+            # Comprobar el stock de la ubicación origen antes de crear nada
+            requested, shortages, rejection = self.apply_availability_policy(
+                models, uid, source_location_id, requested,
+                {barcode: products_by_barcode[barcode]['id'] for barcode in requested}
+            )
+            if rejection:
+                return {
+                    'success': False,
+                    'message': rejection,
+                    'products_not_found': products_not_found,
+                    'shortages': shortages
+                }
+
+            # Crear picking (transferencia)
+            picking_type_ids = models.execute_kw(
+                config['db'], uid, config['password'],
+                'stock.picking.type', 'search',
+                [[('code', '=', 'internal')]]
+            )
+
+            if not picking_type_ids:
+                return {'success': False, 'message': 'No se encontró tipo de transferencia interna'}
+
+            picking_vals = {
+                'picking_type_id': picking_type_ids[0],
+                'location_id': source_location_id,
+                'location_dest_id': dest_location_id,
+                'origin': origin
+            }
+
+            picking_id = models.execute_kw(
+                config['db'], uid, config['password'],
+                'stock.picking', 'create', [picking_vals]
+            )
+
+            # Preparar un movimiento por producto
+            moves_to_create = []
+            for barcode, qty in requested.items():
+                product = products_by_barcode[barcode]
+                moves_to_create.append({
+                    'name': f'Movimiento de {barcode}',
+                    'product_id': product['id'],
+                    'product_uom_qty': qty,
+                    'picking_id': picking_id,
+                    'location_id': source_location_id,
+                    'location_dest_id': dest_location_id,
+                    'product_uom': product['uom_id'][0] if product.get('uom_id') else 1,
+                })
+
+            # Crear los movimientos en lote, máximo 5 a la vez para evitar límites
+            batch_size = 5
+            for i in range(0, len(moves_to_create), batch_size):
+                batch = moves_to_create[i:i+batch_size]
+                models.execute_kw(
+                    config['db'], uid, config['password'],
+                    'stock.move', 'create', [batch]
+                )
+                print(f"Creado lote {i//batch_size + 1} de {(len(moves_to_create) + batch_size - 1) // batch_size}")
+
+            # Confirmar la transferencia
+            models.execute_kw(
+                config['db'], uid, config['password'],
+                'stock.picking', 'action_confirm', [picking_id]
+            )
+
+            return {
+                'success': True,
+                'picking_id': picking_id,
+                'products_count': len(moves_to_create),
+                'products_not_found': products_not_found,
+                'shortages': shortages
+            }
+
+        except Exception as e:
+            print(f"Error en create_inventory_transfer: {str(e)}")
+            return {'success': False, 'message': str(e), 'retryable': is_retryable_error(e)}
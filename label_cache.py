@@ -0,0 +1,225 @@
+# label_cache.py
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def _default_renderer(barcode_number, product_name, price):
+    """Renderizar una etiqueta PNG con el generador estándar"""
+    from label_generator import generate_product_label
+
+    return generate_product_label(barcode_number, product_name, price).getvalue()
+
+
+def _barcode_tag(barcode_number):
+    """Prefijo estable del código de barras usado en los nombres de archivo"""
+    return hashlib.sha1(str(barcode_number).encode('utf-8')).hexdigest()[:16]
+
+
+class LabelCache:
+    """
+    Caché de etiquetas renderizadas en memoria y en disco.
+
+    Cada etiqueta se identifica por un hash de su contenido (código de barras,
+    nombre, precio y versión de la plantilla). Ambos niveles están acotados
+    en bytes y se desalojan por LRU. Al guardar una etiqueta nueva para un
+    código de barras, la versión anterior (otro nombre o precio) se elimina.
+    """
+
+    def __init__(self, cache_dir, max_memory_bytes=32 * 1024 * 1024,
+                 max_disk_bytes=256 * 1024 * 1024, template_version=None, renderer=None):
+        self.cache_dir = cache_dir
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self._template_version = template_version
+        self.renderer = renderer or _default_renderer
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()   # key -> bytes
+        self._memory_bytes = 0
+        self._disk = OrderedDict()     # key -> (etiqueta de código, tamaño en bytes)
+        self._disk_bytes = 0
+        self._by_barcode = {}          # etiqueta de código -> key vigente
+        self.hits = 0
+        self.misses = 0
+        self._started = False
+
+    def start(self):
+        """Crear el directorio y cargar el índice de disco (idempotente; se hace en el primer uso)"""
+        with self._lock:
+            if not self._started:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                self._load_disk_index()
+                self._started = True
+
+    def _load_disk_index(self):
+        """Reconstruir el índice de disco a partir de los archivos existentes"""
+        entries = []
+        for filename in os.listdir(self.cache_dir):
+            if not filename.endswith('.png') or '-' not in filename:
+                continue
+            path = os.path.join(self.cache_dir, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, filename[:-4], stat.st_size))
+
+        # Los más antiguos primero para respetar el orden LRU
+        for _, name, size in sorted(entries):
+            tag, key = name.split('-', 1)
+            previous = self._by_barcode.get(tag)
+            if previous:
+                self._remove_disk(previous)
+            self._by_barcode[tag] = key
+            self._disk[key] = (tag, size)
+            self._disk_bytes += size
+
+        self._evict_disk()
+
+    @property
+    def template_version(self):
+        # Por defecto la del generador estándar, que se importa (con PIL y
+        # python-barcode) la primera vez que se usa la caché, no al crearla
+        if self._template_version is None:
+            from label_generator import LABEL_TEMPLATE_VERSION
+            self._template_version = LABEL_TEMPLATE_VERSION
+        return self._template_version
+
+    def key(self, barcode_number, product_name, price):
+        """Calcular la clave de contenido de una etiqueta"""
+        payload = json.dumps(
+            [str(self.template_version), str(barcode_number), str(product_name), f"{float(price):.2f}"],
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, tag, key):
+        return os.path.join(self.cache_dir, f"{tag}-{key}.png")
+
+    def get_entry(self, barcode_number, product_name, price):
+        """
+        Obtener una etiqueta desde la caché, renderizándola si hace falta
+
+        Returns:
+            tuple: (clave, bytes PNG)
+        """
+        self.start()
+        key = self.key(barcode_number, product_name, price)
+        tag = _barcode_tag(barcode_number)
+
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                if key in self._disk:
+                    self._disk.move_to_end(key)
+                self.hits += 1
+                return key, data
+
+            if key in self._disk:
+                try:
+                    with open(self._path(tag, key), 'rb') as f:
+                        data = f.read()
+                    self._disk.move_to_end(key)
+                    self._put_memory(key, data)
+                    self.hits += 1
+                    return key, data
+                except OSError:
+                    self._disk_bytes -= self._disk.pop(key)[1]
+
+            self.misses += 1
+
+        # Renderizar fuera del candado para no bloquear otras consultas
+        data = self.renderer(barcode_number, product_name, price)
+
+        with self._lock:
+            previous = self._by_barcode.get(tag)
+            if previous and previous != key:
+                # Cambió el nombre o el precio: la versión anterior ya no sirve
+                self._memory_bytes -= len(self._memory.pop(previous, b''))
+                self._remove_disk(previous)
+            self._by_barcode[tag] = key
+            self._put_memory(key, data)
+            self._put_disk(tag, key, data)
+
+        return key, data
+
+    def get(self, barcode_number, product_name, price):
+        """Obtener los bytes PNG de una etiqueta (ver get_entry)"""
+        return self.get_entry(barcode_number, product_name, price)[1]
+
+    def read(self, key):
+        """Leer una etiqueta ya cacheada por su clave, o None si no existe"""
+        self.start()
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                return data
+            if key not in self._disk:
+                return None
+            path = self._path(self._disk[key][0], key)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _put_memory(self, key, data):
+        if len(data) > self.max_memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def _put_disk(self, tag, key, data):
+        if key in self._disk or len(data) > self.max_disk_bytes:
+            return
+        path = self._path(tag, key)
+        temp_path = path + '.tmp'
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except OSError as e:
+            print(f"Error al guardar etiqueta en caché: {str(e)}")
+            return
+        self._disk[key] = (tag, len(data))
+        self._disk_bytes += len(data)
+        self._evict_disk()
+
+    def _remove_disk(self, key):
+        entry = self._disk.pop(key, None)
+        if entry is None:
+            return
+        tag, size = entry
+        self._disk_bytes -= size
+        if self._by_barcode.get(tag) == key:
+            del self._by_barcode[tag]
+        try:
+            os.unlink(self._path(tag, key))
+        except OSError:
+            pass
+
+    def _evict_disk(self):
+        while self._disk_bytes > self.max_disk_bytes and self._disk:
+            self._remove_disk(next(iter(self._disk)))
+
+    def stats(self):
+        """Estadísticas de uso de la caché"""
+        self.start()
+        with self._lock:
+            return {
+                'memory_entries': len(self._memory),
+                'memory_bytes': self._memory_bytes,
+                'disk_entries': len(self._disk),
+                'disk_bytes': self._disk_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
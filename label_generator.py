@@ -1,6 +1,9 @@
 import io
 import os
-import cups
+import heapq
+import tempfile
+import threading
+import time
 import barcode
 from barcode.writer import ImageWriter
 from PIL import Image, ImageDraw, ImageFont
@@ -9,6 +12,14 @@ from reportlab.graphics import renderPM
 from reportlab.graphics.barcode import createBarcodeDrawing
 from reportlab.graphics.shapes import Drawing
 
+# Versión de la plantilla de etiqueta. Incrementar al cambiar el diseño de
+# generate_product_label para invalidar las etiquetas cacheadas.
+LABEL_TEMPLATE_VERSION = '1'
+
+# Estado HTTP 100 (Continue) con el que CUPS acepta cada parte de un trabajo.
+# Se usa este valor si pycups no está instalado (impresoras nulas, benchmarks)
+HTTP_CONTINUE = 100
+
 def generate_product_label(barcode_number, product_name, price, output_file=None):
     """
     Genera una etiqueta de producto con código de barras, nombre y precio
@@ -107,80 +118,181 @@ def generate_product_label(barcode_number, product_name, price, output_file=None
         output.seek(0)
         return output
 
-def print_label(image_path, printer_name=None, cups_server=None):
+# Formato MIME enviado a CUPS al transmitir etiquetas desde memoria
+LABEL_MIME_TYPE = 'image/png'
+
+# Opciones para etiqueta pequeña
+LABEL_PRINT_OPTIONS = {
+    # Especificar tamaño exacto de etiqueta
+    'media': 'Custom.38x30mm',
+    # Asegurar que la imagen se ajuste a la etiqueta
+    'fit-to-page': 'true',
+    'scaling': '100',
+    # Calidad de impresión
+    'print-quality': '5',  # Alta calidad
+    # Sin márgenes
+    'page-left': '0',
+    'page-right': '0',
+    'page-top': '0',
+    'page-bottom': '0'
+}
+
+
+class _TempFileReaper:
+    """
+    Elimina archivos temporales pendientes con un único hilo compartido.
+
+    Solo se usa cuando la versión de pycups no permite enviar trabajos
+    desde memoria y hay que recurrir a printFile con un archivo en disco.
+    """
+
+    def __init__(self, delay=10):
+        self.delay = delay
+        self._pending = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def schedule(self, path):
+        """Programar la eliminación de un archivo tras `delay` segundos"""
+        with self._lock:
+            heapq.heappush(self._pending, (time.monotonic() + self.delay, path))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='label-reaper', daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                timeout = None
+                now = time.monotonic()
+                while self._pending and self._pending[0][0] <= now:
+                    _, path = heapq.heappop(self._pending)
+                    try:
+                        os.unlink(path)
+                    except OSError:
+                        pass
+                if self._pending:
+                    timeout = self._pending[0][0] - now
+                self._wakeup.clear()
+            self._wakeup.wait(timeout)
+
+
+_reaper = _TempFileReaper()
+
+
+def _get_cups_connection(cups_server=None):
+    """Abrir conexión con el servidor CUPS (local si no se especifica)"""
+    import cups
+
+    if cups_server:
+        return cups.Connection(host=cups_server)
+    return cups.Connection()
+
+
+def _resolve_printer(conn, printer_name=None, cups_server=None):
+    """
+    Determinar la impresora a usar en la conexión dada
+
+    Si no se especifica, usa la predeterminada o, en su defecto, la primera
+    disponible. Lanza una excepción si la impresora no existe.
+    """
+    printers = conn.getPrinters()
+
+    # Si no se especifica impresora, usar la predeterminada
+    if not printer_name:
+        printer_name = conn.getDefault()
+
+        # Si no hay predeterminada, usar la primera disponible
+        if not printer_name and printers:
+            printer_name = list(printers.keys())[0]
+
+    # Verificar que la impresora existe
+    if printer_name not in printers:
+        raise Exception(f"Impresora '{printer_name}' no encontrada en servidor {cups_server or 'localhost'}")
+
+    return printer_name
+
+
+def _label_bytes(label):
+    """Obtener los bytes PNG de una etiqueta (bytes, BytesIO o ruta)"""
+    if isinstance(label, (bytes, bytearray)):
+        return bytes(label)
+    if hasattr(label, 'getvalue'):
+        return label.getvalue()
+    with open(label, 'rb') as f:
+        return f.read()
+
+
+def _submit_job(conn, printer_name, label, copies=1):
+    """
+    Enviar una etiqueta a CUPS como trabajo de impresión
+
+    Usa la API de trabajos en streaming de CUPS (createJob/startDocument/
+    writeRequestData/finishDocument) para enviar los bytes directamente desde
+    memoria. Si la versión de pycups no la soporta, escribe un archivo
+    temporal y lo deja a cargo del recolector compartido.
+    """
+    try:
+        from cups import HTTP_CONTINUE as http_continue
+    except ImportError:
+        http_continue = HTTP_CONTINUE
+
+    options = dict(LABEL_PRINT_OPTIONS)
+    if copies > 1:
+        options['copies'] = str(copies)
+
+    if isinstance(label, str):
+        return conn.printFile(printer_name, label, "Etiqueta de producto", options)
+
+    data = _label_bytes(label)
+
+    if not hasattr(conn, 'createJob'):
+        temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
+        try:
+            temp_file.write(data)
+        finally:
+            temp_file.close()
+        _reaper.schedule(temp_file.name)
+        return conn.printFile(printer_name, temp_file.name, "Etiqueta de producto", options)
+
+    job_id = conn.createJob(printer_name, "Etiqueta de producto", options)
+    status = conn.startDocument(printer_name, job_id, "etiqueta.png", LABEL_MIME_TYPE, 1)
+    if status != http_continue:
+        conn.cancelJob(job_id)
+        raise Exception(f"CUPS rechazó el documento (estado HTTP {status})")
+
+    status = conn.writeRequestData(data, len(data))
+    if status != http_continue:
+        conn.cancelJob(job_id)
+        raise Exception(f"Error al transmitir la etiqueta a CUPS (estado HTTP {status})")
+
+    conn.finishDocument(printer_name)
+    return job_id
+
+
+def print_label(image, printer_name=None, cups_server=None, copies=1):
     """
     Imprime una etiqueta usando CUPS
     
     Args:
-        image_path: Ruta a la imagen de la etiqueta
+        image: Bytes PNG, BytesIO o ruta a la imagen de la etiqueta
         printer_name: Nombre de la impresora (opcional, usa la predeterminada si no se especifica)
         cups_server: Servidor CUPS (opcional, usa localhost si no se especifica)
+        copies: Número de copias a imprimir
     
     Returns:
         ID del trabajo de impresión o None si hay error
     """
     try:
-        import cups
-        
-        # Depuración
-        print(f"Imprimiendo etiqueta:")
-        print(f"  Archivo: {image_path}")
-        print(f"  Impresora: {printer_name}")
-        print(f"  Servidor CUPS: {cups_server}")
-        
         # Conexión a CUPS
-        if cups_server:
-            print(f"Conectando a servidor CUPS remoto: {cups_server}")
-            conn = cups.Connection(host=cups_server)
-        else:
-            print("Conectando a servidor CUPS local")
-            conn = cups.Connection()
-            
-        # Obtener lista de impresoras
-        printers = conn.getPrinters()
-        print(f"Impresoras disponibles en {cups_server or 'localhost'}: {list(printers.keys())}")
-        
-        # Si no se especifica impresora, usar la predeterminada
-        if not printer_name:
-            printer_name = conn.getDefault()
-            print(f"Impresora predeterminada: {printer_name}")
-            
-            # Si no hay predeterminada, usar la primera disponible
-            if not printer_name and printers:
-                printer_name = list(printers.keys())[0]
-                print(f"Usando primera impresora disponible: {printer_name}")
-        
-        # Verificar que la impresora existe
-        if printer_name not in printers:
-            raise Exception(f"Impresora '{printer_name}' no encontrada en servidor {cups_server or 'localhost'}")
-        
-        print(f"Imprimiendo en: {printer_name}")
+        conn = _get_cups_connection(cups_server)
+        printer_name = _resolve_printer(conn, printer_name, cups_server)
         
-        # Opciones para etiqueta pequeña
-        options = {
-            # Especificar tamaño exacto de etiqueta
-            'media': 'Custom.38x30mm',
-            # Asegurar que la imagen se ajuste a la etiqueta
-            'fit-to-page': 'true',
-            'scaling': '100',
-            # Calidad de impresión
-            'print-quality': '5',  # Alta calidad
-            # Sin márgenes
-            'page-left': '0',
-            'page-right': '0',
-            'page-top': '0',
-            'page-bottom': '0'
-        }
+        print(f"Imprimiendo etiqueta en: {printer_name} ({cups_server or 'localhost'})")
         
-        print(f"Opciones de impresión: {options}")
-        
-        # Imprimir archivo
-        job_id = conn.printFile(
-            printer_name,
-            image_path,
-            "Etiqueta de producto",
-            options
-        )
+        job_id = _submit_job(conn, printer_name, image, copies)
         
         print(f"Trabajo de impresión enviado, ID: {job_id}")
         return job_id
@@ -190,11 +302,48 @@ def print_label(image_path, printer_name=None, cups_server=None):
         import traceback
         traceback.print_exc()
         return None
+
+
+def print_labels(labels, printer_name=None, cups_server=None):
+    """
+    Imprime un lote de etiquetas usando una única conexión a CUPS
+    
+    Args:
+        labels: iterable de tuplas (imagen, copias); la imagen puede ser bytes,
+            BytesIO o ruta. Se consume de forma perezosa, por lo que puede ser
+            un generador que renderiza cada etiqueta al momento de enviarla.
+        printer_name: Nombre de la impresora (opcional)
+        cups_server: Servidor CUPS (opcional)
+    
+    Returns:
+        int: número de etiquetas enviadas correctamente (contando copias)
+    """
+    try:
+        conn = _get_cups_connection(cups_server)
+        printer_name = _resolve_printer(conn, printer_name, cups_server)
+    except Exception as e:
+        print(f"Error al conectar con la impresora: {str(e)}")
+        return 0
+    
+    print(f"Imprimiendo lote de etiquetas en: {printer_name} ({cups_server or 'localhost'})")
+    
+    submitted = 0
+    for image, copies in labels:
+        try:
+            _submit_job(conn, printer_name, image, copies)
+            submitted += copies
+        except Exception as e:
+            print(f"Error al imprimir etiqueta del lote: {str(e)}")
+    
+    print(f"Lote enviado: {submitted} etiquetas")
+    return submitted
     
 def generate_and_print(barcode, product_name, price, printer_name=None, cups_server=None):
     """
     Genera e imprime una etiqueta
     
+    La etiqueta se genera en memoria y se envía a CUPS sin pasar por disco.
+    
     Args:
         barcode: Código de barras
         product_name: Nombre del producto
@@ -206,40 +355,11 @@ def generate_and_print(barcode, product_name, price, printer_name=None, cups_ser
         True si se imprimió correctamente, False en caso contrario
     """
     try:
-        # Depuración
-        print(f"generate_and_print llamada con:")
-        print(f"  barcode: {barcode}")
-        print(f"  product_name: {product_name}")
-        print(f"  price: {price}")
-        print(f"  printer_name: {printer_name}")
-        print(f"  cups_server: {cups_server}")
-        
-        # Generar nombre de archivo temporal
-        import tempfile
-        temp_file = tempfile.NamedTemporaryFile(suffix='.png', delete=False)
-        temp_filename = temp_file.name
-        temp_file.close()
-        
-        print(f"Generando etiqueta temporal: {temp_filename}")
-        
-        # Generar etiqueta
-        generate_product_label(barcode, product_name, price, temp_filename)
+        # Generar etiqueta en memoria
+        label = generate_product_label(barcode, product_name, price)
         
         # Imprimir - asegurarse de pasar cups_server
-        job_id = print_label(temp_filename, printer_name, cups_server)
-        
-        # Limpiar archivos temporales (después de un tiempo para asegurar que se imprimió)
-        import threading
-        def cleanup():
-            import time, os
-            time.sleep(10)  # Esperar 10 segundos antes de eliminar
-            try:
-                os.unlink(temp_filename)
-                print(f"Archivo temporal eliminado: {temp_filename}")
-            except:
-                pass
-                
-        threading.Thread(target=cleanup).start()
+        job_id = print_label(label, printer_name, cups_server)
         
         return job_id is not None
         
@@ -0,0 +1,100 @@
+# label_history.py
+import hashlib
+import json
+import os
+import threading
+
+
+class LabelHistory:
+    """
+    Registro compacto de la última etiqueta impresa de cada producto.
+
+    Por cada código de barras guarda solo un resumen corto del nombre y el
+    precio impresos, además de la fecha (UTC de Odoo) de la última
+    sincronización del modo "solo cambios". El archivo se lee la primera
+    vez que se usa el registro, no al crearlo.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._labels = {}
+        self._last_sync = None
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        # Llamar con el candado tomado
+        if not self._loaded:
+            self._load()
+            self._loaded = True
+
+    @property
+    def last_sync(self):
+        with self._lock:
+            self._ensure_loaded()
+            return self._last_sync
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r') as f:
+                    data = json.load(f)
+                self._labels = data.get('labels', {})
+                self._last_sync = data.get('last_sync')
+        except Exception as e:
+            print(f"Error al cargar historial de etiquetas: {str(e)}")
+            self._labels = {}
+            self._last_sync = None
+
+    def _save(self):
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump({'last_sync': self._last_sync, 'labels': self._labels}, f, separators=(',', ':'))
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def digest(product_name, price):
+        """Resumen corto del contenido impreso de una etiqueta"""
+        payload = f"{product_name}\x1f{float(price):.2f}"
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
+
+    def __len__(self):
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._labels)
+
+    def changed(self, label_items):
+        """
+        Filtrar las etiquetas cuyo nombre o precio difiere de lo impreso
+
+        Args:
+            label_items: iterable de tuplas (barcode, nombre, precio, copias)
+
+        Returns:
+            list: las tuplas que cambiaron o que nunca se imprimieron
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return [
+                item for item in label_items
+                if self._labels.get(str(item[0])) != self.digest(item[1], item[2])
+            ]
+
+    def record(self, label_items, last_sync=None):
+        """
+        Registrar etiquetas impresas y, opcionalmente, la fecha de sincronización
+
+        Args:
+            label_items: iterable de tuplas (barcode, nombre, precio, ...)
+            last_sync: fecha 'YYYY-MM-DD HH:MM:SS' (UTC) hasta la que se revisaron cambios
+        """
+        with self._lock:
+            self._ensure_loaded()
+            for item in label_items:
+                self._labels[str(item[0])] = self.digest(item[1], item[2])
+            if last_sync:
+                self._last_sync = last_sync
+            try:
+                self._save()
+            except Exception as e:
+                print(f"Error al guardar historial de etiquetas: {str(e)}")
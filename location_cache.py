@@ -0,0 +1,155 @@
+# location_cache.py
+import threading
+import time
+
+
+class LocationTree:
+    """
+    Árbol inmutable de ubicaciones con los conjuntos de IDs de cada subárbol
+    precalculados.
+
+    Args:
+        records: registros de stock.location con id, name, complete_name,
+            usage y location_id
+    """
+
+    def __init__(self, records):
+        self.nodes = {record['id']: record for record in records}
+        self.children = {location_id: [] for location_id in self.nodes}
+        self.roots = []
+        for record in records:
+            parent = record.get('location_id')
+            parent_id = parent[0] if parent else None
+            if parent_id in self.nodes:
+                self.children[parent_id].append(record['id'])
+            else:
+                self.roots.append(record['id'])
+
+        # Subárboles calculados de las hojas hacia la raíz (recorrido
+        # iterativo para no depender de la profundidad de recursión)
+        self.subtrees = {}
+        order = []
+        stack = list(self.roots)
+        while stack:
+            location_id = stack.pop()
+            order.append(location_id)
+            stack.extend(self.children[location_id])
+        for location_id in reversed(order):
+            ids = {location_id}
+            for child_id in self.children[location_id]:
+                ids |= self.subtrees[child_id]
+            self.subtrees[location_id] = frozenset(ids)
+
+        self._internal = sorted(
+            (record for record in records if record.get('usage') == 'internal'),
+            key=lambda record: record.get('complete_name') or record.get('name') or ''
+        )
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def internal(self):
+        """Ubicaciones internas (mismo formato que el search_read original)"""
+        return [
+            {'id': record['id'], 'name': record['name'], 'complete_name': record.get('complete_name')}
+            for record in self._internal
+        ]
+
+    def filter_options(self):
+        """Ubicaciones internas y zonas que las contienen, ordenadas por nombre completo"""
+        internal_ids = {record['id'] for record in self._internal}
+        options = [
+            record for record in self.nodes.values()
+            if record['id'] in internal_ids or (self.children[record['id']] and self.subtrees[record['id']] & internal_ids)
+        ]
+        options.sort(key=lambda record: record.get('complete_name') or record.get('name') or '')
+        return [
+            {'id': record['id'], 'name': record['name'], 'complete_name': record.get('complete_name'),
+             'is_zone': record['id'] not in internal_ids}
+            for record in options
+        ]
+
+    def subtree(self, location_id):
+        """IDs de la ubicación y de todas sus sububicaciones (None si no existe)"""
+        return self.subtrees.get(int(location_id))
+
+    def name(self, location_id):
+        record = self.nodes.get(location_id)
+        if record is None:
+            return None
+        return record.get('complete_name') or record.get('name')
+
+
+class LocationCache:
+    """
+    Caché en memoria del árbol de ubicaciones de Odoo.
+
+    La primera consulta carga el árbol; después se sirve siempre desde
+    memoria. Cuando la copia supera `max_age` se sigue devolviendo la
+    versión anterior y se refresca en segundo plano (una sola recarga a la
+    vez). Si la recarga falla se mantiene la última versión buena.
+
+    Args:
+        loader: función sin argumentos que devuelve los registros de stock.location
+        max_age: segundos tras los que la copia se considera desactualizada
+    """
+
+    def __init__(self, loader, max_age=300):
+        self.loader = loader
+        self.max_age = max_age
+        self.loaded_at = 0
+        self._tree = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def get(self):
+        """
+        Devolver el árbol de ubicaciones
+
+        Returns:
+            LocationTree o None si nunca se pudo cargar
+        """
+        tree = self._tree
+        if tree is None:
+            # Primera carga: bloqueante, pero solo un hilo consulta Odoo
+            with self._lock:
+                if self._tree is None:
+                    self._load()
+                return self._tree
+
+        if time.time() - self.loaded_at > self.max_age:
+            with self._lock:
+                start_refresh = not self._refreshing
+                self._refreshing = True
+            if start_refresh:
+                threading.Thread(target=self._background_refresh, name='location-cache', daemon=True).start()
+        return tree
+
+    def _load(self):
+        try:
+            started = time.time()
+            records = self.loader()
+            if records is None:
+                return False
+            self._tree = LocationTree(records)
+            self.loaded_at = time.time()
+            print(f"Árbol de ubicaciones actualizado: {len(records)} ubicaciones en {self.loaded_at - started:.2f}s")
+            return True
+        except Exception as e:
+            print(f"Error al actualizar ubicaciones: {str(e)}")
+            return False
+
+    def _background_refresh(self):
+        try:
+            if not self._load():
+                # Reintentar en la siguiente consulta sin esperar otro max_age completo
+                self.loaded_at = time.time() - self.max_age + min(30, self.max_age)
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def invalidate(self):
+        """Descartar la copia (p. ej. al cambiar la conexión con Odoo)"""
+        with self._lock:
+            self._tree = None
+            self.loaded_at = 0
@@ -0,0 +1,184 @@
+# metrics.py
+import contextvars
+import math
+import threading
+from bisect import bisect_left
+
+# Límites de los histogramas de duración (segundos)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Llamadas a Odoo hechas dentro de la petición HTTP actual (None fuera de una petición)
+_request_rpcs = contextvars.ContextVar('request_rpcs', default=None)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Contador monótono con etiquetas"""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Histograma acumulativo con etiquetas (formato de Prometheus)"""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = [[0] * len(self.buckets), 0, 0.0]
+            entry[0][index] += 1
+            entry[1] += 1
+            entry[2] += value
+
+    def samples(self):
+        with self._lock:
+            values = {labels: ([*counts], count, total) for labels, (counts, count, total) in self._values.items()}
+        for labels, (counts, count, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (f'{self.name}_bucket',
+                       _format_labels(self.labelnames, labels, ('le', _format_value(bound))), cumulative)
+            yield f'{self.name}_count', _format_labels(self.labelnames, labels), count
+            yield f'{self.name}_sum', _format_labels(self.labelnames, labels), total
+
+
+class MetricsRegistry:
+    """Registro en memoria de métricas, exportable en formato de texto de Prometheus"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Todas las métricas en formato de exposición de texto de Prometheus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.documentation}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, labels, value in metric.samples():
+                lines.append(f'{name}{labels} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+ODOO_RPC_SECONDS = registry.histogram(
+    'odoo_rpc_duration_seconds', 'Duración de cada llamada execute_kw a Odoo',
+    ('model', 'method', 'status'))
+ODOO_RPC_ROWS = registry.histogram(
+    'odoo_rpc_result_rows', 'Registros devueltos por cada llamada a Odoo',
+    ('model', 'method'), buckets=(0, 1, 10, 100, 1000, 10000, 100000))
+ODOO_RPC_BYTES = registry.histogram(
+    'odoo_rpc_response_bytes', 'Tamaño de la respuesta de cada llamada a Odoo',
+    ('model', 'method'), buckets=(1024, 10240, 102400, 1048576, 10485760, 104857600))
+HTTP_REQUEST_SECONDS = registry.histogram(
+    'http_request_duration_seconds', 'Duración de las peticiones HTTP por ruta',
+    ('endpoint', 'method', 'status'))
+HTTP_REQUEST_RPCS = registry.histogram(
+    'http_request_odoo_rpcs', 'Llamadas a Odoo hechas por cada petición HTTP',
+    ('endpoint',), buckets=(0, 1, 2, 5, 10, 20, 50, 100, 500))
+
+
+def result_rows(result):
+    """Número de registros de un resultado de Odoo"""
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if result is None or result is False:
+        return 0
+    return 1
+
+
+def observe_rpc(model, method, status, duration, rows=None, response_bytes=None):
+    """Registrar una llamada a Odoo (y contarla en la petición HTTP en curso)"""
+    ODOO_RPC_SECONDS.observe(duration, model, method, status)
+    if rows is not None:
+        ODOO_RPC_ROWS.observe(rows, model, method)
+    if response_bytes:
+        ODOO_RPC_BYTES.observe(response_bytes, model, method)
+    counter = _request_rpcs.get()
+    if counter is not None:
+        # Lista compartida con los hilos de run_concurrently (copian el contexto)
+        counter.append(1)
+
+
+def start_request_tracking():
+    """Empezar a contar llamadas a Odoo para la petición actual; devuelve un token"""
+    return _request_rpcs.set([])
+
+
+def current_request_rpcs():
+    """Llamadas a Odoo hechas hasta ahora por la petición actual (None fuera de una petición)"""
+    counter = _request_rpcs.get()
+    return len(counter) if counter is not None else None
+
+
+def finish_request_tracking(token):
+    """Dejar de contar y devolver cuántas llamadas a Odoo hizo la petición"""
+    count = len(_request_rpcs.get() or ())
+    _request_rpcs.reset(token)
+    return count
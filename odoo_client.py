@@ -0,0 +1,595 @@
+# odoo_client.py
+import contextlib
+import contextvars
+import http.client
+import random
+import socket
+import threading
+import time
+import xmlrpc.client
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from metrics import observe_rpc, result_rows
+
+# Métodos de solo lectura que se pueden reintentar sin efectos secundarios
+IDEMPOTENT_METHODS = {
+    'search', 'read', 'search_read', 'search_count', 'read_group',
+    'fields_get', 'name_search', 'name_get', 'default_get',
+}
+
+# Valores por defecto de las opciones de conexión en config.json
+DEFAULT_CONNECT_TIMEOUT = 5
+DEFAULT_READ_TIMEOUT = 60
+DEFAULT_RPC_RETRIES = 2
+DEFAULT_BREAKER_FAILURES = 5
+DEFAULT_BREAKER_RESET_SECONDS = 30
+DEFAULT_INTERACTIVE_LIMIT = 8
+DEFAULT_BULK_LIMIT = 2
+DEFAULT_QUEUE_TIMEOUT = 30
+DEFAULT_POOL_WORKERS = 8
+
+# Transporte por defecto: 'xmlrpc' o 'jsonrpc'
+DEFAULT_TRANSPORT = 'xmlrpc'
+
+# Carriles de prioridad para las llamadas salientes a Odoo
+LANE_INTERACTIVE = 'interactive'
+LANE_BULK = 'bulk'
+
+_current_lane = contextvars.ContextVar('odoo_rpc_lane', default=LANE_INTERACTIVE)
+
+# Errores de red o de transporte (no incluye xmlrpc.client.Fault, que es un
+# error de negocio devuelto por Odoo y no indica que el servidor esté caído)
+TRANSIENT_ERRORS = (OSError, socket.timeout, http.client.HTTPException, xmlrpc.client.ProtocolError)
+
+
+class OdooUnavailableError(Exception):
+    """Odoo no está disponible y el circuito está abierto"""
+
+
+class OdooBusyError(Exception):
+    """Se agotó la espera por un turno para llamar a Odoo"""
+
+
+def is_retryable_error(error):
+    """Indicar si un error de llamada a Odoo es temporal (red, circuito o cola)"""
+    return isinstance(error, TRANSIENT_ERRORS + (OdooUnavailableError, OdooBusyError))
+
+
+def set_rpc_lane(lane):
+    """Fijar el carril de prioridad del contexto actual; devuelve un token para restaurarlo"""
+    return _current_lane.set(lane)
+
+
+def reset_rpc_lane(token):
+    """Restaurar el carril anterior a partir del token de set_rpc_lane"""
+    _current_lane.reset(token)
+
+
+@contextlib.contextmanager
+def rpc_lane(lane):
+    """Ejecutar un bloque con las llamadas a Odoo en el carril indicado"""
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class RpcBulkhead:
+    """
+    Compuerta de concurrencia para las llamadas salientes a Odoo.
+
+    Cada carril (interactivo y masivo) tiene su propio límite de llamadas
+    simultáneas, de modo que los trabajos masivos nunca ocupan los turnos de
+    los escaneos. Además, el carril masivo cede el paso mientras haya
+    llamadas interactivas esperando. Se mide el tiempo de espera en cola.
+    """
+
+    def __init__(self, limits=None, wait_timeout=DEFAULT_QUEUE_TIMEOUT):
+        self.limits = dict(limits or {LANE_INTERACTIVE: DEFAULT_INTERACTIVE_LIMIT, LANE_BULK: DEFAULT_BULK_LIMIT})
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition()
+        self._active = {lane: 0 for lane in self.limits}
+        self._waiting = {lane: 0 for lane in self.limits}
+        self._stats = {lane: {'calls': 0, 'timeouts': 0, 'wait_total': 0.0, 'wait_max': 0.0} for lane in self.limits}
+        self._recent_waits = {lane: deque(maxlen=500) for lane in self.limits}
+
+    def configure(self, limits, wait_timeout):
+        """
+        Cambiar los límites por carril y el tiempo máximo de espera en cola
+
+        Si algo cambió se despierta a quienes esperan: con un límite mayor
+        pueden tener turno ya.
+        """
+        with self._cond:
+            limits = {lane: limit for lane, limit in limits.items() if lane in self.limits}
+            if all(self.limits[lane] == limit for lane, limit in limits.items()) and wait_timeout == self.wait_timeout:
+                return
+            self.limits.update(limits)
+            self.wait_timeout = wait_timeout
+            self._cond.notify_all()
+
+    def _can_run(self, lane):
+        if self._active[lane] >= self.limits[lane]:
+            return False
+        if lane == LANE_BULK and self._waiting.get(LANE_INTERACTIVE):
+            return False
+        return True
+
+    @contextlib.contextmanager
+    def slot(self, lane=None):
+        """Ocupar un turno del carril (por defecto, el del contexto actual)"""
+        lane = lane or _current_lane.get()
+        if lane not in self.limits:
+            lane = LANE_INTERACTIVE
+
+        started = time.monotonic()
+        with self._cond:
+            self._waiting[lane] += 1
+            try:
+                deadline = started + self.wait_timeout
+                while not self._can_run(lane):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats[lane]['timeouts'] += 1
+                        raise OdooBusyError(
+                            f"Odoo está ocupado: no hubo turno libre en el carril '{lane}' "
+                            f"tras {self.wait_timeout:.0f}s"
+                        )
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting[lane] -= 1
+            self._active[lane] += 1
+
+            waited = time.monotonic() - started
+            stats = self._stats[lane]
+            stats['calls'] += 1
+            stats['wait_total'] += waited
+            stats['wait_max'] = max(stats['wait_max'], waited)
+            self._recent_waits[lane].append(waited)
+            # Despertar a otros si este carril dejó de bloquear al masivo
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[lane] -= 1
+                self._cond.notify_all()
+
+    def snapshot(self):
+        """Estado y tiempos de espera por carril (para el endpoint de salud)"""
+        with self._cond:
+            result = {}
+            for lane, limit in self.limits.items():
+                stats = self._stats[lane]
+                recent = sorted(self._recent_waits[lane])
+                result[lane] = {
+                    'limit': limit,
+                    'active': self._active[lane],
+                    'waiting': self._waiting[lane],
+                    'calls': stats['calls'],
+                    'timeouts': stats['timeouts'],
+                    'wait_avg': round(stats['wait_total'] / stats['calls'], 4) if stats['calls'] else 0.0,
+                    'wait_max': round(stats['wait_max'], 4),
+                    'wait_p95_recent': round(recent[int(len(recent) * 0.95) - 1], 4) if recent else 0.0,
+                }
+            return result
+
+
+class _TimeoutConnectionMixin:
+    """Aplica un timeout para conectar y otro para esperar la respuesta"""
+
+    def connect(self):
+        super().connect()
+        self.sock.settimeout(self.read_timeout)
+
+
+class _TimeoutHTTPConnection(_TimeoutConnectionMixin, http.client.HTTPConnection):
+    def __init__(self, host, connect_timeout, read_timeout, **kwargs):
+        super().__init__(host, timeout=connect_timeout, **kwargs)
+        self.read_timeout = read_timeout
+
+
+class _TimeoutHTTPSConnection(_TimeoutConnectionMixin, http.client.HTTPSConnection):
+    def __init__(self, host, connect_timeout, read_timeout, **kwargs):
+        super().__init__(host, timeout=connect_timeout, **kwargs)
+        self.read_timeout = read_timeout
+
+
+class _CountingResponse:
+    """Envoltorio de una respuesta HTTP que cuenta los bytes leídos"""
+
+    def __init__(self, response):
+        self._response = response
+        self.bytes_read = 0
+
+    def read(self, *args):
+        data = self._response.read(*args)
+        self.bytes_read += len(data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self._response, name)
+
+
+class TimeoutTransport(xmlrpc.client.Transport):
+    """Transporte XML-RPC con timeouts de conexión y de lectura"""
+
+    def __init__(self, connect_timeout, read_timeout, use_https=False):
+        super().__init__()
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.use_https = use_https
+        self.last_response_bytes = 0
+
+    def parse_response(self, response):
+        counted = _CountingResponse(response)
+        try:
+            return super().parse_response(counted)
+        finally:
+            self.last_response_bytes = counted.bytes_read
+
+    def make_connection(self, host):
+        if self._connection and host == self._connection[0]:
+            return self._connection[1]
+        chost, self._extra_headers, x509 = self.get_host_info(host)
+        if self.use_https:
+            conn = _TimeoutHTTPSConnection(chost, self.connect_timeout, self.read_timeout, **(x509 or {}))
+        else:
+            conn = _TimeoutHTTPConnection(chost, self.connect_timeout, self.read_timeout)
+        self._connection = host, conn
+        return conn
+
+
+class CircuitBreaker:
+    """
+    Interruptor de circuito para las llamadas a Odoo.
+
+    Tras `failure_threshold` fallos de red consecutivos el circuito se abre
+    y las llamadas fallan de inmediato. Pasados `reset_timeout` segundos se
+    deja pasar una única llamada de prueba (semiabierto): si funciona el
+    circuito se cierra, si falla se vuelve a abrir.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=DEFAULT_BREAKER_FAILURES, reset_timeout=DEFAULT_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+        self.last_failure_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Comprobar si se permite la llamada; lanza OdooUnavailableError si no"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            elapsed = time.monotonic() - self.opened_at
+            if self.state == self.OPEN and elapsed >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return
+            retry_in = max(0, self.reset_timeout - elapsed)
+            raise OdooUnavailableError(
+                f"Odoo no disponible tras {self.failures} fallos consecutivos "
+                f"({self.last_error}). Reintento automático en {retry_in:.0f}s"
+            )
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self, error):
+        with self._lock:
+            self.failures += 1
+            self.last_error = str(error) or error.__class__.__name__
+            self.last_failure_at = time.time()
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"Circuito de Odoo abierto tras {self.failures} fallos: {self.last_error}")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """Liberar la llamada de prueba cuando terminó sin un resultado concluyente"""
+        with self._lock:
+            self._probing = False
+
+    def reset(self):
+        self.record_success()
+        self.last_error = None
+
+    def snapshot(self):
+        """Estado actual del circuito (para el endpoint de salud)"""
+        with self._lock:
+            retry_in = None
+            if self.state != self.CLOSED and self.opened_at is not None:
+                retry_in = max(0, round(self.reset_timeout - (time.monotonic() - self.opened_at), 1))
+            return {
+                'state': self.state,
+                'consecutive_failures': self.failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                'retry_in': retry_in,
+                'last_error': self.last_error,
+                'last_failure_at': self.last_failure_at,
+            }
+
+
+class OdooModels:
+    """
+    Sustituto de `xmlrpc.client.ServerProxy('/xmlrpc/2/object')`.
+
+    Expone el mismo `execute_kw` que usa el resto de la aplicación, pero
+    pasando por los timeouts, reintentos y el circuito de OdooClient.
+    """
+
+    def __init__(self, client):
+        self._client = client
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        return self._client.execute_kw(db, uid, password, model, method, args, kwargs)
+
+
+class OdooClient:
+    """
+    Cliente XML-RPC de Odoo con timeouts, reintentos y circuito.
+
+    Las lecturas idempotentes se reintentan con espera exponencial con
+    jitter; las escrituras (create, write, action_confirm, ...) nunca se
+    reintentan. Cada hilo usa sus propios proxies, ya que ServerProxy
+    mantiene una conexión HTTP persistente que no es segura entre hilos.
+
+    Args:
+        config_getter: función que devuelve la configuración actual de Odoo
+    """
+
+    def __init__(self, config_getter):
+        self.config_getter = config_getter
+        self.breaker = CircuitBreaker()
+        self.bulkhead = RpcBulkhead()
+        self.models = OdooModels(self)
+        self._local = threading.local()
+        self._uid_cache = {}
+        self._uid_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=DEFAULT_POOL_WORKERS, thread_name_prefix='odoo-rpc')
+
+    def _option(self, name, default):
+        value = self.config_getter().get(name)
+        return default if value in (None, '') else value
+
+    def _proxy(self, endpoint):
+        """
+        Obtener (o crear) el proxy de este hilo para un servicio de Odoo
+
+        Según la opción 'transport' de la configuración se usa XML-RPC
+        (/xmlrpc/2/<servicio>) o JSON-RPC (/jsonrpc, una conexión keep-alive
+        compartida por todos los servicios del hilo).
+        """
+        config = self.config_getter()
+        base_url = config['url'].rstrip('/')
+        transport_name = self._option('transport', DEFAULT_TRANSPORT)
+        connect_timeout = float(self._option('connect_timeout', DEFAULT_CONNECT_TIMEOUT))
+        read_timeout = float(self._option('read_timeout', DEFAULT_READ_TIMEOUT))
+        key = (transport_name, base_url, endpoint, connect_timeout, read_timeout)
+
+        proxies = getattr(self._local, 'proxies', None)
+        if proxies is None:
+            proxies = self._local.proxies = {}
+        proxy = proxies.get(key)
+        if proxy is not None:
+            return proxy
+
+        if transport_name == 'jsonrpc':
+            from odoo_jsonrpc import JsonRpcConnection, JsonRpcProxy
+
+            connections = getattr(self._local, 'json_connections', None)
+            if connections is None:
+                connections = self._local.json_connections = {}
+            conn_key = (base_url, connect_timeout, read_timeout)
+            connection = connections.get(conn_key)
+            if connection is None:
+                connection = connections[conn_key] = JsonRpcConnection(base_url, connect_timeout, read_timeout)
+            proxy = JsonRpcProxy(connection, endpoint)
+        else:
+            url = f"{base_url}/xmlrpc/2/{endpoint}"
+            transport = TimeoutTransport(connect_timeout, read_timeout, use_https=url.startswith('https'))
+            proxy = xmlrpc.client.ServerProxy(url, transport=transport, allow_none=True)
+
+        proxies[key] = proxy
+        return proxy
+
+    def _drop_proxies(self):
+        """Descartar las conexiones del hilo actual tras un error de red"""
+        proxies = getattr(self._local, 'proxies', None)
+        if proxies:
+            for proxy in proxies.values():
+                try:
+                    proxy('close')()
+                except Exception:
+                    pass
+            proxies.clear()
+        connections = getattr(self._local, 'json_connections', None)
+        if connections:
+            for connection in connections.values():
+                connection.close()
+            connections.clear()
+
+    def _sync_settings(self):
+        self.breaker.failure_threshold = int(self._option('breaker_failures', DEFAULT_BREAKER_FAILURES))
+        self.breaker.reset_timeout = float(self._option('breaker_reset_seconds', DEFAULT_BREAKER_RESET_SECONDS))
+        self.bulkhead.configure(
+            {
+                LANE_INTERACTIVE: int(self._option('rpc_interactive_limit', DEFAULT_INTERACTIVE_LIMIT)),
+                LANE_BULK: int(self._option('rpc_bulk_limit', DEFAULT_BULK_LIMIT)),
+            },
+            float(self._option('rpc_queue_timeout', DEFAULT_QUEUE_TIMEOUT))
+        )
+
+    def call(self, func, idempotent=True):
+        """
+        Ejecutar una llamada a Odoo con circuito y reintentos
+
+        Args:
+            func: función sin argumentos que realiza la llamada
+            idempotent: si es False la llamada nunca se reintenta
+
+        Returns:
+            El resultado de `func`
+        """
+        self._sync_settings()
+        retries = int(self._option('rpc_retries', DEFAULT_RPC_RETRIES)) if idempotent else 0
+
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                with self.bulkhead.slot():
+                    result = func()
+            except OdooBusyError:
+                self.breaker.release_probe()
+                raise
+            except xmlrpc.client.Fault:
+                # Odoo respondió: el servidor está disponible
+                self.breaker.record_success()
+                raise
+            except TRANSIENT_ERRORS as e:
+                self.breaker.record_failure(e)
+                self._drop_proxies()
+                if attempt >= retries or self.breaker.state == CircuitBreaker.OPEN:
+                    raise
+                attempt += 1
+                # Espera exponencial con jitter completo (máximo 2 segundos)
+                delay = random.uniform(0, min(2.0, 0.2 * (2 ** attempt)))
+                print(f"Error de red con Odoo ({e}); reintento {attempt} de {retries} en {delay:.2f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                self.breaker.release_probe()
+                raise
+            self.breaker.record_success()
+            return result
+
+    def run_concurrently(self, *funcs):
+        """
+        Ejecutar funciones independientes en paralelo en el pool compartido
+
+        Cada función se ejecuta con una copia del contexto actual, de modo
+        que conserva el carril de prioridad de la petición. Si alguna lanza
+        una excepción, se propaga después de esperar a todas.
+
+        Returns:
+            list: resultados en el mismo orden que `funcs`
+        """
+        if len(funcs) <= 1:
+            return [func() for func in funcs]
+        futures = [self._pool.submit(contextvars.copy_context().run, func) for func in funcs[1:]]
+        # La primera se ejecuta en el hilo actual para no ocupar un hilo más
+        try:
+            first = funcs[0]()
+        finally:
+            wait(futures)
+        return [first] + [future.result() for future in futures]
+
+    def authenticate(self, force=False):
+        """
+        Autenticar con la configuración actual y devolver el uid
+
+        El uid se guarda por (url, db, usuario, contraseña) para no repetir
+        la autenticación en cada petición.
+        """
+        config = self.config_getter()
+        key = (config['url'], config['db'], config['username'], config['password'])
+        if not force:
+            with self._uid_lock:
+                uid = self._uid_cache.get(key)
+            if uid:
+                return uid
+
+        uid = self.call(lambda: self._proxy('common').authenticate(
+            config['db'], config['username'], config['password'], {}
+        ))
+        if uid:
+            with self._uid_lock:
+                self._uid_cache[key] = uid
+        return uid
+
+    def _timed_execute_kw(self, proxy, db, uid, password, model, method, args, kwargs=None):
+        """Llamar a execute_kw en un proxy registrando duración, registros y bytes"""
+        params = (db, uid, password, model, method, args) + ((kwargs,) if kwargs else ())
+        started = time.perf_counter()
+        status = 'error'
+        result = None
+        try:
+            result = proxy.execute_kw(*params)
+            status = 'ok'
+            return result
+        except xmlrpc.client.Fault:
+            status = 'fault'
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            if status == 'ok':
+                observe_rpc(model, method, status, duration, result_rows(result), self._response_bytes(proxy))
+            else:
+                observe_rpc(model, method, status, duration)
+
+    @staticmethod
+    def _response_bytes(proxy):
+        """Tamaño de la última respuesta recibida por el proxy"""
+        from odoo_jsonrpc import JsonRpcProxy
+
+        if isinstance(proxy, JsonRpcProxy):
+            return proxy.connection.last_response_bytes
+        return getattr(proxy('transport'), 'last_response_bytes', None)
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        """Llamar a execute_kw en /xmlrpc/2/object"""
+        return self.call(
+            lambda: self._timed_execute_kw(self._proxy('object'), db, uid, password, model, method, args, kwargs),
+            idempotent=method in IDEMPOTENT_METHODS
+        )
+
+    def execute_many(self, db, uid, password, calls):
+        """
+        Ejecutar varias llamadas execute_kw seguidas sobre la misma conexión
+
+        Args:
+            calls: lista de tuplas (modelo, método, args[, kwargs])
+
+        Returns:
+            list: resultados en el mismo orden
+        """
+        calls = [tuple(call) + ({},) * (4 - len(call)) for call in calls]
+
+        def run():
+            # Un solo turno del limitador para todo el grupo; cada llamada
+            # reutiliza la conexión persistente del proxy
+            proxy = self._proxy('object')
+            return [
+                self._timed_execute_kw(proxy, db, uid, password, model, method, args, kwargs)
+                for model, method, args, kwargs in calls
+            ]
+
+        return self.call(run, idempotent=all(call[1] in IDEMPOTENT_METHODS for call in calls))
+
+    def reset(self):
+        """Olvidar uids y conexiones y cerrar el circuito (p. ej. al cambiar la configuración)"""
+        with self._uid_lock:
+            self._uid_cache.clear()
+        self._drop_proxies()
+        self.breaker.reset()
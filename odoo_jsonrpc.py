@@ -0,0 +1,112 @@
+# odoo_jsonrpc.py
+import itertools
+import json
+import xmlrpc.client
+from urllib.parse import urlsplit
+
+
+class JsonRpcConnection:
+    """
+    Conexión HTTP persistente (keep-alive) al endpoint /jsonrpc de Odoo.
+
+    Todas las llamadas de un hilo reutilizan la misma conexión TCP. Los
+    errores que devuelve Odoo se convierten en xmlrpc.client.Fault para que
+    el resto de la aplicación los trate igual que con XML-RPC.
+
+    Args:
+        url: URL base de Odoo (p. ej. http://localhost:8069)
+        connect_timeout: segundos máximos para conectar
+        read_timeout: segundos máximos esperando cada respuesta
+    """
+
+    def __init__(self, url, connect_timeout=None, read_timeout=None):
+        parts = urlsplit(url)
+        self.host = parts.netloc
+        self.path = parts.path.rstrip('/') + '/jsonrpc'
+        self.use_https = parts.scheme == 'https'
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.last_response_bytes = 0
+        self._ids = itertools.count(1)
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            # Importación diferida para evitar una dependencia circular
+            from odoo_client import _TimeoutHTTPConnection, _TimeoutHTTPSConnection
+
+            connection_class = _TimeoutHTTPSConnection if self.use_https else _TimeoutHTTPConnection
+            self._conn = connection_class(self.host, self.connect_timeout, self.read_timeout)
+        return self._conn
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def _request(self, payload):
+        body = json.dumps(payload).encode('utf-8')
+        for attempt in range(2):
+            reused = self._conn is not None
+            conn = self._connection()
+            try:
+                conn.request('POST', self.path, body, {'Content-Type': 'application/json'})
+                response = conn.getresponse()
+                break
+            except (ConnectionResetError, ConnectionAbortedError, BrokenPipeError):
+                # Igual que xmlrpc.client.Transport: si una conexión reutilizada
+                # falla antes de recibir respuesta, el servidor la cerró por
+                # inactividad y se reintenta una vez con una conexión nueva
+                # (RemoteDisconnected es un ConnectionResetError)
+                self.close()
+                if attempt or not reused:
+                    raise
+            except Exception:
+                self.close()
+                raise
+        try:
+            data = response.read()
+        except Exception:
+            self.close()
+            raise
+        self.last_response_bytes = len(data)
+        if response.status != 200:
+            raise xmlrpc.client.ProtocolError(self.host + self.path, response.status, response.reason, dict(response.getheaders()))
+        return json.loads(data)
+
+    @staticmethod
+    def _result(message):
+        error = message.get('error')
+        if error:
+            data = error.get('data') or {}
+            raise xmlrpc.client.Fault(error.get('code', 1), data.get('message') or error.get('message', 'Error de Odoo'))
+        return message.get('result')
+
+    def call(self, service, method, *args):
+        """Llamar a un método de un servicio de Odoo ('common', 'object', ...)"""
+        message = self._request({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': {'service': service, 'method': method, 'args': list(args)},
+            'id': next(self._ids),
+        })
+        return self._result(message)
+
+
+class JsonRpcProxy:
+    """Proxy con la misma interfaz que ServerProxy para un servicio de Odoo"""
+
+    def __init__(self, connection, service):
+        self.connection = connection
+        self.service = service
+
+    def __call__(self, attr):
+        # Igual que ServerProxy: proxy('close')() cierra la conexión
+        if attr == 'close':
+            return self.connection.close
+        raise AttributeError(attr)
+
+    def __getattr__(self, method):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return lambda *args: self.connection.call(self.service, method, *args)
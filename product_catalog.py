@@ -0,0 +1,235 @@
+# product_catalog.py
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left
+
+# Campos de product.product que guarda el catálogo
+CATALOG_FIELDS = ['id', 'barcode', 'name', 'default_code', 'list_price', 'uom_id']
+
+
+class CompactCatalog:
+    """
+    Catálogo de productos inmutable y compacto para cientos de miles de SKU.
+
+    En lugar de un diccionario por producto guarda columnas: los códigos de
+    barras como una lista ordenada de cadenas internadas (el índice de
+    búsqueda con bisect), los IDs, precios y unidades en arrays tipados y
+    los nombres y referencias concatenados en UTF-8 con un array de
+    desplazamientos. Solo incluye productos con código de barras; si un
+    código se repite se conserva el primero recibido.
+
+    Args:
+        records: iterable de registros de product.product (puede ser un
+            generador que lee de Odoo por páginas: no se guardan los dicts)
+    """
+
+    def __init__(self, records):
+        barcodes = []
+        # Los IDs de Odoo son enteros de 32 bits (int4 en PostgreSQL)
+        ids = array('i')
+        prices = array('d')
+        uom_ids = array('i')
+        names = _TextColumn()
+        codes = _TextColumn()
+
+        for record in records:
+            barcode = record.get('barcode')
+            if not barcode:
+                continue
+            barcodes.append(sys.intern(str(barcode)))
+            ids.append(record['id'])
+            prices.append(record.get('list_price') or 0.0)
+            uom = record.get('uom_id')
+            uom_ids.append(uom[0] if uom else 0)
+            names.append(record.get('name') or '')
+            codes.append(record.get('default_code') or '')
+
+        # Ordenar todas las columnas por código de barras (orden estable:
+        # ante códigos repetidos gana el primero recibido)
+        order = sorted(range(len(barcodes)), key=barcodes.__getitem__)
+        keep = [position for index, position in enumerate(order)
+                if index == 0 or barcodes[position] != barcodes[order[index - 1]]]
+
+        self.barcodes = [barcodes[position] for position in keep]
+        self.ids = array('i', (ids[position] for position in keep))
+        self.prices = array('d', (prices[position] for position in keep))
+        self.uom_ids = array('i', (uom_ids[position] for position in keep))
+        self.names = names.reordered(keep)
+        self.codes = codes.reordered(keep)
+
+    def __len__(self):
+        return len(self.barcodes)
+
+    def _position(self, barcode):
+        barcode = str(barcode)
+        position = bisect_left(self.barcodes, barcode)
+        if position < len(self.barcodes) and self.barcodes[position] == barcode:
+            return position
+        return None
+
+    def _record(self, position):
+        uom_id = self.uom_ids[position]
+        return {
+            'id': self.ids[position],
+            'barcode': self.barcodes[position],
+            'name': self.names.get(position),
+            'default_code': self.codes.get(position) or False,
+            'list_price': self.prices[position],
+            'uom_id': uom_id or False,
+        }
+
+    def get(self, barcode):
+        """Producto con ese código de barras (dict con CATALOG_FIELDS; uom_id es solo el ID) o None"""
+        position = self._position(barcode)
+        return None if position is None else self._record(position)
+
+    def lookup_many(self, barcodes):
+        """
+        Buscar varios códigos a la vez
+
+        Returns:
+            tuple: ({barcode: producto}, [códigos no encontrados])
+        """
+        found, missing = {}, []
+        for barcode in dict.fromkeys(str(barcode) for barcode in barcodes):
+            position = self._position(barcode)
+            if position is None:
+                missing.append(barcode)
+            else:
+                found[barcode] = self._record(position)
+        return found, missing
+
+    def records(self):
+        """Todos los productos, ordenados por código de barras (generador)"""
+        for position in range(len(self.barcodes)):
+            yield self._record(position)
+
+    def memory_bytes(self):
+        """Memoria aproximada ocupada por las columnas (sin el intérprete)"""
+        total = sys.getsizeof(self.barcodes) + sum(sys.getsizeof(barcode) for barcode in self.barcodes)
+        for column in (self.ids, self.prices, self.uom_ids):
+            total += column.itemsize * len(column)
+        return total + self.names.memory_bytes() + self.codes.memory_bytes()
+
+
+class _TextColumn:
+    """Columna de textos concatenados en UTF-8 con desplazamientos"""
+
+    def __init__(self):
+        self._chunks = []  # textos codificados mientras se construye
+        self.data = b''
+        self.offsets = array('I', [0])  # hasta 4 GB de texto por columna
+
+    def append(self, text):
+        self._chunks.append(text.encode('utf-8'))
+
+    def reordered(self, order):
+        """Columna definitiva (solo bytes y desplazamientos) con las filas en el orden dado"""
+        column = _TextColumn()
+        chunks = [self._chunks[position] for position in order]
+        column.data = b''.join(chunks)
+        for chunk in chunks:
+            column.offsets.append(column.offsets[-1] + len(chunk))
+        column._chunks = None
+        return column
+
+    def get(self, position):
+        return self.data[self.offsets[position]:self.offsets[position + 1]].decode('utf-8')
+
+    def memory_bytes(self):
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class ProductCatalog:
+    """
+    Catálogo local de productos por código de barras, refrescado en segundo plano.
+
+    Sirve las búsquedas exactas por código (lookup_product, etiquetas desde
+    archivo, reportes) sin llamar a Odoo. El catálogo se descarga en bloque
+    con `loader` y se reemplaza entero de forma atómica; mientras no esté
+    listo, o para los códigos que no contiene (productos creados después
+    del último refresco), quien lo usa debe consultar a Odoo.
+
+    Args:
+        loader: función sin argumentos que devuelve un iterable de registros
+            de product.product con CATALOG_FIELDS (o None si falla)
+        refresh_interval: segundos entre descargas completas
+    """
+
+    def __init__(self, loader, refresh_interval=600):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.loaded_at = None
+        self._catalog = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._catalog is not None
+
+    def start(self):
+        """Arrancar el refresco en segundo plano si aún no está activo"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='product-catalog', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            self.refresh()
+            time.sleep(self.refresh_interval)
+
+    def refresh(self):
+        """Descargar el catálogo y reemplazarlo de forma atómica"""
+        try:
+            started = time.time()
+            records = self.loader()
+            if records is None:
+                return False
+            catalog = CompactCatalog(records)
+            self._catalog = catalog
+            self.loaded_at = time.time()
+            print(f"Catálogo de productos actualizado: {len(catalog)} productos "
+                  f"({catalog.memory_bytes() / 1048576:.1f} MB) en {self.loaded_at - started:.1f}s")
+            return True
+        except Exception as e:
+            print(f"Error al actualizar el catálogo de productos: {str(e)}")
+            return False
+
+    def get(self, barcode):
+        """Producto con ese código de barras o None (también si el catálogo no está listo)"""
+        catalog = self._catalog
+        return catalog.get(barcode) if catalog is not None else None
+
+    def lookup_many(self, barcodes):
+        """
+        Buscar varios códigos a la vez
+
+        Returns:
+            tuple: ({barcode: producto}, [códigos no encontrados o todos si no está listo])
+        """
+        catalog = self._catalog
+        if catalog is None:
+            return {}, list(dict.fromkeys(str(barcode) for barcode in barcodes))
+        return catalog.lookup_many(barcodes)
+
+    def records(self):
+        """Todos los productos del catálogo (generador), o None si no está listo"""
+        catalog = self._catalog
+        return catalog.records() if catalog is not None else None
+
+    def stats(self):
+        catalog = self._catalog
+        return {
+            'ready': catalog is not None,
+            'products': len(catalog) if catalog is not None else 0,
+            'memory_bytes': catalog.memory_bytes() if catalog is not None else 0,
+            'loaded_at': self.loaded_at,
+        }
+
+    def __len__(self):
+        catalog = self._catalog
+        return len(catalog) if catalog is not None else 0
@@ -0,0 +1,157 @@
+# product_index.py
+import threading
+import time
+import unicodedata
+from bisect import bisect_left
+
+# Longitud máxima de las claves de nombre indexadas (acota la memoria)
+NAME_KEY_LENGTH = 24
+
+# Máximo de claves a revisar cuando hay que confirmar contra el nombre completo
+MAX_VERIFIED_SCAN = 1000
+
+
+def normalize_text(text):
+    """Normalizar texto para búsquedas: minúsculas y sin acentos"""
+    text = unicodedata.normalize('NFKD', str(text or ''))
+    return ''.join(c for c in text if not unicodedata.combining(c)).lower().strip()
+
+
+class _IndexSnapshot:
+    """Índice inmutable construido a partir de un catálogo completo"""
+
+    def __init__(self, products):
+        self.products = []
+        barcode_entries = []
+        name_entries = []
+
+        for product in products:
+            idx = len(self.products)
+            self.products.append((
+                product.get('barcode') or '',
+                product.get('name') or '',
+                product.get('list_price') or 0.0,
+            ))
+            if product.get('barcode'):
+                barcode_entries.append((str(product['barcode']).lower(), idx))
+            # Indexar el nombre completo y el inicio de cada palabra
+            normalized = normalize_text(product.get('name'))
+            words = normalized.split()
+            for position in range(len(words)):
+                name_entries.append((' '.join(words[position:])[:NAME_KEY_LENGTH], idx))
+
+        barcode_entries.sort()
+        name_entries.sort()
+        self.barcode_keys = [key for key, _ in barcode_entries]
+        self.barcode_ids = [idx for _, idx in barcode_entries]
+        self.name_keys = [key for key, _ in name_entries]
+        self.name_ids = [idx for _, idx in name_entries]
+
+    @staticmethod
+    def _prefix_scan(keys, ids, prefix, found, limit, accept=None):
+        position = bisect_left(keys, prefix)
+        end = len(keys) if accept is None else min(len(keys), position + MAX_VERIFIED_SCAN)
+        while position < end and len(found) < limit and keys[position].startswith(prefix):
+            if accept is None or accept(ids[position]):
+                found.setdefault(ids[position], None)
+            position += 1
+
+    def search(self, query, limit):
+        found = {}
+        self._prefix_scan(self.barcode_keys, self.barcode_ids, query.lower().strip(), found, limit)
+
+        normalized = normalize_text(query)
+        accept = None
+        if len(normalized) > NAME_KEY_LENGTH:
+            # La clave está truncada: confirmar contra el nombre completo
+            def accept(idx):
+                name = ' ' + normalize_text(self.products[idx][1])
+                return (' ' + normalized) in name
+        self._prefix_scan(self.name_keys, self.name_ids, normalized[:NAME_KEY_LENGTH], found, limit, accept)
+        return [self.products[idx] for idx in found]
+
+
+class ProductIndex:
+    """
+    Índice local de productos para búsquedas por prefijo (typeahead).
+
+    Busca por prefijo de código de barras y por prefijo del nombre o de
+    cualquiera de sus palabras sobre listas ordenadas con bisect. El
+    catálogo se obtiene con `loader` y se refresca en segundo plano; las
+    búsquedas siempre usan la última versión completa.
+
+    Args:
+        loader: función sin argumentos que devuelve un iterable de productos
+            (barcode, name, list_price) o None si aún no hay datos
+        refresh_interval: segundos entre refrescos (si no se indica `version`)
+        version: función opcional que devuelve la versión de los datos de
+            `loader` (p. ej. la fecha del catálogo de códigos de barras); si
+            se indica, el índice se reconstruye solo cuando cambia, y se
+            comprueba cada `check_interval` segundos
+        check_interval: segundos entre comprobaciones de `version`
+    """
+
+    def __init__(self, loader, refresh_interval=600, version=None, check_interval=5):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self.version = version
+        self.check_interval = check_interval
+        self.loaded_at = None
+        self._snapshot = None
+        self._built_version = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    def start(self):
+        """Arrancar el refresco en segundo plano si aún no está activo"""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='product-index', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            if self.version is None:
+                self.refresh()
+                time.sleep(self.refresh_interval)
+                continue
+            version = self.version()
+            if version is not None and version != self._built_version and self.refresh():
+                self._built_version = version
+            time.sleep(self.check_interval)
+
+    def refresh(self):
+        """Descargar el catálogo y reemplazar el índice de forma atómica"""
+        try:
+            started = time.time()
+            products = self.loader()
+            if products is None:
+                return False
+            snapshot = _IndexSnapshot(products)
+            self._snapshot = snapshot
+            self.loaded_at = time.time()
+            print(f"Índice de productos actualizado: {len(snapshot.products)} productos en {self.loaded_at - started:.1f}s")
+            return True
+        except Exception as e:
+            print(f"Error al actualizar índice de productos: {str(e)}")
+            return False
+
+    def search(self, query, limit=10):
+        """
+        Buscar productos por prefijo de código de barras o de nombre
+
+        Returns:
+            list: tuplas (barcode, nombre, precio); vacía si el índice no está listo
+        """
+        snapshot = self._snapshot
+        if snapshot is None or not query:
+            return []
+        return snapshot.search(query, limit)
+
+    def __len__(self):
+        snapshot = self._snapshot
+        return len(snapshot.products) if snapshot else 0
@@ -0,0 +1,173 @@
+# profiler.py
+import contextlib
+import contextvars
+import cProfile
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import uuid
+
+# Tiempos por fase de la petición perfilada actual (None si no se está perfilando)
+_phases = contextvars.ContextVar('profile_phases', default=None)
+
+_PROFILE_NAME = re.compile(r'^[\w.-]+$')
+
+
+@contextlib.contextmanager
+def phase(name):
+    """
+    Medir una fase (lectura del CSV, consultas a Odoo, PDF, impresión...)
+
+    Solo acumula tiempos si la petición actual se está perfilando; en otro
+    caso no hace nada.
+    """
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - started
+
+
+class ProfileSession:
+    """Perfil en curso de una petición"""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.phases = {}
+        self.started = time.perf_counter()
+        self.started_at = time.time()
+        self._token = _phases.set(self.phases)
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        _phases.reset(self._token)
+        return time.perf_counter() - self.started
+
+
+class RequestProfiler:
+    """
+    Perfilado bajo demanda de peticiones individuales con cProfile.
+
+    Cada perfil se guarda como un par de archivos en `directory`: el .prof
+    (estadísticas de pstats) y un .json con la ruta, la duración, los tiempos
+    por fase y el número de llamadas a Odoo. Solo se conservan los
+    `max_profiles` más recientes. cProfile solo mide el hilo de la petición:
+    el trabajo enviado al pool de Odoo aparece como espera.
+
+    cProfile admite un solo perfil activo por proceso (desde Python 3.12 un
+    segundo enable() lanza ValueError), así que se perfila una petición a la
+    vez: las que lo piden mientras hay otra en curso se sirven sin perfilar.
+
+    Args:
+        directory: carpeta donde guardar los perfiles
+        max_profiles: número máximo de perfiles conservados
+    """
+
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self._active = threading.Lock()
+
+    def start(self):
+        """Empezar a perfilar la petición actual (None si ya se está perfilando otra)"""
+        if not self._active.acquire(blocking=False):
+            return None
+        try:
+            return ProfileSession()
+        except Exception:
+            self._active.release()
+            raise
+
+    def discard(self, session):
+        """Detener un perfil sin guardarlo (la petición terminó con una excepción)"""
+        try:
+            session.stop()
+        finally:
+            self._active.release()
+
+    def finish(self, session, endpoint, method, path, status, rpcs=None):
+        """
+        Detener el perfil y guardarlo
+
+        Returns:
+            str: nombre del perfil guardado
+        """
+        try:
+            duration = session.stop()
+        finally:
+            self._active.release()
+        os.makedirs(self.directory, exist_ok=True)
+        # El nombre empieza por la fecha con microsegundos: el orden alfabético es el cronológico
+        stamp = time.strftime('%Y%m%d-%H%M%S', time.localtime(session.started_at))
+        micros = int(session.started_at * 1000000) % 1000000
+        name = f"{stamp}.{micros:06d}-{endpoint or 'desconocido'}-{uuid.uuid4().hex[:4]}"
+        name = re.sub(r'[^\w.-]', '_', name)
+
+        session.profile.dump_stats(os.path.join(self.directory, f'{name}.prof'))
+        summary = {
+            'name': name,
+            'endpoint': endpoint,
+            'method': method,
+            'path': path,
+            'status': status,
+            'started_at': session.started_at,
+            'duration': round(duration, 4),
+            'phases': {key: round(value, 4) for key, value in session.phases.items()},
+            'rpcs': rpcs,
+        }
+        with open(os.path.join(self.directory, f'{name}.json'), 'w') as f:
+            json.dump(summary, f, indent=4)
+
+        self._prune()
+        return name
+
+    def _prune(self):
+        summaries = sorted(f for f in os.listdir(self.directory) if f.endswith('.json'))
+        for filename in summaries[:-self.max_profiles] if len(summaries) > self.max_profiles else []:
+            base = filename[:-len('.json')]
+            for extension in ('.json', '.prof'):
+                try:
+                    os.remove(os.path.join(self.directory, base + extension))
+                except OSError:
+                    pass
+
+    def list(self):
+        """Resúmenes de los perfiles guardados, del más reciente al más antiguo"""
+        if not os.path.isdir(self.directory):
+            return []
+        profiles = []
+        for filename in sorted(os.listdir(self.directory), reverse=True):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return profiles
+
+    def path(self, name):
+        """Ruta del .prof de un perfil (None si el nombre no es válido o no existe)"""
+        if not _PROFILE_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, f'{name}.prof')
+        return path if os.path.exists(path) else None
+
+    def stats_text(self, name, sort='cumulative', limit=60):
+        """Estadísticas de un perfil en texto (las `limit` funciones más costosas)"""
+        path = self.path(name)
+        if path is None:
+            return None
+        output = io.StringIO()
+        stats = pstats.Stats(path, stream=output)
+        stats.strip_dirs().sort_stats(sort).print_stats(limit)
+        return output.getvalue()
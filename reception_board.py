@@ -0,0 +1,141 @@
+# reception_board.py
+import json
+import queue
+import threading
+import time
+
+# Estados que se muestran en el tablero de recepción
+OPEN_STATES = ('assigned', 'partially_available', 'confirmed')
+
+
+class ReceptionBoard:
+    """
+    Vista compartida en memoria de las transferencias pendientes de recibir.
+
+    Un único hilo consulta a Odoo solo las transferencias cuyo write_date es
+    posterior a la última revisión y envía los cambios a todos los
+    navegadores conectados (Server-Sent Events). Cada cierto número de
+    ciclos se hace una resincronización completa para detectar
+    transferencias eliminadas. Sin clientes conectados el hilo no consulta
+    nada y la vista se descarta.
+
+    Args:
+        fetch_open: función () -> lista de transferencias abiertas
+        fetch_changed: función (write_date mínimo) -> transferencias modificadas
+            desde esa fecha, en cualquier estado
+        interval: segundos entre consultas de cambios
+        full_sync_every: ciclos entre resincronizaciones completas
+    """
+
+    def __init__(self, fetch_open, fetch_changed, interval=5, full_sync_every=60):
+        self.fetch_open = fetch_open
+        self.fetch_changed = fetch_changed
+        self.interval = interval
+        self.full_sync_every = full_sync_every
+        self._pickings = None
+        self._since = None
+        self._cycles = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self):
+        """
+        Registrar un cliente
+
+        Returns:
+            queue.Queue: cola de eventos del cliente; el primero es el estado completo
+        """
+        events = queue.Queue(maxsize=500)
+        with self._lock:
+            self._subscribers.add(events)
+            if self._pickings is not None:
+                events.put({'type': 'snapshot', 'transfers': list(self._pickings.values())})
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='reception-board', daemon=True)
+                self._thread.start()
+        return events
+
+    def unsubscribe(self, events):
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def _broadcast(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                # Cliente que no consume: se desconecta y recargará al reconectar
+                self.unsubscribe(events)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                has_subscribers = bool(self._subscribers)
+                if not has_subscribers:
+                    self._pickings = None
+            if has_subscribers:
+                try:
+                    self.poll_once()
+                except Exception as e:
+                    print(f"Error al actualizar el tablero de recepción: {str(e)}")
+            time.sleep(self.interval)
+
+    @staticmethod
+    def _latest(transfers, current=None):
+        dates = [transfer['write_date'] for transfer in transfers if transfer.get('write_date')]
+        if current:
+            dates.append(current)
+        return max(dates) if dates else current
+
+    def poll_once(self):
+        """Consultar cambios en Odoo y notificar a los clientes"""
+        if self._pickings is None or self._cycles >= self.full_sync_every:
+            transfers = self.fetch_open()
+            pickings = {transfer['id']: transfer for transfer in transfers}
+            with self._lock:
+                self._pickings = pickings
+                self._since = self._latest(transfers, self._since)
+                self._cycles = 0
+            self._broadcast({'type': 'snapshot', 'transfers': transfers})
+            return
+
+        self._cycles += 1
+        if self._since is None:
+            changed = self.fetch_open()
+        else:
+            # '>=' porque write_date tiene resolución de segundos; los
+            # registros sin cambios reales se descartan al comparar
+            changed = self.fetch_changed(self._since)
+
+        events = []
+        with self._lock:
+            if self._pickings is None:
+                return
+            for transfer in changed:
+                current = self._pickings.get(transfer['id'])
+                if transfer['state'] in OPEN_STATES:
+                    if current is None or current.get('write_date') != transfer.get('write_date'):
+                        self._pickings[transfer['id']] = transfer
+                        events.append({'type': 'upsert', 'transfer': transfer})
+                elif current is not None:
+                    del self._pickings[transfer['id']]
+                    events.append({'type': 'remove', 'id': transfer['id']})
+            self._since = self._latest(changed, self._since)
+        for event in events:
+            self._broadcast(event)
+
+    @staticmethod
+    def format_event(event):
+        """Serializar un evento en formato SSE"""
+        return f"data: {json.dumps(event)}\n\n"
+
+    def stats(self):
+        with self._lock:
+            return {
+                'clients': len(self._subscribers),
+                'open_transfers': len(self._pickings) if self._pickings is not None else None,
+                'since': self._since,
+            }
@@ -4,34 +4,36 @@ import os
 import json
 from collections import Counter
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 
-def get_product_data_from_odoo(barcodes, odoo_connection_func):
+from profiler import phase
+
+def get_product_data_from_odoo(barcodes, odoo_connection_func, catalog=None):
     """
     Obtiene los nombres y detalles de productos desde Odoo usando códigos de barras.
     
     Args:
         barcodes: lista de códigos de barras a buscar.
         odoo_connection_func: función para obtener conexión a Odoo.
+        catalog: catálogo local opcional (ProductCatalog o SharedProductCatalog); solo se consultan
+            en Odoo los códigos que no contiene.
     
     Returns:
         dict: Diccionario de datos de productos {barcode: {name, default_code, etc}}.
     """
+    products_data = {}
+    unique_barcodes = list(set(barcodes))
+    if catalog is not None:
+        products_data, unique_barcodes = catalog.lookup_many(unique_barcodes)
+        if not unique_barcodes:
+            return products_data
+    
     uid, models = odoo_connection_func()
     if not uid or not models:
-        return {}
+        return products_data
     
     # Buscar productos por códigos de barras en lotes para evitar límites XML-RPC
-    products_data = {}
     batch_size = 20
     
-    # Crear lista con códigos de barras únicos
-    unique_barcodes = list(set(barcodes))
-    
     for i in range(0, len(unique_barcodes), batch_size):
         batch = unique_barcodes[i:i+batch_size]
         
@@ -117,6 +119,14 @@ def generate_pdf_report(barcode_counter, product_data, output_filename):
         product_data: datos de productos desde Odoo
         output_filename: nombre del archivo PDF a generar
     """
+    # reportlab solo se carga al generar un PDF: el análisis del CSV y la
+    # consulta de productos (reportes CSV, línea de comandos) no lo necesitan
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib import colors
+    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    
     # Crear documento PDF
     pdf_path = os.path.abspath(output_filename)
     doc = SimpleDocTemplate(pdf_path, pagesize=letter)
@@ -212,7 +222,7 @@ def generate_pdf_report(barcode_counter, product_data, output_filename):
     
     return pdf_path
 
-def create_inventory_report(csv_file, odoo_connection_func, output_filename="inventory_report.pdf"):
+def create_inventory_report(csv_file, odoo_connection_func, output_filename="inventory_report.pdf", catalog=None):
     """
     Función principal para crear el reporte completo.
     
@@ -220,24 +230,28 @@ def create_inventory_report(csv_file, odoo_connection_func, output_filename="inv
         csv_file: ruta al archivo CSV de códigos de barras.
         odoo_connection_func: función para obtener conexión a Odoo.
         output_filename: nombre del archivo PDF de salida.
+        catalog: catálogo local opcional de productos (ProductCatalog o SharedProductCatalog).
     
     Returns:
         String: ruta al archivo PDF generado.
     """
     try:
         print(f"Analizando archivo CSV: {csv_file}")
-        barcode_counter = analyze_csv_file(csv_file)
+        with phase('csv'):
+            barcode_counter = analyze_csv_file(csv_file)
         
         print(f"Se encontraron {len(barcode_counter)} códigos de barras únicos")
         print(f"Total de unidades: {sum(barcode_counter.values())}")
         
         print("Obteniendo información de productos desde Odoo...")
-        product_data = get_product_data_from_odoo(barcode_counter.keys(), odoo_connection_func)
+        with phase('odoo'):
+            product_data = get_product_data_from_odoo(barcode_counter.keys(), odoo_connection_func, catalog)
         
         print(f"Se encontraron {len(product_data)} productos en Odoo")
         
         print(f"Generando reporte PDF: {output_filename}")
-        pdf_path = generate_pdf_report(barcode_counter, product_data, output_filename)
+        with phase('pdf'):
+            pdf_path = generate_pdf_report(barcode_counter, product_data, output_filename)
         
         print(f"Reporte generado exitosamente: {pdf_path}")
         return pdf_path
@@ -0,0 +1,422 @@
+# scan_session.py
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scan_sessions (
+    id TEXT PRIMARY KEY,
+    source_location_id INTEGER NOT NULL,
+    dest_location_id INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    picking_id INTEGER,
+    pending TEXT NOT NULL DEFAULT '{}',
+    quantities TEXT NOT NULL DEFAULT '{}',
+    moves TEXT NOT NULL DEFAULT '{}',
+    not_found TEXT NOT NULL DEFAULT '[]',
+    error TEXT,
+    retry_at REAL NOT NULL DEFAULT 0,
+    lease_until REAL NOT NULL DEFAULT 0,
+    last_activity REAL NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scan_sessions_picking ON scan_sessions (picking_id);
+CREATE INDEX IF NOT EXISTS scan_sessions_state ON scan_sessions (state, last_activity);
+"""
+
+# Estados de una sesión de escaneo
+OPEN = 'open'
+CLOSING = 'closing'
+
+
+class ScanSession:
+    """Estado de una sesión de escaneo incremental leído de la base de datos"""
+
+    def __init__(self, row):
+        self.id = row['id']
+        self.source_location_id = row['source_location_id']
+        self.dest_location_id = row['dest_location_id']
+        self.state = row['state']
+        self.picking_id = row['picking_id']
+        self.pending = Counter(json.loads(row['pending']))        # escaneos aún no aplicados en Odoo
+        self.quantities = Counter(json.loads(row['quantities']))  # cantidades ya aplicadas por barcode
+        self.moves = json.loads(row['moves'])                     # barcode -> ID del movimiento en Odoo
+        self.not_found = set(json.loads(row['not_found']))
+        self.error = row['error']
+        self.retry_at = row['retry_at']
+        self.last_activity = row['last_activity']
+
+    def snapshot(self):
+        return {
+            'session_id': self.id,
+            'state': self.state,
+            'picking_id': self.picking_id,
+            'pending': sum(self.pending.values()),
+            'applied': sum(self.quantities.values()),
+            'lines': len(self.moves),
+            'products_not_found': sorted(self.not_found),
+            'error': self.error,
+        }
+
+
+class ScanSessionManager:
+    """
+    Construcción incremental de transferencias mientras se escanea.
+
+    Al iniciar una sesión no se llama a Odoo. Cada código escaneado se
+    acumula y un hilo en segundo plano abre una transferencia en borrador,
+    resuelve los productos nuevos y crea o incrementa sus movimientos. Al
+    confirmar solo queda aplicar lo que falte (normalmente nada) y confirmar
+    la transferencia.
+
+    Las sesiones se guardan en SQLite (la misma base de datos que la bandeja
+    de transferencias), así que sobreviven a un reinicio y cualquier proceso
+    de la aplicación puede atenderlas. Quien llama a Odoo por una sesión
+    toma antes una concesión (lease_until) para que dos procesos no apliquen
+    ni confirmen la misma sesión a la vez. Al arrancar se reabren los cierres
+    que quedaron a medias y se descartan los borradores de sesiones
+    abandonadas.
+
+    Args:
+        db_path: ruta de la base de datos SQLite
+        opener: función (origen, destino, clave) -> ID de la transferencia en borrador
+        applier: función (picking_id, origen, destino, {barcode: cantidad nueva},
+            {barcode: (move_id, cantidad total)}, reintento) -> ({barcode: move_id},
+            [no encontrados]); en un reintento debe reutilizar los movimientos que
+            el intento fallido pudo llegar a crear
+        confirmer: función (picking_id, origen, {barcode: cantidad}, {barcode: move_id})
+            -> dict con 'success' y 'products_count' o 'message' (si no tiene
+            éxito la transferencia ya se descartó en Odoo)
+        discarder: función (picking_id) -> None
+        interval: segundos máximos entre pasadas del hilo
+        idle_timeout: segundos sin actividad tras los que se descarta la sesión
+        lease_seconds: duración máxima de la concesión de una sesión
+    """
+
+    def __init__(self, db_path, opener, applier, confirmer, discarder, interval=1.0,
+                 idle_timeout=4 * 3600, lease_seconds=120):
+        self.db_path = db_path
+        self.opener = opener
+        self.applier = applier
+        self.confirmer = confirmer
+        self.discarder = discarder
+        self.interval = interval
+        self.idle_timeout = idle_timeout
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._local = threading.local()
+        self._schema_ready = False
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def _update(self, conn, session_id, **values):
+        assignments = ', '.join(f'{column} = ?' for column in values)
+        conn.execute(f"UPDATE scan_sessions SET {assignments} WHERE id = ?", list(values.values()) + [session_id])
+
+    def start(self):
+        """Arrancar el hilo de aplicación si aún no está activo (con el barrido de arranque)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='scan-sessions', daemon=True)
+            self._thread.start()
+
+    def recover(self):
+        """
+        Barrido de arranque: reabrir cierres interrumpidos y descartar sesiones abandonadas
+
+        Una sesión que quedó en cierre con la concesión caducada es de un
+        proceso que terminó a mitad de la confirmación: vuelve a quedar
+        abierta para que el cliente reintente. Las sesiones sin actividad
+        desde hace más de idle_timeout se cancelan y se elimina su borrador.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("UPDATE scan_sessions SET state = ?, lease_until = 0 WHERE state = ? AND lease_until <= ?",
+                     (OPEN, CLOSING, now))
+        idle = conn.execute("SELECT id FROM scan_sessions WHERE state = ? AND last_activity < ?",
+                            (OPEN, now - self.idle_timeout)).fetchall()
+        for row in idle:
+            self.cancel(row['id'], wait=0)
+        return len(idle)
+
+    def open(self, source_location_id, dest_location_id):
+        """Iniciar una sesión de escaneo y devolver su estado"""
+        now = time.time()
+        session_id = uuid.uuid4().hex
+        self._connect().execute(
+            "INSERT INTO scan_sessions (id, source_location_id, dest_location_id, state, last_activity, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (session_id, int(source_location_id), int(dest_location_id), OPEN, now, now)
+        )
+        self.start()
+        return self.snapshot(self.get(session_id))
+
+    def get(self, session_id):
+        row = self._connect().execute("SELECT * FROM scan_sessions WHERE id = ?", (session_id,)).fetchone()
+        return ScanSession(row) if row is not None else None
+
+    def add(self, session_id, barcode, quantity=1):
+        """
+        Registrar un escaneo en la sesión
+
+        Returns:
+            dict: estado de la sesión o None si no existe o ya no está abierta
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT * FROM scan_sessions WHERE id = ?", (session_id,)).fetchone()
+            # Una sesión que se está cerrando ya no admite escaneos: se
+            # perderían tras la confirmación
+            if row is None or row['state'] != OPEN:
+                conn.execute("COMMIT")
+                return None
+            pending = Counter(json.loads(row['pending']))
+            pending[barcode] += quantity
+            values = {'pending': json.dumps(pending), 'last_activity': time.time()}
+            self._update(conn, session_id, **values)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self.start()
+        self._wakeup.set()
+        return self.snapshot(ScanSession(dict(row, **values)))
+
+    def snapshot(self, session):
+        return session.snapshot()
+
+    def _acquire(self, session_id, closing=False, wait=0):
+        """
+        Tomar la concesión de la sesión para llamar a Odoo
+
+        Args:
+            closing: pasar la sesión de abierta a en cierre (confirmar o cancelar)
+            wait: segundos a esperar si otro hilo o proceso tiene la concesión
+
+        Returns:
+            tuple: (ScanSession o None, motivo: 'ok', 'missing', 'closed' o 'busy')
+        """
+        deadline = time.time() + wait
+        conn = self._connect()
+        while True:
+            now = time.time()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT * FROM scan_sessions WHERE id = ?", (session_id,)).fetchone()
+                if row is None:
+                    conn.execute("COMMIT")
+                    return None, 'missing'
+                if row['state'] != OPEN:
+                    conn.execute("COMMIT")
+                    return None, 'closed'
+                if row['lease_until'] <= now:
+                    values = {'lease_until': now + self.lease_seconds}
+                    if closing:
+                        values['state'] = CLOSING
+                    self._update(conn, session_id, **values)
+                    conn.execute("COMMIT")
+                    return self.get(session_id), 'ok'
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            if now >= deadline:
+                return None, 'busy'
+            time.sleep(0.2)
+
+    def _release(self, session_id, state=None):
+        values = {'lease_until': 0}
+        if state is not None:
+            values['state'] = state
+        self._update(self._connect(), session_id, **values)
+
+    def _forget(self, session_id):
+        self._connect().execute("DELETE FROM scan_sessions WHERE id = ?", (session_id,))
+
+    def _run(self):
+        try:
+            recovered = self.recover()
+            if recovered:
+                print(f"Sesiones de escaneo abandonadas descartadas al arrancar: {recovered}")
+        except Exception as e:
+            print(f"Error al recuperar las sesiones de escaneo: {str(e)}")
+        while True:
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+            try:
+                self._run_once()
+            except Exception as e:
+                print(f"Error en las sesiones de escaneo: {str(e)}")
+
+    def _run_once(self):
+        conn = self._connect()
+        now = time.time()
+        for row in conn.execute("SELECT id FROM scan_sessions WHERE state = ? AND last_activity < ?",
+                                (OPEN, now - self.idle_timeout)).fetchall():
+            self.cancel(row['id'], wait=0)
+
+        for row in conn.execute(
+            "SELECT id FROM scan_sessions WHERE state = ? AND pending != '{}' AND retry_at <= ? AND lease_until <= ?",
+            (OPEN, now, now)
+        ).fetchall():
+            session, _ = self._acquire(row['id'])
+            if session is None:
+                continue
+            try:
+                self._apply(session)
+            except Exception as e:
+                print(f"Error en la sesión de escaneo {session.id}: {str(e)}")
+            finally:
+                self._release(session.id)
+
+    def _apply(self, session):
+        """Aplicar en Odoo los escaneos pendientes (con la concesión de la sesión tomada)"""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT pending FROM scan_sessions WHERE id = ?", (session.id,)).fetchone()
+            additions = Counter(json.loads(row['pending']))
+            self._update(conn, session.id, pending='{}')
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        if not additions:
+            return
+
+        try:
+            if session.picking_id is None:
+                session.picking_id = self.opener(session.source_location_id, session.dest_location_id, session.id)
+                # Guardar el borrador en cuanto existe, para poder descartarlo si el proceso termina
+                self._update(conn, session.id, picking_id=session.picking_id)
+
+            # Los códigos ya marcados como no encontrados no se vuelven a buscar
+            additions = Counter({barcode: qty for barcode, qty in additions.items() if barcode not in session.not_found})
+            known = {
+                barcode: (session.moves[barcode], session.quantities[barcode] + qty)
+                for barcode, qty in additions.items() if barcode in session.moves
+            }
+            new_moves, not_found = self.applier(
+                session.picking_id, session.source_location_id, session.dest_location_id,
+                {barcode: qty for barcode, qty in additions.items() if barcode not in session.moves},
+                known,
+                # Tras un error no se sabe si Odoo llegó a crear los movimientos
+                session.error is not None
+            )
+        except Exception as e:
+            # Devolver los escaneos a la cola (junto a los que hayan llegado) y reintentar más tarde
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute("SELECT pending FROM scan_sessions WHERE id = ?", (session.id,)).fetchone()
+                pending = Counter(json.loads(row['pending'])) + additions
+                self._update(conn, session.id, pending=json.dumps(pending), error=str(e), retry_at=time.time() + 5)
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+            raise
+
+        session.moves.update(new_moves)
+        session.not_found.update(not_found)
+        for barcode, qty in additions.items():
+            if barcode in session.moves:
+                session.quantities[barcode] += qty
+        session.error = None
+        self._update(conn, session.id, moves=json.dumps(session.moves), quantities=json.dumps(session.quantities),
+                     not_found=json.dumps(sorted(session.not_found)), error=None)
+
+    def confirm(self, session_id):
+        """
+        Aplicar lo pendiente y confirmar la transferencia de la sesión
+
+        Returns:
+            dict: resultado con el mismo formato que create_inventory_transfer
+        """
+        # Desde aquí add() rechaza los escaneos: lo que quede pendiente se
+        # aplica ahora y nada se pierde tras la confirmación
+        session, reason = self._acquire(session_id, closing=True, wait=self.lease_seconds)
+        if reason == 'missing':
+            return {'success': False, 'message': 'La sesión de escaneo no existe o ya terminó'}
+        if reason == 'closed':
+            return {'success': False, 'message': 'La sesión de escaneo ya fue cerrada'}
+        if reason == 'busy':
+            return {'success': False, 'message': 'La sesión de escaneo está ocupada, reintenta en unos segundos', 'retryable': True}
+
+        try:
+            self._apply(session)
+        except Exception as e:
+            self._release(session_id, OPEN)
+            return {'success': False, 'message': f'Error al aplicar los últimos escaneos: {str(e)}', 'retryable': True}
+
+        if not session.moves:
+            try:
+                if session.picking_id:
+                    self.discarder(session.picking_id)
+            except Exception as e:
+                self._release(session_id, OPEN)
+                return {'success': False, 'message': f'Error al descartar la transferencia: {str(e)}', 'retryable': True}
+            self._forget(session_id)
+            return {
+                'success': False,
+                'message': 'No se encontraron productos válidos',
+                'products_not_found': sorted(session.not_found)
+            }
+
+        try:
+            result = self.confirmer(session.picking_id, session.source_location_id,
+                                    dict(session.quantities), dict(session.moves))
+        except Exception as e:
+            self._release(session_id, OPEN)
+            return {'success': False, 'message': f'Error al confirmar la transferencia: {str(e)}', 'retryable': True}
+
+        self._forget(session_id)
+        result = dict(result, products_not_found=sorted(session.not_found))
+        if result['success']:
+            result['picking_id'] = session.picking_id
+        return result
+
+    def cancel(self, session_id, wait=None):
+        """
+        Descartar la sesión y su transferencia en borrador
+
+        Args:
+            wait: segundos a esperar si otro proceso está usando la sesión
+                (por defecto lease_seconds)
+        """
+        session, reason = self._acquire(session_id, closing=True,
+                                        wait=self.lease_seconds if wait is None else wait)
+        if session is None:
+            return False
+        if session.picking_id:
+            try:
+                self.discarder(session.picking_id)
+            except Exception as e:
+                print(f"No se pudo eliminar la transferencia en borrador {session.picking_id}: {str(e)}")
+        self._forget(session_id)
+        return True
+
+    def stats(self):
+        rows = self._connect().execute("SELECT pending FROM scan_sessions WHERE state IN (?, ?)",
+                                       (OPEN, CLOSING)).fetchall()
+        return {
+            'open_sessions': len(rows),
+            'pending_scans': sum(sum(json.loads(row['pending']).values()) for row in rows),
+        }
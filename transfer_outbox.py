@@ -0,0 +1,262 @@
+# transfer_outbox.py
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from collections import Counter
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS submissions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    source_location_id INTEGER NOT NULL,
+    dest_location_id INTEGER NOT NULL,
+    products TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'pending',
+    batch_key TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL DEFAULT 0,
+    picking_id INTEGER,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS submissions_state ON submissions (state, next_attempt_at);
+"""
+
+# Estados de un envío
+PENDING = 'pending'
+SENDING = 'sending'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class TransferOutbox:
+    """
+    Bandeja de salida local y persistente para la creación de transferencias.
+
+    Cada envío de escaneos se guarda en SQLite (modo WAL) y se confirma al
+    instante. Un hilo en segundo plano agrupa los envíos pendientes por par
+    origen/destino, crea una transferencia por grupo mediante `sender` y
+    reintenta los fallos temporales con espera exponencial. Cada grupo lleva
+    una clave de idempotencia que se conserva entre reintentos.
+
+    Args:
+        db_path: ruta de la base de datos SQLite
+        sender: función (origen, destino, {barcode: cantidad}, clave) -> dict
+            con el mismo formato que create_inventory_transfer, más
+            'retryable' cuando el error es temporal
+        max_products: máximo de productos distintos por transferencia
+        max_quantity: máximo de unidades por producto en una transferencia
+        interval: segundos entre revisiones de la bandeja
+    """
+
+    def __init__(self, db_path, sender, max_products=20, max_quantity=100, interval=2.0):
+        self.db_path = db_path
+        self.sender = sender
+        self.max_products = max_products
+        self.max_quantity = max_quantity
+        self.interval = interval
+        self._wakeup = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._schema_ready = False
+        self._recovered = False
+
+    def _connect(self):
+        # La base de datos se crea en el primer uso, no al construir la bandeja
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        if not self._schema_ready:
+            conn.executescript(SCHEMA)
+            self._schema_ready = True
+        return conn
+
+    def enqueue(self, source_location_id, dest_location_id, products_data):
+        """
+        Registrar un envío de escaneos y devolver su ID
+
+        Args:
+            source_location_id: ID de la ubicación origen
+            dest_location_id: ID de la ubicación destino
+            products_data: diccionario {barcode: quantity}
+        """
+        now = time.time()
+        conn = self._connect()
+        cursor = conn.execute(
+            "INSERT INTO submissions (source_location_id, dest_location_id, products, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (int(source_location_id), int(dest_location_id), json.dumps(dict(products_data)), now, now)
+        )
+        self.start()
+        self._wakeup.set()
+        return cursor.lastrowid
+
+    def start(self):
+        """Arrancar el hilo de envío si aún no está activo"""
+        with self._lock:
+            if not self._recovered:
+                # Envíos que quedaron a medias (p. ej. por un reinicio) vuelven a la cola
+                with self._connect() as conn:
+                    conn.execute("UPDATE submissions SET state = ?, updated_at = ? WHERE state = ?",
+                                 (PENDING, time.time(), SENDING))
+                self._recovered = True
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='transfer-outbox', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                while self.flush_once():
+                    pass
+            except Exception as e:
+                print(f"Error en la bandeja de transferencias: {str(e)}")
+            self._wakeup.wait(self.interval)
+            self._wakeup.clear()
+
+    def _claim_batch(self):
+        """
+        Reservar el siguiente grupo de envíos de un mismo par origen/destino
+
+        Returns:
+            tuple: (clave, origen, destino, [ids], Counter) o None si no hay nada pendiente
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            first = conn.execute(
+                "SELECT * FROM submissions WHERE state = ? AND next_attempt_at <= ? ORDER BY id LIMIT 1",
+                (PENDING, now)
+            ).fetchone()
+            if first is None:
+                conn.execute("COMMIT")
+                return None
+
+            source, dest = first['source_location_id'], first['dest_location_id']
+
+            if first['batch_key']:
+                # Reintento de un grupo ya formado: se conserva tal cual
+                rows = conn.execute(
+                    "SELECT * FROM submissions WHERE batch_key = ? AND state = ? ORDER BY id",
+                    (first['batch_key'], PENDING)
+                ).fetchall()
+                batch_key = first['batch_key']
+            else:
+                candidates = conn.execute(
+                    "SELECT * FROM submissions WHERE state = ? AND batch_key IS NULL AND next_attempt_at <= ? "
+                    "AND source_location_id = ? AND dest_location_id = ? ORDER BY id LIMIT 500",
+                    (PENDING, now, source, dest)
+                ).fetchall()
+                rows = []
+                merged = Counter()
+                for row in candidates:
+                    products = Counter(json.loads(row['products']))
+                    combined = merged + products
+                    fits = (len(combined) <= self.max_products and
+                            all(qty <= self.max_quantity for qty in combined.values()))
+                    if rows and not fits:
+                        break
+                    rows.append(row)
+                    merged = combined
+                batch_key = uuid.uuid4().hex
+
+            ids = [row['id'] for row in rows]
+            products = Counter()
+            for row in rows:
+                products.update(json.loads(row['products']))
+
+            conn.executemany(
+                "UPDATE submissions SET state = ?, batch_key = ?, updated_at = ? WHERE id = ?",
+                [(SENDING, batch_key, now, submission_id) for submission_id in ids]
+            )
+            conn.execute("COMMIT")
+            return batch_key, source, dest, ids, products
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def flush_once(self):
+        """
+        Enviar a Odoo un grupo de envíos pendientes
+
+        Returns:
+            bool: True si se procesó un grupo, False si no había nada pendiente
+        """
+        claimed = self._claim_batch()
+        if claimed is None:
+            return False
+
+        batch_key, source, dest, ids, products = claimed
+        print(f"Enviando {len(ids)} escaneos en cola ({len(products)} productos) como una transferencia")
+
+        try:
+            result = self.sender(source, dest, products, batch_key)
+        except Exception as e:
+            result = {'success': False, 'message': str(e), 'retryable': True}
+
+        conn = self._connect()
+        now = time.time()
+        placeholders = ','.join('?' * len(ids))
+
+        if result.get('success'):
+            conn.execute(
+                f"UPDATE submissions SET state = ?, picking_id = ?, error = ?, updated_at = ? WHERE id IN ({placeholders})",
+                [DONE, result.get('picking_id'), self._result_note(result), now] + ids
+            )
+        elif result.get('retryable'):
+            attempts = conn.execute(
+                f"SELECT MAX(attempts) FROM submissions WHERE id IN ({placeholders})", ids
+            ).fetchone()[0] + 1
+            delay = min(300, 5 * 2 ** (attempts - 1))
+            conn.execute(
+                f"UPDATE submissions SET state = ?, attempts = ?, next_attempt_at = ?, error = ?, updated_at = ? "
+                f"WHERE id IN ({placeholders})",
+                [PENDING, attempts, now + delay, result.get('message'), now] + ids
+            )
+            print(f"Envío en cola fallido ({result.get('message')}); reintento en {delay}s")
+        else:
+            conn.execute(
+                f"UPDATE submissions SET state = ?, error = ?, updated_at = ? WHERE id IN ({placeholders})",
+                [FAILED, result.get('message'), now] + ids
+            )
+        return True
+
+    @staticmethod
+    def _result_note(result):
+        notes = []
+        not_found = result.get('products_not_found')
+        if not_found:
+            notes.append(f"Productos no encontrados: {', '.join(not_found)}")
+        shortages = result.get('shortages')
+        if shortages:
+            notes.append("Stock insuficiente en origen: " + ', '.join(
+                f"{s['barcode']} ({s['available']}/{s['requested']})" for s in shortages))
+        return ' | '.join(notes) or None
+
+    def stats(self):
+        """Profundidad de la cola y últimos errores"""
+        conn = self._connect()
+        counts = {state: 0 for state in (PENDING, SENDING, DONE, FAILED)}
+        for row in conn.execute("SELECT state, COUNT(*) AS total FROM submissions GROUP BY state"):
+            counts[row['state']] = row['total']
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM submissions WHERE state IN (?, ?)", (PENDING, SENDING)
+        ).fetchone()[0]
+        failed = conn.execute(
+            "SELECT id, source_location_id, dest_location_id, error, updated_at FROM submissions "
+            "WHERE state = ? ORDER BY id DESC LIMIT 20", (FAILED,)
+        ).fetchall()
+        return {
+            'backlog': counts[PENDING] + counts[SENDING],
+            'counts': counts,
+            'oldest_pending_age': round(time.time() - oldest, 1) if oldest else None,
+            'recent_failures': [dict(row) for row in failed],
+        }
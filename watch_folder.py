@@ -0,0 +1,319 @@
+# watch_folder.py
+"""
+Servicio de ingesta de archivos de conteo desde una carpeta vigilada.
+
+Las bases de los escáneres dejan sus exportaciones CSV en una carpeta
+(normalmente compartida en red). Este servicio la revisa continuamente,
+espera a que cada archivo esté completo (tamaño y fecha de modificación
+sin cambios durante unos segundos) y lo procesa una sola vez con la misma
+lógica que batch_cli.py: reporte, etiquetas o transferencia.
+
+Estructura de la carpeta vigilada:
+
+    entrada/             archivos nuevos (la carpeta vigilada)
+    entrada/processing/  archivos reclamados que se están procesando
+    entrada/done/        un directorio por archivo con el CSV, sus resultados
+                         y result.json
+    entrada/failed/      igual, para los archivos que fallaron
+
+Cada archivo se identifica por el hash de su contenido en un registro
+SQLite local: si llega otra copia de un archivo ya procesado se mueve a
+done/ marcada como duplicada sin volver a procesarla. Un archivo que falló
+sí se vuelve a procesar si se deja de nuevo en la carpeta.
+
+Uso:
+    python watch_folder.py /mnt/escaneres --mode transfer --source 12 --dest 8
+    python watch_folder.py /mnt/escaneres --mode report --format pdf --once
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from datetime import datetime
+
+import batch_cli
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS ingested_files (
+    content_hash TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    state TEXT NOT NULL,
+    result_dir TEXT,
+    message TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+# Estados de un archivo en el registro
+PROCESSING = 'processing'
+DONE = 'done'
+FAILED = 'failed'
+
+# Archivos que aún se están copiando o que no son exportaciones
+IGNORED_SUFFIXES = ('.tmp', '.part', '.partial', '.crdownload', '~')
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class IngestLedger:
+    """
+    Registro persistente de los archivos ingeridos, por hash de contenido
+
+    Args:
+        db_path: ruta de la base de datos SQLite (local: SQLite no es fiable
+            sobre carpetas de red)
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+
+    def get(self, content_hash):
+        with self._lock:
+            return self._conn.execute("SELECT * FROM ingested_files WHERE content_hash = ?", (content_hash,)).fetchone()
+
+    def mark(self, content_hash, filename, state, result_dir=None, message=None):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO ingested_files (content_hash, filename, state, result_dir, message, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(content_hash) DO UPDATE SET filename = excluded.filename, state = excluded.state, "
+                "result_dir = excluded.result_dir, message = excluded.message, updated_at = excluded.updated_at",
+                (content_hash, filename, state, result_dir, message, now, now)
+            )
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) FROM ingested_files GROUP BY state").fetchall()
+        return {state: count for state, count in rows}
+
+
+class FolderWatcher:
+    """
+    Vigila una carpeta y procesa cada archivo completo una sola vez.
+
+    Un archivo se considera completo cuando su tamaño y su fecha de
+    modificación no cambian durante `settle_seconds`. Antes de procesarlo se
+    mueve a processing/ (el renombrado es atómico dentro del mismo disco),
+    así que un reinicio a mitad no lo procesa dos veces: al arrancar, lo que
+    quedó en processing/ vuelve a la carpeta de entrada. Los archivos que se
+    completan en la misma revisión se procesan juntos, con una sola consulta
+    de catálogo a Odoo.
+
+    Args:
+        watch_dir: carpeta vigilada
+        processor: función (archivos, directorio de salida) -> resumen con el
+            formato de batch_cli.run
+        ledger: IngestLedger
+        interval: segundos entre revisiones de la carpeta
+        settle_seconds: segundos sin cambios para considerar un archivo completo
+    """
+
+    def __init__(self, watch_dir, processor, ledger, interval=1.0, settle_seconds=5.0):
+        self.watch_dir = os.path.abspath(watch_dir)
+        self.processor = processor
+        self.ledger = ledger
+        self.interval = interval
+        self.settle_seconds = settle_seconds
+        self.processing_dir = os.path.join(self.watch_dir, 'processing')
+        self.done_dir = os.path.join(self.watch_dir, 'done')
+        self.failed_dir = os.path.join(self.watch_dir, 'failed')
+        for directory in (self.processing_dir, self.done_dir, self.failed_dir):
+            os.makedirs(directory, exist_ok=True)
+        # ruta -> (tamaño, mtime, momento desde el que no cambia)
+        self._seen = {}
+
+    def recover(self):
+        """Devolver a la entrada los archivos que quedaron a medias en processing/"""
+        for entry in os.scandir(self.processing_dir):
+            if entry.is_dir():
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.replace(entry.path, os.path.join(self.watch_dir, entry.name))
+                print(f"Archivo recuperado tras un reinicio: {entry.name}")
+
+    def scan(self):
+        """
+        Revisar la carpeta
+
+        Returns:
+            list: rutas de los archivos completos listos para procesar
+        """
+        now = time.monotonic()
+        current = {}
+        ready = []
+        for entry in os.scandir(self.watch_dir):
+            name = entry.name
+            if (not entry.is_file() or name.startswith('.') or name.lower().endswith(IGNORED_SUFFIXES)
+                    or not name.lower().endswith(batch_cli.INPUT_EXTENSIONS)):
+                continue
+            stat = entry.stat()
+            signature = (stat.st_size, stat.st_mtime_ns)
+            previous = self._seen.get(entry.path)
+            stable_since = previous[2] if previous and previous[:2] == signature else now
+            current[entry.path] = signature + (stable_since,)
+            if now - stable_since >= self.settle_seconds:
+                ready.append(entry.path)
+        self._seen = current
+        return sorted(ready)
+
+    def _claim(self, path):
+        """Mover el archivo a processing/ (None si otro proceso lo reclamó antes)"""
+        target = os.path.join(self.processing_dir, os.path.basename(path))
+        try:
+            os.replace(path, target)
+        except FileNotFoundError:
+            return None
+        self._seen.pop(path, None)
+        return target
+
+    def _result_dir(self, base_dir, path):
+        stem = os.path.splitext(os.path.basename(path))[0]
+        target = os.path.join(base_dir, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{stem}")
+        candidate, counter = target, 1
+        while os.path.exists(candidate):
+            counter += 1
+            candidate = f'{target}_{counter}'
+        os.makedirs(candidate)
+        return candidate
+
+    def _finish(self, path, content_hash, success, result, outputs=()):
+        """Mover el archivo y sus resultados a done/ o failed/ y registrarlo"""
+        result_dir = self._result_dir(self.done_dir if success else self.failed_dir, path)
+        shutil.move(path, os.path.join(result_dir, os.path.basename(path)))
+        for output in outputs:
+            if output and os.path.exists(output):
+                # Un reporte CSV se llama igual que el archivo de entrada
+                target = os.path.join(result_dir, os.path.basename(output))
+                if os.path.exists(target):
+                    target = os.path.join(result_dir, f'resultado_{os.path.basename(output)}')
+                shutil.move(output, target)
+        with open(os.path.join(result_dir, 'result.json'), 'w') as f:
+            json.dump(result, f, indent=4)
+        if content_hash:
+            self.ledger.mark(content_hash, os.path.basename(path), DONE if success else FAILED,
+                             result_dir, result.get('message'))
+        print(f"{'Procesado' if success else 'Error al procesar'}: {os.path.basename(path)} -> {result_dir}")
+
+    def process(self, paths):
+        """Reclamar y procesar un grupo de archivos completos"""
+        claimed = {}
+        for path in paths:
+            target = self._claim(path)
+            if target is None:
+                continue
+            try:
+                content_hash = file_hash(target)
+            except OSError as e:
+                self._finish(target, None, False, {'message': f'No se pudo leer el archivo: {str(e)}'})
+                continue
+
+            previous = self.ledger.get(content_hash)
+            if (previous and previous['state'] == DONE) or content_hash in claimed.values():
+                self._finish(target, None, True, {
+                    'duplicate': True,
+                    'message': 'Archivo ya procesado anteriormente',
+                    'original': previous['result_dir'] if previous else None,
+                })
+                continue
+            self.ledger.mark(content_hash, os.path.basename(target), PROCESSING)
+            claimed[target] = content_hash
+
+        if not claimed:
+            return
+
+        staging = os.path.join(self.processing_dir, f'.lote-{time.time_ns()}')
+        try:
+            summary = self.processor(list(claimed), staging)
+            results = {result['file']: result for result in summary['results']}
+        except Exception as e:
+            print(f"Error en el lote de ingesta: {str(e)}")
+            results = {path: {'file': path, 'success': False, 'message': str(e)} for path in claimed}
+
+        for path, content_hash in claimed.items():
+            result = results.get(path, {'file': path, 'success': False, 'message': 'Sin resultado'})
+            self._finish(path, content_hash, result['success'], result, [result.get('output')])
+        shutil.rmtree(staging, ignore_errors=True)
+
+    def run_once(self):
+        """Procesar lo que esté completo ahora mismo; devuelve cuántos archivos había"""
+        ready = self.scan()
+        if ready:
+            self.process(ready)
+        return len(ready)
+
+    def run_forever(self):
+        self.recover()
+        print(f"Vigilando {self.watch_dir} (revisión cada {self.interval}s, "
+              f"archivo completo tras {self.settle_seconds}s sin cambios)")
+        while True:
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error al revisar la carpeta vigilada: {str(e)}")
+            time.sleep(self.interval)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Ingesta continua de archivos de conteo desde una carpeta')
+    parser.add_argument('watch_dir', help='carpeta vigilada')
+    parser.add_argument('--mode', choices=['report', 'labels', 'transfer'], required=True)
+    parser.add_argument('--format', choices=['pdf', 'csv'], default='pdf', help='formato del reporte')
+    parser.add_argument('--source', type=int, help='ubicación origen (modo transfer)')
+    parser.add_argument('--dest', type=int, help='ubicación destino (modo transfer)')
+    parser.add_argument('--printer', help='impresora para las etiquetas (modo labels)')
+    parser.add_argument('--cups-server', help='servidor CUPS (modo labels)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 4, help='archivos procesados a la vez')
+    parser.add_argument('--interval', type=float, default=1.0, help='segundos entre revisiones')
+    parser.add_argument('--settle', type=float, default=5.0, help='segundos sin cambios para considerar un archivo completo')
+    parser.add_argument('--ledger', default='ingest_ledger.db', help='registro local de archivos procesados')
+    parser.add_argument('--once', action='store_true', help='procesar los archivos completos y terminar')
+    args = parser.parse_args(argv)
+
+    if args.mode == 'transfer' and (not args.source or not args.dest):
+        parser.error('el modo transfer necesita --source y --dest')
+
+    # Un solo pool para todo el servicio: los procesos se crean una vez
+    executor = batch_cli.make_executor(args.mode, args.workers)
+
+    def processor(files, output_dir):
+        return batch_cli.run(args.mode, files, output_dir, args.workers, args.format, args.source, args.dest,
+                             args.printer, args.cups_server, executor=executor)
+
+    watcher = FolderWatcher(args.watch_dir, processor, IngestLedger(args.ledger), args.interval, args.settle)
+    try:
+        if args.once:
+            watcher.recover()
+            # Dos revisiones separadas por el tiempo de asentamiento
+            watcher.scan()
+            time.sleep(args.settle)
+            count = watcher.run_once()
+            print(f"{count} archivos procesados; registro: {watcher.ledger.stats()}")
+        else:
+            watcher.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        executor.shutdown()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())